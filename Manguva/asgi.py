@@ -7,10 +7,45 @@ For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 
+import asyncio
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Manguva.settings')
+# Sync views run on a fresh executor thread per request, and connections are
+# per thread: a persistent connection would never be reused, only left open
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
+
+
+class ConcurrencyLimit:
+    """
+    Lets at most `limit` HTTP requests into Django at once; the rest wait.
+    Each concurrent request runs its sync view on its own thread with its
+    own database connection, so this bounds the worker's connections (see
+    gunicorn.conf.py). Paths in `exempt` (the dashboard event stream, which
+    holds no connection while open) are not counted.
+    """
+
+    def __init__(self, app, limit, exempt=()):
+        self.app = app
+        self.limit = limit
+        self.exempt = tuple(exempt)
+        self._semaphore = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt):
+            return await self.app(scope, receive, send)
+        if self._semaphore is None:
+            # Created on first use, inside the worker's event loop
+            self._semaphore = asyncio.Semaphore(self.limit)
+        async with self._semaphore:
+            return await self.app(scope, receive, send)
+
 
 application = get_asgi_application()
+if settings.ASGI_MAX_CONCURRENT_REQUESTS:
+    application = ConcurrencyLimit(
+        application, settings.ASGI_MAX_CONCURRENT_REQUESTS, exempt=["/api/dashboard/stream/"]
+    )
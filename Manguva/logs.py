@@ -0,0 +1,173 @@
+"""
+Logging plumbing used by ``LOGGING`` in settings.
+
+Request threads only put records on an in-memory queue
+(``BackgroundQueueHandler``); a listener thread per process formats them as
+JSON and writes them to the console and, outside gunicorn, a size-rotated
+file (``LOG_TO_FILE``). Records are
+sampled per logger and scrubbed of credentials, emails and bulky payloads
+before they are queued.
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "pid": record.process,
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+_SECRET_PAIR = re.compile(
+    r"""(['"]?(?:password|passwd|token|access|refresh|secret|authorization)['"]?\s*[:=]\s*)"""
+    r"""(?:(?:Bearer|JWT)\s+)?(?:'[^']*'|"[^"]*"|[^\s,}&]+)""",
+    re.IGNORECASE,
+)
+_BEARER = re.compile(r"(Bearer\s+)[\w\-.]+", re.IGNORECASE)
+_EMAIL = re.compile(r"\b([\w.+-])[\w.+-]*@([\w-]+\.[\w.-]+)\b")
+_SECRET_NAME = re.compile(r"password|passwd|token|access|refresh|secret|authorization", re.IGNORECASE)
+# Attributes every LogRecord has; anything else came in through `extra`
+_RECORD_ATTRS = set(logging.makeLogRecord({}).__dict__) | {"message", "asctime"}
+
+
+def _redact(text):
+    text = _SECRET_PAIR.sub(r"\1[redacted]", text)
+    text = _BEARER.sub(r"\1[redacted]", text)
+    return _EMAIL.sub(r"\1***@\2", text)
+
+
+def _redact_value(name, value):
+    if _SECRET_NAME.search(str(name)):
+        return "[redacted]"
+    if isinstance(value, str):
+        return _redact(value)
+    if isinstance(value, dict):
+        return {key: _redact_value(key, item) for key, item in value.items()}
+    return value
+
+
+class RedactingFilter(logging.Filter):
+    """
+    Masks credentials and email addresses in the message and in `extra`
+    fields, and truncates oversized messages.
+    """
+
+    def __init__(self, max_length=2000):
+        super().__init__()
+        self.max_length = max_length
+
+    def filter(self, record):
+        message = record.getMessage()
+        redacted = _redact(message)
+        if len(redacted) > self.max_length:
+            redacted = f"{redacted[:self.max_length]}... [{len(redacted) - self.max_length} chars truncated]"
+        if redacted != message:
+            record.msg, record.args = redacted, None
+        for name in record.__dict__.keys() - _RECORD_ATTRS:
+            setattr(record, name, _redact_value(name, getattr(record, name)))
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a fraction of the records below WARNING per logger, e.g.
+    ``{"django.server": 0.1}`` or ``"django.server=0.1"``. The longest matching logger prefix wins;
+    warnings and errors are always kept.
+    """
+
+    def __init__(self, rates=None):
+        super().__init__()
+        if isinstance(rates, str):
+            rates = parse_sample_rates(rates)
+        self.rates = sorted((rates or {}).items(), key=lambda item: len(item[0]), reverse=True)
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        for prefix, rate in self.rates:
+            if record.name == prefix or record.name.startswith(prefix + "."):
+                return random.random() < rate
+        return True
+
+
+def parse_sample_rates(value):
+    """``"django.server=0.1,admin_app.views=0.5"`` -> ``{"django.server": 0.1, ...}``."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, rate = item.partition("=")
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+class BackgroundQueueHandler(QueueHandler):
+    """
+    Queues records for a listener thread that hands them to `handlers`
+    (``cfg://handlers.<name>`` references in ``LOGGING``, which dictConfig
+    resolves to the configured handlers). The listener is started lazily
+    and again in every forked process (gunicorn preloads the app in the
+    master, whose threads do not survive the fork). When the queue is full,
+    records are dropped rather than blocking the request.
+    """
+
+    def __init__(self, handlers, queue_size=10000):
+        super().__init__(queue.Queue(queue_size))
+        # Indexing (not iterating) dictConfig's list is what converts the cfg:// references
+        self.handlers = [handlers[i] for i in range(len(handlers))]
+        for handler in self.handlers:
+            if not isinstance(handler, logging.Handler):
+                raise ValueError(f"{handler!r} is not a configured handler")
+        self.dropped = 0
+        self._pid = None
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.Queue(self.queue.maxsize)
+            self._listener = QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+            atexit.register(self._listener.stop)
+
+    def prepare(self, record):
+        # Render the message and traceback now: arguments and exc_info may
+        # not outlive the request, and the target formatters run later
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
@@ -58,6 +58,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'admin_app.middleware.QueryInstrumentationMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -65,10 +66,37 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'admin_app.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Per-request SQL instrumentation (admin_app/middleware.py): Server-Timing
+# header on every response, and a warning with the top SQL fingerprints for
+# requests over either threshold
+SERVER_TIMING_HEADER = os.environ.get('SERVER_TIMING_HEADER', 'True') == 'True'
+REQUEST_SLOW_MS = int(os.environ.get('REQUEST_SLOW_MS', 1000))
+REQUEST_MAX_QUERIES = int(os.environ.get('REQUEST_MAX_QUERIES', 50))
+# /metrics requires "Authorization: Bearer <METRICS_TOKEN>"; without a token it is only served with DEBUG on
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Trace spans on checkout, inventory intake and dashboard analytics
+# (admin_app/tracing.py). Fraction of requests traced; 0 turns tracing off
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', 0))
+# "jsonl" appends spans to TRACE_FILE, "otlp" posts them to an OTLP/HTTP collector
+TRACE_EXPORTER = os.environ.get('TRACE_EXPORTER', 'jsonl')
+TRACE_FILE = os.environ.get('TRACE_FILE', os.path.join(BASE_DIR, 'traces.jsonl'))
+TRACE_OTLP_ENDPOINT = os.environ.get('TRACE_OTLP_ENDPOINT', 'http://localhost:4318/v1/traces')
+TRACE_SERVICE_NAME = os.environ.get('TRACE_SERVICE_NAME', 'maguva-backend')
+
+# ?profile=1 / "X-Profile: 1" for admins (admin_app/profiling.py). The
+# middleware is not loaded at all unless this is on
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'False') == 'True'
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(BASE_DIR, 'profiles'))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.environ.get('PROFILE_SAMPLE_INTERVAL_MS', 5))
+# Distinct SELECTs re-run under EXPLAIN per profile, slowest first
+PROFILE_EXPLAIN_LIMIT = int(os.environ.get('PROFILE_EXPLAIN_LIMIT', 20))
+
 CORS_ALLOWED_ORIGINS = [
     "https://inventory-managment-rosy.vercel.app",
     "https://inventory-managment-pz3afq9eq-anthony-olevesters-projects.vercel.app",
@@ -101,13 +129,42 @@ CORS_ALLOW_METHODS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # simplejwt's JWTAuthentication with a short-lived per-process user cache, invalidated through CACHES
+        'admin_app.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
+    # Proxies in front of the app (Railway's edge is one hop). Throttles take the client IP from that
+    # many entries from the right of X-Forwarded-For, so a client cannot pick its own by sending the header
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 1)),
 }
 
+JWT_USER_CACHE_TTL = int(os.environ.get('JWT_USER_CACHE_TTL', 60))  # seconds; 0 disables the cache
+JWT_USER_CACHE_SIZE = int(os.environ.get('JWT_USER_CACHE_SIZE', 1000))
+
+# Shared cache (login throttle buckets, JWT user cache generations). Without REDIS_URL each
+# process has its own memory cache and user changes reach other workers only after JWT_USER_CACHE_TTL
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Login throttle (admin_app/throttling.py): token buckets per client IP and per email
+LOGIN_THROTTLE_IP_BURST = int(os.environ.get('LOGIN_THROTTLE_IP_BURST', 20))
+LOGIN_THROTTLE_IP_PER_MINUTE = float(os.environ.get('LOGIN_THROTTLE_IP_PER_MINUTE', 10))
+LOGIN_THROTTLE_EMAIL_BURST = int(os.environ.get('LOGIN_THROTTLE_EMAIL_BURST', 5))
+LOGIN_THROTTLE_EMAIL_PER_MINUTE = float(os.environ.get('LOGIN_THROTTLE_EMAIL_PER_MINUTE', 2))
+
 
 ROOT_URLCONF = 'Manguva.urls'
 
@@ -127,6 +184,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'Manguva.wsgi.application'
+ASGI_APPLICATION = 'Manguva.asgi.application'
 AUTH_USER_MODEL = 'admin_app.MaguvaUsers'
 
 # Authentication backends for email-based login
@@ -138,6 +196,18 @@ AUTHENTICATION_BACKENDS = [
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Persistent connections: under WSGI (gthread, runserver) and in the job
+# worker each thread reuses its connection for up to DB_CONN_MAX_AGE seconds
+# instead of paying the TLS handshake per request, and checks it is still
+# alive before reusing it. Under ASGI (the default uvicorn workers) every
+# request runs its sync view on a new thread, so Manguva/asgi.py defaults
+# this to 0; use DB_POOL there to reuse connections.
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 600))  # seconds; 0 closes after every request
+DB_CONN_HEALTH_CHECKS = os.environ.get('DB_CONN_HEALTH_CHECKS', 'True') == 'True'
+# Requests let into Django at once per ASGI worker, i.e. its DB connections (0 = no limit);
+# gunicorn.conf.py sets it and sizes workers from it
+ASGI_MAX_CONCURRENT_REQUESTS = int(os.environ.get('ASGI_MAX_CONCURRENT_REQUESTS', 0))
+
 # Check for Railway environment variables first
 if os.environ.get('PGHOST') and os.environ.get('PGDATABASE'):
     # Railway PostgreSQL configuration
@@ -149,6 +219,8 @@ if os.environ.get('PGHOST') and os.environ.get('PGDATABASE'):
             'PASSWORD': os.environ.get('PGPASSWORD'),
             'HOST': os.environ.get('PGHOST'),
             'PORT': os.environ.get('PGPORT', '5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
             'OPTIONS': {
                 'sslmode': 'require',
             },
@@ -158,7 +230,11 @@ elif os.environ.get('DATABASE_URL'):
     # Fallback to DATABASE_URL
     import dj_database_url
     DATABASES = {
-        'default': dj_database_url.parse(os.environ.get('DATABASE_URL'))
+        'default': dj_database_url.parse(
+            os.environ.get('DATABASE_URL'),
+            conn_max_age=DB_CONN_MAX_AGE,
+            conn_health_checks=DB_CONN_HEALTH_CHECKS,
+        )
     }
 else:
     # Local development with SQLite
@@ -169,6 +245,65 @@ else:
         }
     }
 
+# Optional connection pool (DB_POOL=True): a psycopg 3 pool per worker process
+# instead of one persistent connection. Needs `pip install "psycopg[binary,pool]"`;
+# gunicorn.conf.py keeps workers x DB_POOL_MAX_SIZE (+1 LISTEN) within DB_MAX_CONNECTIONS
+if os.environ.get('DB_POOL', 'False') == 'True' and DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    try:
+        import psycopg  # noqa: F401
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        import warnings
+        warnings.warn("DB_POOL is set but psycopg 3 / psycopg_pool is not installed; using persistent connections")
+    else:
+        DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 1)),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 4)),
+            'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),  # seconds to wait for a free connection
+        }
+        # Pooled connections are returned to the pool, not kept by the worker
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+
+
+# Live dashboard events (admin_app/events.py)
+# PostgreSQL deployments fan out across workers with LISTEN/NOTIFY; SQLite
+# development keeps everything in-process.
+DASHBOARD_EVENTS_BACKEND = os.environ.get(
+    'DASHBOARD_EVENTS_BACKEND',
+    'admin_app.events.PostgresChannelLayer'
+    if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql'
+    else 'admin_app.events.InMemoryChannelLayer'
+)
+DASHBOARD_EVENTS_KEEPALIVE = int(os.environ.get('DASHBOARD_EVENTS_KEEPALIVE', 15))  # seconds
+DASHBOARD_STREAM_TICKET_TTL = int(os.environ.get('DASHBOARD_STREAM_TICKET_TTL', 30))  # seconds to open the stream with a ticket
+DASHBOARD_LOW_STOCK_THRESHOLD = int(os.environ.get('DASHBOARD_LOW_STOCK_THRESHOLD', 10))
+
+# Sales rollup behind analytics (admin_app/rollups.py). After checkout a refresh
+# job is queued for the job worker, at most one per interval; set to 0 to rely
+# on a scheduled `python manage.py refresh_analytics` only.
+ANALYTICS_REFRESH_INTERVAL = int(os.environ.get('ANALYTICS_REFRESH_INTERVAL', 60))  # seconds
+
+# Tailoring desk: item units the workshop can finish per delivery day (0 = not tracked)
+TAILOR_DAILY_CAPACITY = int(os.environ.get('TAILOR_DAILY_CAPACITY', 0))
+TAILOR_WORKLOAD_MAX_DAYS = int(os.environ.get('TAILOR_WORKLOAD_MAX_DAYS', 92))
+
+# Customer reminders (admin_app/reminders.py). Swap the sender for an SMS/WhatsApp
+# gateway class exposing send_batch(reminders)
+REMINDER_SENDER = os.environ.get('REMINDER_SENDER', 'admin_app.reminders.ConsoleSender')
+REMINDER_FILE = os.environ.get('REMINDER_FILE', os.path.join(BASE_DIR, 'reminders.jsonl'))  # FileSender output
+REMINDER_DAYS_BEFORE = int(os.environ.get('REMINDER_DAYS_BEFORE', 2))
+REMINDER_BATCH_SIZE = int(os.environ.get('REMINDER_BATCH_SIZE', 100))
+REMINDER_MAX_ATTEMPTS = int(os.environ.get('REMINDER_MAX_ATTEMPTS', 3))
+# Reminders claimed longer ago than this by a drain that never recorded them are sent again
+REMINDER_SENDING_TIMEOUT = int(os.environ.get('REMINDER_SENDING_TIMEOUT', 600))  # seconds
+
+# Background jobs (admin_app/jobs.py), run by `python manage.py run_jobs`
+JOBS_POLL_INTERVAL = float(os.environ.get('JOBS_POLL_INTERVAL', 2))  # seconds
+JOBS_RETRY_BACKOFF = int(os.environ.get('JOBS_RETRY_BACKOFF', 30))  # seconds, doubled per attempt
+JOBS_RETRY_BACKOFF_MAX = int(os.environ.get('JOBS_RETRY_BACKOFF_MAX', 3600))  # seconds
+JOBS_TIMEOUT = int(os.environ.get('JOBS_TIMEOUT', 1800))  # seconds before a running job counts as abandoned
+JOBS_KEEP_DAYS = int(os.environ.get('JOBS_KEEP_DAYS', 7))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -196,6 +331,10 @@ LANGUAGE_CODE = 'en-us'
 
 TIME_ZONE = 'UTC'
 
+# Business-day boundaries for reports and analytics (see admin_app/store_time.py);
+# timestamps are still stored in UTC
+STORE_TIME_ZONE = os.environ.get('STORE_TIME_ZONE', 'Asia/Kolkata')
+
 USE_I18N = True
 
 USE_TZ = True
@@ -215,6 +354,16 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Logging (Manguva/logs.py): request threads only enqueue records; a listener
+# thread writes them as JSON (LOG_FORMAT=text for plain lines) to the console
+# and to a size-rotated file. LOG_SAMPLE_RATES keeps a fraction of the
+# sub-WARNING records of chatty loggers, e.g. "django.server=0.1".
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+# Rotating a file is only safe with a single writer; gunicorn.conf.py turns
+# the file off so forked web workers log to stdout only
+LOG_TO_FILE = os.environ.get('LOG_TO_FILE', 'True').lower() == 'true'
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -227,28 +376,51 @@ LOGGING = {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'Manguva.logs.JsonFormatter',
+        },
+    },
+    'filters': {
+        'redact': {
+            '()': 'Manguva.logs.RedactingFilter',
+            'max_length': int(os.environ.get('LOG_MAX_MESSAGE_LENGTH', 2000)),
+        },
+        'sample': {
+            '()': 'Manguva.logs.SamplingFilter',
+            'rates': os.environ.get('LOG_SAMPLE_RATES', 'django.server=0.1'),
+        },
     },
     'handlers': {
         'file': {
             'level': 'INFO',
-            'class': 'logging.FileHandler',
+            'class': 'logging.handlers.RotatingFileHandler',
             'filename': os.path.join(BASE_DIR, 'maguva.log'),
-            'formatter': 'verbose',
+            'maxBytes': int(os.environ.get('LOG_FILE_MAX_BYTES', 10 * 1024 * 1024)),
+            'backupCount': int(os.environ.get('LOG_FILE_BACKUP_COUNT', 5)),
+            'delay': True,  # not opened at all when LOG_TO_FILE is off
+            'formatter': 'json' if LOG_FORMAT == 'json' else 'verbose',
         },
         'console': {
             'class': 'logging.StreamHandler',
-            'formatter': 'simple',
+            'stream': 'ext://sys.stdout',
+            'formatter': 'json' if LOG_FORMAT == 'json' else 'simple',
+        },
+        'queue': {
+            '()': 'Manguva.logs.BackgroundQueueHandler',
+            # Resolved by dictConfig to the handlers configured above
+            'handlers': ['cfg://handlers.console'] + (['cfg://handlers.file'] if LOG_TO_FILE else []),
+            'filters': ['sample', 'redact'],
         },
     },
     'loggers': {
         'django': {
-            'handlers': ['file', 'console'],
-            'level': 'INFO',
+            'handlers': ['queue'],
+            'level': LOG_LEVEL,
             'propagate': True,
         },
         'admin_app': {  # our app logger
-            'handlers': ['file', 'console'],
-            'level': 'INFO',
+            'handlers': ['queue'],
+            'level': LOG_LEVEL,
             'propagate': False,
         },
     },
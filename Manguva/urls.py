@@ -17,6 +17,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.http import JsonResponse
+from admin_app.metrics import metrics_view
 
 def health_check(request):
     return JsonResponse({"status": "healthy", "message": "Maguva Backend is running!"})
@@ -25,5 +26,6 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('admin_app.urls')),
     path('health/', health_check, name='health_check'),
+    path('metrics', metrics_view, name='metrics'),
     path('', health_check, name='root'),  # Root endpoint for testing
 ]
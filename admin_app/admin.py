@@ -12,7 +12,8 @@ class OrderItemInline(admin.TabularInline):
         'product_name', 'sku', 'size',
         'price', 'discount_percentage', 'discount_amount',
         'quantity', 'line_total',
-        'inventory_id', 'product_id'
+        'inventory_id', 'product_id',
+        'unit_cost', 'cost_unknown', 'product_type', 'fabric_type', 'sold_at'
     )
 
 # ================
@@ -93,3 +94,29 @@ class StockBatchAdmin(admin.ModelAdmin):
     search_fields = ('product__product_type', 'product__sku')
     list_filter = ('product',)
 
+
+@admin.register(StockSnapshot)
+class StockSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('snapshot_date', 'product', 'batch', 'quantity', 'stock_value', 'units_sold')
+    list_filter = ('snapshot_date',)
+    search_fields = ('product__sku',)
+
+
+@admin.register(DailyReportArchive)
+class DailyReportArchiveAdmin(admin.ModelAdmin):
+    list_display = ('report_date', 'version', 'created_at')
+    readonly_fields = ('report_date', 'version', 'payload', 'created_at')
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('result', 'error', 'worker', 'started_at', 'finished_at', 'created_at')
+
+
+@admin.register(ReminderOutbox)
+class ReminderOutboxAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tailor_order', 'kind', 'due_date', 'recipient', 'status', 'attempts', 'sent_at')
+    list_filter = ('status', 'kind')
+    search_fields = ('recipient', 'tailor_order__order_number')
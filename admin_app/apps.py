@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save
 
 
 class AdminAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'admin_app'
+
+    def ready(self):
+        from . import authentication, rollups
+        from .models import MaguvaUsers
+
+        post_migrate.connect(rollups.ensure_relation, sender=self)
+
+        # Evict cached JWT users when their account, role or permissions change
+        post_save.connect(authentication.invalidate_user, sender=MaguvaUsers)
+        post_delete.connect(authentication.invalidate_user, sender=MaguvaUsers)
+        for relation in (MaguvaUsers.groups.through, MaguvaUsers.user_permissions.through):
+            m2m_changed.connect(authentication.invalidate_user_relations, sender=relation)
@@ -0,0 +1,196 @@
+"""
+JWT authentication with a per-process user cache.
+
+simplejwt's ``JWTAuthentication`` loads the user row on every request, so
+every barcode scan, checkout and ``auth/verify`` ping costs a query before
+the view even starts. ``CachedJWTAuthentication`` keeps the user for
+``JWT_USER_CACHE_TTL`` seconds per process.
+
+Saving, deleting or changing the groups/permissions of a user (see
+``AdminAppConfig.ready``) replaces that user's generation token in the
+default Django cache, which every worker shares when ``REDIS_URL`` is set.
+Each cached entry remembers the token it was loaded under and a hit is only
+served while the token is unchanged, so a change made in one process is seen
+by the next request in every other. That costs one cache lookup per request
+instead of a database query; if the cache is unreachable, users are loaded
+from the database.
+
+Without ``REDIS_URL`` the default cache is a per-process memory cache, so a
+token is only replaced in the process that made the change: the others keep
+serving their cached copy of the user (still active, still staff, with the
+old password) for up to ``JWT_USER_CACHE_TTL`` seconds. Keep the TTL short,
+or set ``REDIS_URL``, wherever more than one process serves requests.
+"""
+import copy
+import logging
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Generation of every user at once, replaced when a group loses all its members
+ALL_USERS = "*"
+
+
+def _generation_key(user_id):
+    return f"jwt-user-generation:{user_id}"
+
+
+class UserCache:
+    """
+    Thread-safe TTL cache of user instances keyed by user id (as a string),
+    checked against the shared generation tokens on every hit.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def generation(self, user_id):
+        """The user's and the all-users tokens, created if missing; None when the cache is unreachable."""
+        keys = [_generation_key(user_id), _generation_key(ALL_USERS)]
+        try:
+            tokens = cache.get_many(keys)
+            missing = [key for key in keys if key not in tokens]
+            if missing:
+                for key in missing:
+                    cache.add(key, uuid.uuid4().hex, timeout=None)
+                # Another process may have added its own token first
+                tokens.update(cache.get_many(missing))
+            return tuple(tokens[key] for key in keys)
+        except Exception as e:
+            logger.warning(f"JWT user cache generation unavailable: {e}")
+            return None
+
+    def get(self, user_id):
+        """Return (user or None, current generation); pass the generation to set() after a miss."""
+        if settings.JWT_USER_CACHE_TTL <= 0:
+            return None, None
+        generation = self.generation(user_id)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if (
+                entry is not None and generation is not None
+                and entry[0] > time.monotonic() and entry[1] == generation
+            ):
+                self.hits += 1
+                return entry[2], generation
+            self._entries.pop(user_id, None)
+            self.misses += 1
+            return None, generation
+
+    def set(self, user_id, user, generation):
+        if settings.JWT_USER_CACHE_TTL <= 0 or generation is None:
+            return
+        with self._lock:
+            if len(self._entries) >= settings.JWT_USER_CACHE_SIZE:
+                now = time.monotonic()
+                self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+                if len(self._entries) >= settings.JWT_USER_CACHE_SIZE:
+                    self._entries.clear()
+            self._entries[user_id] = (time.monotonic() + settings.JWT_USER_CACHE_TTL, generation, user)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+        self._bump(user_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        self._bump(ALL_USERS)
+
+    def _bump(self, user_id):
+        try:
+            cache.set(_generation_key(user_id), uuid.uuid4().hex, timeout=None)
+        except Exception as e:
+            logger.error(f"Could not invalidate cached user {user_id} in other processes: {e}")
+
+
+user_cache = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+
+        user, generation = user_cache.get(str(user_id))
+        metrics.USER_CACHE.labels("miss" if user is None else "hit").inc()
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(str(user_id), user, generation)
+        else:
+            # The checks JWTAuthentication.get_user runs, against the cached row
+            if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+                raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+            if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+        # Requests may run on several threads; each gets its own instance
+        return copy.copy(user)
+
+
+def invalidate_user(sender, instance, **kwargs):
+    user_cache.invalidate(str(instance.pk))
+
+
+def invalidate_user_relations(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if reverse:
+        # A group or permission changed; its member users are in pk_set
+        if pk_set is None:
+            user_cache.clear()
+        else:
+            for user_id in pk_set:
+                user_cache.invalidate(str(user_id))
+    else:
+        user_cache.invalidate(str(instance.pk))
+
+
+# Salt of the signed tickets that open the dashboard event stream
+STREAM_TICKET_SALT = "admin_app.dashboard-stream"
+
+
+def issue_stream_ticket(user):
+    """
+    A signed ticket naming `user`, valid once for DASHBOARD_STREAM_TICKET_TTL
+    seconds. EventSource cannot send an Authorization header, and a JWT in the
+    stream URL would end up in access logs; a ticket there is useless by the
+    time anyone reads them.
+    """
+    return signing.dumps({"user": user.pk, "nonce": uuid.uuid4().hex}, salt=STREAM_TICKET_SALT, compress=True)
+
+
+def redeem_stream_ticket(ticket):
+    """The user id in a valid, unused ticket, or None. Marks the ticket used."""
+    try:
+        payload = signing.loads(ticket, salt=STREAM_TICKET_SALT, max_age=settings.DASHBOARD_STREAM_TICKET_TTL)
+    except signing.BadSignature:
+        return None
+    try:
+        # add() only succeeds for the first redemption (across workers with REDIS_URL)
+        if not cache.add(f"stream-ticket:{payload['nonce']}", 1, timeout=settings.DASHBOARD_STREAM_TICKET_TTL + 1):
+            return None
+    except Exception as e:
+        logger.warning(f"Stream ticket cache unavailable, ticket accepted until it expires: {e}")
+    return payload["user"]
@@ -0,0 +1,234 @@
+"""
+Live dashboard events.
+
+The order and inventory write paths publish small deltas (new order totals,
+stock movements, low-stock crossings) to a channel layer, and the
+``dashboard/stream/`` endpoint relays them to connected dashboards as
+server-sent events.
+
+Two channel layers are provided:
+
+* ``InMemoryChannelLayer`` fans messages out inside the current process. It is
+  the default on SQLite and what local development and tests use.
+* ``PostgresChannelLayer`` rides on ``LISTEN/NOTIFY`` so that messages written
+  by one worker reach streams held open by another. ``NOTIFY`` is
+  transactional, so a rolled back checkout never reaches the dashboard.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.backends.postgresql.psycopg_any import is_psycopg3
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "maguva_dashboard"
+
+
+class Subscription:
+    """A single stream's view of the channel layer."""
+
+    def __init__(self, layer, maxsize=1000):
+        self.layer = layer
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def put(self, message):
+        # Runs on the subscriber's event loop
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Slow client: drop deltas and ask it to refetch the full analytics
+            self.overflowed = True
+
+    async def get(self, timeout=None):
+        if self.overflowed:
+            self.overflowed = False
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            return {"type": "resync", "data": {}}
+        return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+
+    def close(self):
+        self.layer.unsubscribe(self)
+
+
+class InMemoryChannelLayer:
+    """Process-local fan-out of dashboard messages."""
+
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def publish(self, message):
+        transaction.on_commit(lambda: self.deliver(message))
+
+    def deliver(self, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, message)
+            except RuntimeError:
+                # Event loop already closed; the stream is gone
+                self.unsubscribe(subscription)
+
+    def subscribe(self):
+        subscription = Subscription(self)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+
+class PostgresChannelLayer(InMemoryChannelLayer):
+    """Cross-process fan-out over PostgreSQL ``LISTEN/NOTIFY``."""
+
+    poll_interval = 5
+    reconnect_delay = 3
+
+    def __init__(self):
+        super().__init__()
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def publish(self, message):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [CHANNEL, json.dumps(message)])
+
+    def subscribe(self):
+        self._ensure_listener()
+        return super().subscribe()
+
+    def _ensure_listener(self):
+        # Started lazily so gunicorn's preloaded master never owns the thread
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(
+                    target=self._listen, name="dashboard-events-listener", daemon=True
+                )
+                self._listener.start()
+
+    def _listen(self):
+        while True:
+            try:
+                self._listen_once()
+            except Exception as e:
+                logger.error(f"Dashboard event listener error: {e}")
+                time.sleep(self.reconnect_delay)
+
+    def _listen_once(self):
+        db = connections["default"]
+        # A dedicated connection, never one from the pool (DB_POOL): it stays open for good
+        raw = db.Database.connect(**db.get_connection_params())
+        try:
+            raw.autocommit = True
+            with raw.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+            while True:
+                for notify in self._wait_for_notifies(raw):
+                    try:
+                        self.deliver(json.loads(notify.payload))
+                    except ValueError:
+                        logger.warning("Discarding malformed dashboard event")
+        finally:
+            raw.close()
+
+    def _wait_for_notifies(self, raw):
+        if is_psycopg3:
+            return list(raw.notifies(timeout=self.poll_interval))
+        if select.select([raw], [], [], self.poll_interval) == ([], [], []):
+            return []
+        raw.poll()
+        notifies, raw.notifies[:] = list(raw.notifies), []
+        return notifies
+
+
+_layer = None
+_layer_lock = threading.Lock()
+
+
+def get_channel_layer():
+    global _layer
+    if _layer is None:
+        with _layer_lock:
+            if _layer is None:
+                _layer = import_string(settings.DASHBOARD_EVENTS_BACKEND)()
+    return _layer
+
+
+def publish(event_type, data):
+    """Publish a dashboard delta. Never lets a broken stream fail a write."""
+    try:
+        get_channel_layer().publish({"type": event_type, "data": data})
+    except Exception as e:
+        logger.error(f"Failed to publish dashboard event {event_type}: {e}")
+
+
+def publish_order_created(order, units):
+    publish("order.created", {
+        "order_number": order.order_number,
+        "total_amount": float(order.total_amount),
+        "payment_method": order.payment_method,
+        "units": units,
+        "created_at": (order.created_at or timezone.now()).isoformat(),
+    })
+
+
+def publish_stock_changes(deltas):
+    """
+    Publish stock movements for ``{product_id: delta}`` after the stock counts
+    have been updated, flagging products that crossed the low-stock threshold.
+    """
+    from .models import Product
+
+    deltas = {pid: delta for pid, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    threshold = settings.DASHBOARD_LOW_STOCK_THRESHOLD
+    try:
+        products = Product.objects.filter(id__in=deltas).values(
+            "id", "sku", "product_type", "stock_count"
+        )
+        for product in products:
+            delta = deltas[product["id"]]
+            current = product["stock_count"]
+            previous = current - delta
+            publish("stock.changed", {
+                "product_id": product["id"],
+                "sku": product["sku"],
+                "delta": delta,
+                "stock_count": current,
+            })
+            if previous > threshold >= current:
+                state = "entered"
+            elif current > threshold >= previous:
+                state = "cleared"
+            else:
+                continue
+            publish("stock.low", {
+                "product_id": product["id"],
+                "sku": product["sku"],
+                "product_type": product["product_type"],
+                "stock_count": current,
+                "threshold": threshold,
+                "state": state,
+            })
+    except Exception as e:
+        logger.error(f"Failed to publish stock changes: {e}")
+
+
+def format_sse(message):
+    return f"event: {message['type']}\ndata: {json.dumps(message['data'])}\n\n"
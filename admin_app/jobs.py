@@ -0,0 +1,133 @@
+"""
+Background jobs on a database table.
+
+Heavy endpoints enqueue a ``Job`` and answer with its id right away, and
+``python manage.py run_jobs`` executes them outside the request cycle, so
+slow analytics never hold one of the few web workers until it times out.
+There is no broker: workers claim rows with ``SELECT ... FOR UPDATE SKIP
+LOCKED`` on PostgreSQL (several workers never pick the same job), and a
+failed job is retried with exponential backoff until ``max_attempts``.
+
+Job functions are registered with ``@job`` in ``admin_app/tasks.py``; they
+take the job's payload as keyword arguments and return a JSON-serializable
+result.
+"""
+import json
+import logging
+import os
+import socket
+import traceback
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def job(name=None, max_attempts=3):
+    """Register a function as a job, under its own name unless `name` is given."""
+    def register(func):
+        func.job_name = name or func.__name__
+        func.max_attempts = max_attempts
+        _registry[func.job_name] = func
+        return func
+    return register
+
+
+def get_task(name):
+    if name not in _registry:
+        import_module("admin_app.tasks")
+    return _registry[name]
+
+
+def enqueue(name, payload=None, user=None, run_at=None):
+    """Queue job `name` and return it. The job becomes visible once the current transaction commits."""
+    task = get_task(name)
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        max_attempts=task.max_attempts,
+        run_at=run_at or timezone.now(),
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim(worker=None):
+    """Lock the next due job, mark it running and return it (None when idle)."""
+    with transaction.atomic():
+        due = Job.objects.filter(status="queued", run_at__lte=timezone.now()).order_by("run_at", "id")
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        job = due.first()
+        if job is None:
+            return None
+        job.status = "running"
+        job.attempts += 1
+        job.started_at = timezone.now()
+        job.worker = worker or worker_name()
+        job.save(update_fields=["status", "attempts", "started_at", "worker"])
+    return job
+
+
+def backoff(attempts):
+    """Seconds to wait before retrying after the `attempts`-th failure."""
+    return min(settings.JOBS_RETRY_BACKOFF * 2 ** (attempts - 1), settings.JOBS_RETRY_BACKOFF_MAX)
+
+
+def run(job):
+    """Execute a claimed job and record its result or schedule a retry."""
+    try:
+        task = get_task(job.name)
+        # Round-trip through JSON so Decimals and dates are stored the way the API renders them
+        result = json.loads(json.dumps(task(**job.payload), cls=JSONEncoder))
+    except Exception as e:
+        job.error = traceback.format_exc()
+        job.finished_at = timezone.now()
+        if job.attempts < job.max_attempts:
+            delay = backoff(job.attempts)
+            job.status = "queued"
+            job.run_at = timezone.now() + timedelta(seconds=delay)
+            logger.warning(f"Job {job.id} ({job.name}) failed, retrying in {delay}s: {e}")
+        else:
+            job.status = "failed"
+            logger.error(f"Job {job.id} ({job.name}) failed after {job.attempts} attempts: {e}")
+    else:
+        job.status = "succeeded"
+        job.result = result
+        job.error = ""
+        job.finished_at = timezone.now()
+        logger.info(f"Job {job.id} ({job.name}) succeeded")
+    job.save(update_fields=["status", "result", "error", "run_at", "finished_at"])
+    return job
+
+
+def requeue_stale():
+    """Put back jobs whose worker died mid-run (running for longer than JOBS_TIMEOUT)."""
+    now = timezone.now()
+    stale = Job.objects.filter(status="running", started_at__lt=now - timedelta(seconds=settings.JOBS_TIMEOUT))
+    stale.filter(attempts__gte=F("max_attempts")).update(
+        status="failed", error="Worker stopped before the job finished", finished_at=now
+    )
+    return stale.update(status="queued", run_at=now)
+
+
+def purge_finished():
+    """Delete finished jobs older than JOBS_KEEP_DAYS."""
+    cutoff = timezone.now() - timedelta(days=settings.JOBS_KEEP_DAYS)
+    deleted, _ = Job.objects.filter(
+        status__in=["succeeded", "failed"], finished_at__lt=cutoff
+    ).delete()
+    return deleted
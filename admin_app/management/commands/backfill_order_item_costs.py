@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, F, Max, Min, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, NullIf
+
+from admin_app import rollups, store_time
+from admin_app.models import DailyReportArchive, Order, OrderItem, Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill unit_cost, product_type, fabric_type and sold_at on order items "
+        "sold before they were recorded at sale time. Uses the product's "
+        "current base price and types, which are the best estimate left for "
+        "historical sales. Values already present are kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Order item ids updated per statement')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        product = Product.objects.filter(id=OuterRef('product_id'))
+        order = Order.objects.filter(id=OuterRef('order_id'))
+        pending = OrderItem.objects.needs_backfill()
+
+        bounds = pending.aggregate(first=Min('id'), last=Max('id'))
+        if bounds['last'] is None:
+            self.stdout.write(self.style.SUCCESS('No order items need backfilling'))
+            return
+
+        sold_at = Coalesce(F('sold_at'), Subquery(order.values('created_at')[:1]))
+        updated = orphaned = 0
+        days = set()
+        # Id windows keep each UPDATE short so checkout is never blocked for long
+        for start in range(bounds['first'], bounds['last'] + 1, chunk_size):
+            window = pending.filter(id__gte=start, id__lt=start + chunk_size)
+            days.update(
+                window.annotate(day=store_time.trunc(Coalesce('sold_at', 'order__created_at')))
+                .values_list('day', flat=True).distinct()
+            )
+            updated += window.filter(Exists(product)).update(
+                unit_cost=Coalesce(F('unit_cost'), Subquery(product.values('base_price')[:1])),
+                product_type=Coalesce(
+                    NullIf(F('product_type'), Value('')),
+                    Subquery(product.values('product_type')[:1]),
+                    Value(''),
+                ),
+                fabric_type=Coalesce(
+                    NullIf(F('fabric_type'), Value('')),
+                    Subquery(product.values('fabric_type')[:1]),
+                    Value(''),
+                ),
+                sold_at=sold_at,
+            )
+            # Nothing left to copy a cost from; mark the item so it is not pending forever
+            orphaned += window.filter(~Exists(product)).update(
+                sold_at=sold_at,
+                cost_unknown=Q(unit_cost__isnull=True),
+            )
+            self.stdout.write(
+                f'Backfilled {updated} order items, {orphaned} of deleted products (up to id {start + chunk_size - 1})'
+            )
+
+        # Archived daily reports of these days were built without the costs
+        DailyReportArchive.objects.filter(report_date__in=days).delete()
+        # Backfilled items now count towards the sales rollup
+        rollups.refresh()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Backfilled {updated} order items'
+            + (f'; {orphaned} reference deleted products and only got their sale time' if orphaned else '')
+        ))
@@ -0,0 +1,346 @@
+import bisect
+import math
+import random
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from admin_app import rollups, store_time
+from admin_app.models import Inventory, Order, OrderItem, Product, StockBatch, Vendor
+
+# (type, fabrics, base price range in rupees, sizes, popularity)
+CATALOGUE = [
+    ('Kurti', ['Cotton', 'Rayon', 'Silk', 'Georgette'], (400, 2500), True, 30),
+    ('Saree', ['Silk', 'Cotton', 'Georgette', 'Chiffon'], (1200, 15000), False, 18),
+    ('Lehenga', ['Silk', 'Georgette', 'Crepe'], (3000, 25000), True, 4),
+    ('Dress', ['Cotton', 'Crepe', 'Polyester'], (800, 4000), True, 10),
+    ('Top', ['Cotton', 'Polyester', 'Rayon'], (300, 1500), True, 12),
+    ('Bottom', ['Cotton', 'Linen', 'Mixed'], (400, 1500), True, 8),
+    ('Dupatta', ['Chiffon', 'Silk', 'Cotton'], (300, 1500), False, 5),
+    ('Accessories', ['Other', 'Mixed'], (100, 1000), False, 4),
+    ('Nighty', ['Cotton', 'Rayon'], (300, 900), True, 4),
+    ('Chudidar', ['Cotton', 'Rayon', 'Silk'], (600, 2500), True, 3),
+    ('Blouse', ['Silk', 'Cotton', 'Polyester'], (300, 1500), True, 2),
+]
+FESTIVE_TYPES = {'Saree', 'Lehenga', 'Dupatta', 'Blouse'}
+SIZES = ['S', 'M', 'L', 'XL', 'XXL']
+SIZED_TYPES = {entry[0] for entry in CATALOGUE if entry[3]}
+CITIES = [
+    ('Mumbai', 'Maharashtra'), ('Surat', 'Gujarat'), ('Jaipur', 'Rajasthan'), ('Bangalore', 'Karnataka'),
+    ('Chennai', 'Tamil Nadu'), ('Kolkata', 'West Bengal'), ('Hyderabad', 'Telangana'), ('Varanasi', 'Uttar Pradesh'),
+]
+NAMES = ['Anita', 'Kavya', 'Ritu', 'Deepika', 'Meera', 'Priya', 'Sneha', 'Lakshmi', 'Divya', 'Pooja']
+
+# Sales multipliers by calendar month: festive season (Sep-Nov), weddings
+# (Dec-Feb), summer sales (Apr-May) and the monsoon lull (Jul)
+MONTH_FACTOR = {1: 1.2, 2: 1.2, 3: 0.9, 4: 1.1, 5: 1.1, 6: 0.9, 7: 0.7, 8: 0.9, 9: 1.2, 10: 1.8, 11: 1.6, 12: 1.3}
+WEEKDAY_FACTOR = [0.8, 0.8, 0.85, 0.9, 1.0, 1.4, 1.5]
+# Store hours and relative footfall per hour
+HOURS = list(range(10, 21))
+HOUR_WEIGHTS = [2, 4, 5, 5, 4, 4, 5, 7, 9, 8, 5]
+
+
+@contextmanager
+def without_auto_now_add(*fields):
+    """bulk_create stamps auto_now_add fields with now(); keep the generated dates instead."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill an empty database with a deterministic, production-sized dataset for "
+        "benchmarking: vendors, products, stock batches, unsold inventory units and "
+        "years of orders with weekly and seasonal patterns. The same --seed and "
+        "--end-date always produce the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--vendors', type=int, default=40)
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--inventory-units', type=int, default=500_000,
+                            help='Unsold units in stock at the end date')
+        parser.add_argument('--order-items', type=int, default=2_000_000)
+        parser.add_argument('--years', type=float, default=3)
+        parser.add_argument('--end-date', help='Last sale day as YYYY-MM-DD (default: today in the store time zone)')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per bulk insert')
+
+    def handle(self, *args, **options):
+        if Product.objects.exists() or Order.objects.exists():
+            raise CommandError('Run this on an empty database; products or orders already exist')
+        if options['end_date']:
+            try:
+                end_date = datetime.strptime(options['end_date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Date must be in YYYY-MM-DD format')
+        else:
+            end_date = store_time.today()
+
+        self.rng = random.Random(options['seed'])
+        self.chunk_size = options['chunk_size']
+        self.start_date = end_date - timedelta(days=int(options['years'] * 365))
+        self.end_date = end_date
+        self.tz = store_time.store_timezone()
+        started = time.monotonic()
+
+        vendors = self.create_vendors(options['vendors'])
+        products = self.create_products(options['products'], vendors)
+        batches = self.create_batches(products)
+        # Skewed popularity: a few best sellers, a long tail
+        popularity = [self.rng.paretovariate(1.2) for _ in products]
+        sold = self.create_orders(products, batches, popularity, options['order_items'])
+        in_stock = self.create_inventory(products, batches, popularity, options['inventory_units'])
+        self.settle_stock(products, batches, sold, in_stock)
+
+        self.stdout.write('Refreshing the sales rollup...')
+        rollups.refresh()
+        self.stdout.write(self.style.SUCCESS(f'Done in {time.monotonic() - started:.0f}s'))
+
+    def at(self, day, hour, minute=0, second=0):
+        return datetime(day.year, day.month, day.day, hour, minute, second, tzinfo=self.tz)
+
+    def progress(self, label, done, total, started):
+        rate = done / max(time.monotonic() - started, 1e-6)
+        self.stdout.write(f'{label}: {done:,}/{total:,} ({rate:,.0f}/s)')
+
+    def create_vendors(self, count):
+        vendors = []
+        for i in range(count):
+            city, state = self.rng.choice(CITIES)
+            vendors.append(Vendor(
+                vendor_name=f'{city} Textiles {i + 1}',
+                contact_person_name=self.rng.choice(NAMES),
+                phone=f'+91-9{self.rng.randrange(10 ** 9):09d}',
+                email=f'vendor{i + 1}@example.com',
+                street=f'{self.rng.randint(1, 500)} Market Road',
+                city=city,
+                state=state,
+                zip_code=f'{self.rng.randint(110000, 700000)}',
+                country='India',
+            ))
+        vendors = Vendor.objects.bulk_create(vendors)
+        self.stdout.write(f'Vendors: {len(vendors):,}')
+        return vendors
+
+    def create_products(self, count, vendors):
+        types = [entry[0] for entry in CATALOGUE]
+        type_weights = [entry[4] for entry in CATALOGUE]
+        catalogue = {entry[0]: entry for entry in CATALOGUE}
+        products = []
+        for i in range(count):
+            product_type = self.rng.choices(types, type_weights)[0]
+            _, fabrics, (low, high), _, _ = catalogue[product_type]
+            # Log-uniform prices: many cheap pieces, a few expensive ones
+            base = int(math.exp(self.rng.uniform(math.log(low), math.log(high))) // 10 * 10)
+            products.append(Product(
+                vendor=vendors[i % len(vendors)],
+                product_type=product_type,
+                fabric_type=self.rng.choice(fabrics),
+                color_code=f'#{self.rng.randrange(0x1000000):06X}',
+                base_price=Decimal(base),
+                markup_price=Decimal(base * 5 // 4),
+                mrp=Decimal(base * 3 // 2 // 10 * 10),
+                discount_percentage=Decimal(self.rng.choice([0, 0, 5, 10, 15])),
+                sku=f'{product_type[:3].upper()}-{i:04d}',
+            ))
+        products = Product.objects.bulk_create(products, batch_size=self.chunk_size)
+        self.stdout.write(f'Products: {len(products):,}')
+        return products
+
+    def create_batches(self, products):
+        """A restock every 2-6 months per product. Returns {product_id: (dates, batches)}."""
+        batches = []
+        for product in products:
+            day = self.start_date - timedelta(days=self.rng.randint(1, 30))
+            number = 1
+            while day <= self.end_date:
+                batches.append(StockBatch(
+                    product=product, vendor_id=product.vendor_id, batch_number=number,
+                    added_qty=0, created_at=self.at(day, 9),
+                ))
+                day += timedelta(days=self.rng.randint(60, 180))
+                number += 1
+        with without_auto_now_add(StockBatch._meta.get_field('created_at')):
+            batches = StockBatch.objects.bulk_create(batches, batch_size=self.chunk_size)
+
+        by_product = {}
+        for batch in batches:
+            dates, rows = by_product.setdefault(batch.product_id, ([], []))
+            dates.append(batch.created_at.date())
+            rows.append(batch)
+        self.stdout.write(f'Stock batches: {len(batches):,}')
+        return by_product
+
+    def daily_item_counts(self, total):
+        """Spread `total` order items over the days by weekday, month and yearly growth."""
+        days = (self.end_date - self.start_date).days + 1
+        weights = []
+        for offset in range(days):
+            day = self.start_date + timedelta(days=offset)
+            growth = 1 + 0.2 * offset / 365
+            noise = self.rng.lognormvariate(0, 0.25)
+            weights.append(MONTH_FACTOR[day.month] * WEEKDAY_FACTOR[day.weekday()] * growth * noise)
+        scale = total / sum(weights)
+        counts, carry = [], 0.0
+        for weight in weights:
+            carry += weight * scale
+            counts.append(int(carry))
+            carry -= int(carry)
+        counts[-1] += total - sum(counts)
+        return [(self.start_date + timedelta(days=offset), n) for offset, n in enumerate(counts)]
+
+    def create_orders(self, products, batches, popularity, total_items):
+        """Orders with 1-5 items each; festive types sell more in Sep-Nov. Returns units sold per batch id."""
+        cum_normal = list(_cumulative(popularity))
+        cum_festive = list(_cumulative(
+            p * (2.5 if product.product_type in FESTIVE_TYPES else 1) for p, product in zip(popularity, products)
+        ))
+
+        sold = Counter()
+        pending_orders, pending_items = [], []
+        pending_count = created_items = 0
+        order_number = 0
+        inventory_id = 10_000_000  # sold units no longer exist; keep their ids clear of live ones
+        started = time.monotonic()
+
+        for day, items_today in self.daily_item_counts(total_items):
+            cum_weights = cum_festive if day.month in (9, 10, 11) else cum_normal
+            while items_today > 0:
+                lines = min(items_today, self.rng.choices([1, 2, 3, 4, 5], [45, 30, 15, 7, 3])[0])
+                items_today -= lines
+                created_at = self.at(
+                    day, self.rng.choices(HOURS, HOUR_WEIGHTS)[0], self.rng.randrange(60), self.rng.randrange(60)
+                )
+                order_items = []
+                for product in self.rng.choices(products, cum_weights=cum_weights, k=lines):
+                    dates, rows = batches[product.id]
+                    batch = rows[max(bisect.bisect_right(dates, day) - 1, 0)]
+                    quantity = 1 if self.rng.random() < 0.9 else 2
+                    price = product.mrp
+                    discount = product.discount_percentage if self.rng.random() < 0.6 else Decimal(0)
+                    discount_amount = price * discount / 100
+                    inventory_id += 1
+                    sold[batch.id] += quantity
+                    order_items.append(OrderItem(
+                        product_name=f'{product.product_type} - {product.fabric_type}',
+                        sku=f'{product.sku}-{self.rng.choice(SIZES)}',
+                        price=price,
+                        discount_percentage=discount,
+                        discount_amount=discount_amount,
+                        quantity=quantity,
+                        line_total=(price - discount_amount) * quantity,
+                        inventory_id=inventory_id,
+                        product_id=product.id,
+                        batch=batch,
+                        unit_cost=product.base_price,
+                        product_type=product.product_type,
+                        fabric_type=product.fabric_type,
+                        sold_at=created_at,
+                    ))
+
+                # Totals as CreateOrderView computes them
+                subtotal = sum(item.price * item.quantity for item in order_items)
+                discount_total = sum(item.discount_amount * item.quantity for item in order_items)
+                gst_amount = round((subtotal - discount_total) * Decimal('0.18'), 2)
+                total_amount = subtotal - discount_total + gst_amount
+                order_number += 1
+                pending_orders.append(Order(
+                    order_number=f'B{order_number:09d}',
+                    customer_name=self.rng.choice(NAMES),
+                    customer_mobile=f'9{self.rng.randrange(10 ** 9):09d}',
+                    subtotal=subtotal,
+                    discount_total=discount_total,
+                    gst_amount=gst_amount,
+                    total_amount=total_amount,
+                    payment_method=self.rng.choices(['upi', 'cash', 'card'], [55, 30, 15])[0],
+                    payment_amount=total_amount,
+                    created_at=created_at,
+                ))
+                pending_items.append(order_items)
+                pending_count += lines
+
+                if pending_count >= self.chunk_size:
+                    created_items += self.flush_orders(pending_orders, pending_items)
+                    pending_count = 0
+                    self.progress('Order items', created_items, total_items, started)
+
+        if pending_orders:
+            created_items += self.flush_orders(pending_orders, pending_items)
+        self.progress('Order items', created_items, total_items, started)
+        self.stdout.write(f'Orders: {order_number:,}')
+        return sold
+
+    def flush_orders(self, orders, items_per_order):
+        with transaction.atomic(), without_auto_now_add(Order._meta.get_field('created_at')):
+            Order.objects.bulk_create(orders)
+            items = []
+            for order, order_items in zip(orders, items_per_order):
+                for item in order_items:
+                    item.order = order
+                    items.append(item)
+            OrderItem.objects.bulk_create(items, batch_size=self.chunk_size)
+        orders.clear()
+        items_per_order.clear()
+        return len(items)
+
+    def create_inventory(self, products, batches, popularity, total_units):
+        """Unsold units, in each product's latest batch. Returns units per batch id."""
+        weights = [math.sqrt(p) for p in popularity]
+        per_product = Counter(p.id for p in self.rng.choices(products, weights, k=total_units))
+        in_stock = Counter()
+        created = 0
+        started = time.monotonic()
+        pending = []
+        for product in products:
+            batch = batches[product.id][1][-1]
+            sized = product.product_type in SIZED_TYPES
+            for _ in range(per_product[product.id]):
+                created += 1
+                size = self.rng.choice(SIZES) if sized else ''
+                pending.append(Inventory(
+                    product=product, batch=batch, size=size,
+                    sku=f'{product.sku}-{size}-{product.color_code[1:]}-{created:07d}',
+                    barcode=f'BC-{created:010d}',
+                ))
+                in_stock[batch.id] += 1
+                if len(pending) >= self.chunk_size:
+                    Inventory.objects.bulk_create(pending)
+                    pending.clear()
+                    self.progress('Inventory units', created, total_units, started)
+        Inventory.objects.bulk_create(pending)
+        self.progress('Inventory units', created, total_units, started)
+        return in_stock
+
+    def settle_stock(self, products, batches, sold, in_stock):
+        """Batch counters and product stock consistent with what was sold and what is left."""
+        rows = [batch for _, product_batches in batches.values() for batch in product_batches]
+        for batch in rows:
+            batch.sold_qty = sold[batch.id]
+            batch.added_qty = sold[batch.id] + in_stock[batch.id]
+        StockBatch.objects.bulk_update(rows, ['added_qty', 'sold_qty'], batch_size=self.chunk_size)
+
+        stock = Counter()
+        for batch in rows:
+            stock[batch.product_id] += in_stock[batch.id]
+        for product in products:
+            product.stock_count = stock[product.id]
+        Product.objects.bulk_update(products, ['stock_count'], batch_size=self.chunk_size)
+        self.stdout.write('Stock counts settled')
+
+
+def _cumulative(weights):
+    total = 0.0
+    for weight in weights:
+        total += weight
+        yield total
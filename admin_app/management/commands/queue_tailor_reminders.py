@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from admin_app import reminders
+
+
+class Command(BaseCommand):
+    help = (
+        "Queue customer reminders for tailor orders due soon or overdue with a balance. "
+        "Schedule daily, followed by `python manage.py send_reminders`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Treat this YYYY-MM-DD as today (default: today in the store time zone)')
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Date must be in YYYY-MM-DD format')
+
+        due = reminders.queue_due_reminders(today)
+        self.stdout.write(self.style.SUCCESS(
+            f'Found {due} due orders; reminders already queued for a due date are kept'
+        ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from admin_app import rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh the precomputed sales rollup used by analytics "
+        "(materialized view on PostgreSQL, summary table on SQLite)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Drop and recreate the rollup, e.g. after changing STORE_TIME_ZONE')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            rollups.drop_relation()
+        if not rollups.relation_exists():
+            rollups.ensure_relation()
+            self.stdout.write(self.style.SUCCESS('Created sales rollup'))
+        rollups.refresh()
+        self.stdout.write(self.style.SUCCESS('Sales rollup refreshed'))
@@ -0,0 +1,62 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from admin_app import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background jobs (reports, analytics). Start one or more "
+        "workers next to the web process, e.g. `worker: python manage.py run_jobs`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once no job is due instead of polling')
+        parser.add_argument('--max-jobs', type=int, default=0,
+                            help='Exit after running this many jobs (0: no limit)')
+        parser.add_argument('--sleep', type=float, default=None,
+                            help='Seconds between polls when idle (default: JOBS_POLL_INTERVAL)')
+
+    def handle(self, *args, **options):
+        sleep = options['sleep'] if options['sleep'] is not None else settings.JOBS_POLL_INTERVAL
+        worker = jobs.worker_name()
+        self.stopping = False
+
+        def stop(signum, frame):
+            # Let the running job finish, then exit
+            self.stopping = True
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        self.stdout.write(f'Job worker {worker} started')
+        processed = 0
+        last_housekeeping = 0
+        while not self.stopping:
+            close_old_connections()
+            if time.monotonic() - last_housekeeping > 300:
+                requeued = jobs.requeue_stale()
+                if requeued:
+                    self.stdout.write(f'Requeued {requeued} stale jobs')
+                jobs.purge_finished()
+                last_housekeeping = time.monotonic()
+
+            job = jobs.claim(worker)
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(sleep)
+                continue
+
+            job = jobs.run(job)
+            processed += 1
+            self.stdout.write(f'Job {job.id} ({job.name}): {job.status}')
+            if options['max_jobs'] and processed >= options['max_jobs']:
+                break
+
+        self.stdout.write(self.style.SUCCESS(f'Job worker {worker} stopped after {processed} jobs'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from admin_app import reminders
+
+
+class Command(BaseCommand):
+    help = "Send pending reminders from the outbox in batches through REMINDER_SENDER."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Reminders per sender call (default: REMINDER_BATCH_SIZE)')
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Stop after this many reminders')
+
+    def handle(self, *args, **options):
+        sent, failed = reminders.drain(options['batch_size'], options['limit'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Sent {sent} reminders' + (f'; {failed} failed and will be retried' if failed else '')
+        ))
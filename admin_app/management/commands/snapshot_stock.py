@@ -0,0 +1,106 @@
+from datetime import datetime
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+
+from admin_app import store_time
+from admin_app.models import StockBatch, StockSnapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Record the end-of-day stock position per product and batch. "
+        "Schedule once a day (e.g. a Railway cron running `python manage.py snapshot_stock`)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Snapshot date as YYYY-MM-DD (default: today in the store time zone)')
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                snapshot_date = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Date must be in YYYY-MM-DD format')
+        else:
+            snapshot_date = store_time.today()
+
+        if StockSnapshot.objects.filter(snapshot_date__gt=snapshot_date).exists():
+            raise CommandError(f'Snapshots newer than {snapshot_date} already exist')
+
+        # Live batch counters, one query
+        batches = StockBatch.objects.values(
+            'id', 'product_id', 'added_qty', 'sold_qty', 'created_at', unit_cost=F('product__base_price')
+        )
+
+        # Latest earlier snapshot of each batch. Only batches that were still
+        # live on the previous snapshot date appear there; batches that sold
+        # out earlier and were restocked since are looked up separately.
+        previous_date = (
+            StockSnapshot.objects.filter(snapshot_date__lt=snapshot_date)
+            .order_by('-snapshot_date')
+            .values_list('snapshot_date', flat=True)
+            .first()
+        )
+        previous = {}
+        if previous_date:
+            previous = {
+                row['batch_id']: row
+                for row in StockSnapshot.objects.filter(snapshot_date=previous_date)
+                .values('batch_id', 'added_qty', 'sold_qty')
+            }
+
+        def is_live(b):
+            if b['added_qty'] > b['sold_qty']:
+                return True
+            prev = previous.get(b['id'])
+            if prev is not None:
+                # Sold out: keep writing rows until the zero position is recorded
+                return (prev['added_qty'], prev['sold_qty']) != (b['added_qty'], b['sold_qty'])
+            # Received and sold out since the last run
+            return previous_date is not None and store_time.local_date(b['created_at']) > previous_date
+
+        live = [b for b in batches if is_live(b)]
+        missing = [b['id'] for b in live if b['id'] not in previous]
+        if previous_date and missing:
+            for row in (
+                StockSnapshot.objects.filter(batch_id__in=missing, snapshot_date__lt=snapshot_date)
+                .order_by('batch_id', '-snapshot_date')
+                .values('batch_id', 'added_qty', 'sold_qty')
+            ):
+                previous.setdefault(row['batch_id'], row)
+
+        rows = []
+        for b in live:
+            if previous_date is None:
+                # First run is the baseline: no movement is attributed to it
+                prev = b
+            else:
+                prev = previous.get(b['id'], {'added_qty': 0, 'sold_qty': 0})
+            quantity = max(b['added_qty'] - b['sold_qty'], 0)
+            unit_cost = b['unit_cost'] or Decimal('0')
+            units_sold = max(b['sold_qty'] - prev['sold_qty'], 0)
+            rows.append(StockSnapshot(
+                snapshot_date=snapshot_date,
+                product_id=b['product_id'],
+                batch_id=b['id'],
+                added_qty=b['added_qty'],
+                sold_qty=b['sold_qty'],
+                quantity=quantity,
+                unit_cost=unit_cost,
+                stock_value=unit_cost * quantity,
+                units_added=max(b['added_qty'] - prev['added_qty'], 0),
+                units_sold=units_sold,
+                sold_value=unit_cost * units_sold,
+            ))
+
+        with transaction.atomic():
+            # Re-running for the same day replaces that day's rows
+            StockSnapshot.objects.filter(snapshot_date=snapshot_date).delete()
+            StockSnapshot.objects.bulk_create(rows, batch_size=1000)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Recorded {len(rows)} batch snapshots for {snapshot_date}'
+        ))
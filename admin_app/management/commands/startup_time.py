@@ -0,0 +1,58 @@
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# What a gunicorn worker does before it can answer: configure Django, load
+# the apps, build the URLconf (importing every view) and the ASGI handler
+BOOT = """
+import os, time
+started = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Manguva.settings')
+from Manguva.asgi import application
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(time.perf_counter() - started)
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure how long the app takes to boot in a fresh interpreter "
+        "(settings, app registry, URLconf and ASGI application)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters to time')
+        parser.add_argument('--imports', type=int, default=0,
+                            help='Also list the N slowest imports (python -X importtime)')
+
+    def run_boot(self, *flags):
+        return subprocess.run(
+            [sys.executable, *flags, '-c', BOOT],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+
+    def handle(self, *args, **options):
+        timings = [float(self.run_boot().stdout.strip()) for _ in range(options['runs'])]
+        self.stdout.write(self.style.SUCCESS(
+            f"Boot time over {len(timings)} runs: "
+            f"min {min(timings) * 1000:.0f} ms, median {statistics.median(timings) * 1000:.0f} ms, "
+            f"max {max(timings) * 1000:.0f} ms"
+        ))
+
+        if options['imports']:
+            # importtime lines: "import time: self [us] | cumulative | imported package"
+            imports = []
+            for line in self.run_boot('-X', 'importtime').stderr.splitlines():
+                if not line.startswith('import time:') or 'cumulative' in line:
+                    continue
+                _, cumulative, name = line[len('import time:'):].split('|')
+                # Nested imports are indented below the module that pulled them in
+                if name[1:2] != ' ':
+                    imports.append((int(cumulative), name.strip()))
+            self.stdout.write("Slowest top-level imports (cumulative):")
+            for us, name in sorted(imports, reverse=True)[:options['imports']]:
+                self.stdout.write(f"  {us / 1000:8.1f} ms  {name}")
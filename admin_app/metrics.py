@@ -0,0 +1,84 @@
+"""
+Prometheus metrics, served at ``/metrics``.
+
+Under gunicorn every worker is a separate process, so an in-memory registry
+would only report whichever worker answered the scrape. ``gunicorn.conf.py``
+sets ``PROMETHEUS_MULTIPROC_DIR``: each worker then writes its samples to
+files there, named by worker slot, and ``metrics_view`` merges them.
+Without the variable (runserver, tests, the job worker) the default process
+registry is used.
+
+``/metrics`` requires ``METRICS_TOKEN`` as a bearer token; without one it
+is only served when ``DEBUG`` is on.
+
+Request metrics are labelled by URL route (``api/vendors/<int:pk>/``) to
+keep the number of series bounded. Rates are left to PromQL, e.g. orders
+per minute is ``rate(maguva_orders_created_total[5m]) * 60``.
+"""
+import os
+
+from django.conf import settings
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess,
+)
+
+REQUESTS = Counter(
+    "maguva_http_requests_total", "HTTP requests by route, method and status",
+    ["view", "method", "status"],
+)
+LATENCY = Histogram(
+    "maguva_http_request_duration_seconds", "Time spent answering a request",
+    ["view", "method"],
+)
+QUERIES = Histogram(
+    "maguva_http_request_db_queries", "SQL queries issued per request",
+    ["view", "method"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250, float("inf")),
+)
+DB_TIME = Histogram(
+    "maguva_http_request_db_seconds", "Time spent in SQL per request",
+    ["view", "method"],
+)
+
+ORDERS = Counter("maguva_orders_created_total", "Orders committed at checkout")
+ORDER_ITEMS = Counter("maguva_order_items_sold_total", "Units sold at checkout")
+CHECKOUT_FAILURES = Counter(
+    "maguva_checkout_failures_total", "Checkouts rolled back, by exception type", ["reason"],
+)
+USER_CACHE = Counter(
+    "maguva_jwt_user_cache_lookups_total", "JWT user cache lookups on authenticated requests", ["result"],
+)
+
+
+def observe_request(request, response, seconds, query_stats):
+    match = getattr(request, "resolver_match", None)
+    view = match.route if match else "unmatched"
+    REQUESTS.labels(view, request.method, response.status_code).inc()
+    LATENCY.labels(view, request.method).observe(seconds)
+    QUERIES.labels(view, request.method).observe(query_stats.count)
+    DB_TIME.labels(view, request.method).observe(query_stats.duration)
+
+
+def order_created(units):
+    ORDERS.inc()
+    ORDER_ITEMS.inc(units)
+
+
+def checkout_failed(exc):
+    CHECKOUT_FAILURES.labels(type(exc).__name__).inc()
+
+
+def metrics_view(request):
+    if not settings.METRICS_TOKEN:
+        # Open only in development; production needs a token to expose anything
+        if not settings.DEBUG:
+            return HttpResponse(status=404)
+    elif request.headers.get("Authorization") != f"Bearer {settings.METRICS_TOKEN}":
+        return HttpResponse(status=401)
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
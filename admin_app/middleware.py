@@ -0,0 +1,98 @@
+"""
+Per-request SQL and timing instrumentation.
+
+``QueryInstrumentationMiddleware`` installs a ``connection.execute_wrapper``
+for the duration of each request, counting queries and database time and
+grouping statements by fingerprint (the SQL with its literals replaced by
+``?``). Every response carries a ``Server-Timing`` header with the totals,
+which browser dev tools show next to the request.
+
+Requests slower than ``REQUEST_SLOW_MS`` or issuing more than
+``REQUEST_MAX_QUERIES`` queries are logged with their most repeated
+fingerprints; a statement run once per row of a loop (an N+1) shows up
+there with a count equal to the number of rows. The same numbers feed the
+per-route Prometheus histograms in ``metrics``.
+"""
+import logging
+import re
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """``SELECT ... WHERE id IN (1, 2, 3) AND name = 'x'`` -> ``... IN (...) AND name = ?``."""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = sql.replace("%s", "?")
+    sql = _IN_LIST.sub("(...)", sql)
+    return _SPACES.sub(" ", sql).strip()
+
+
+class QueryStats:
+    """Queries seen by one request: count, total time and time per fingerprint."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = defaultdict(lambda: [0, 0.0])
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.duration += elapsed
+            entry = self.fingerprints[fingerprint(sql)]
+            entry[0] += 1
+            entry[1] += elapsed
+
+    def top(self, limit=5):
+        """The most repeated fingerprints as (count, milliseconds, sql)."""
+        ranked = sorted(self.fingerprints.items(), key=lambda item: (-item[1][0], -item[1][1]))
+        return [(count, round(seconds * 1000, 1), sql) for sql, (count, seconds) in ranked[:limit]]
+
+
+class QueryInstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        request.query_stats = stats
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(stats))
+            response = self.get_response(request)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        db_ms = stats.duration * 1000
+        metrics.observe_request(request, response, elapsed_ms / 1000, stats)
+
+        if settings.SERVER_TIMING_HEADER:
+            response["Server-Timing"] = (
+                f'db;dur={db_ms:.1f};desc="{stats.count} queries", '
+                f"app;dur={elapsed_ms - db_ms:.1f}, total;dur={elapsed_ms:.1f}"
+            )
+
+        if elapsed_ms > settings.REQUEST_SLOW_MS or stats.count > settings.REQUEST_MAX_QUERIES:
+            top = "; ".join(f"{count}x {ms}ms {sql[:300]}" for count, ms, sql in stats.top())
+            logger.warning(
+                f"Slow request {request.method} {request.path} -> {response.status_code}: "
+                f"{elapsed_ms:.0f}ms, {stats.count} queries in {db_ms:.0f}ms. Top queries: {top}"
+            )
+        return response
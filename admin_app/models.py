@@ -3,6 +3,7 @@ from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, Permis
 from django.utils.crypto import get_random_string
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
+from django.db.models.functions import Coalesce
 from uuid import uuid4
 
 
@@ -163,9 +164,50 @@ class StockBatch(models.Model):
         return f"{self.product.product_type} | Batch {self.batch_number} | Available {self.available_qty}"
 
 
+class StockSnapshot(models.Model):
+    """
+    End-of-day stock position of a batch, written by the snapshot_stock command.
+    Sold-out batches stop getting rows once a zero row has been recorded.
+    """
+    snapshot_date = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="snapshots")
+    batch = models.ForeignKey(StockBatch, on_delete=models.CASCADE, related_name="snapshots")
+
+    # Cumulative batch counters at snapshot time
+    added_qty = models.PositiveIntegerField()
+    sold_qty = models.PositiveIntegerField()
+    quantity = models.PositiveIntegerField()  # available units
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2)
+    stock_value = models.DecimalField(max_digits=14, decimal_places=2)
+
+    # Movement since the batch's previous snapshot
+    units_added = models.PositiveIntegerField(default=0)
+    units_sold = models.PositiveIntegerField(default=0)
+    sold_value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('snapshot_date', 'batch')
+        indexes = [
+            models.Index(fields=['snapshot_date', 'product'], name='stocksnapshot_date_product'),
+        ]
+
+    def __str__(self):
+        return f"{self.snapshot_date} | Batch {self.batch_id} | {self.quantity} units"
+
+
 def generate_order_code(length=10):
     return get_random_string(length=length)
 
+class OrderQuerySet(models.QuerySet):
+    def summary(self):
+        """Orders annotated with their item and unit counts and the creator's name."""
+        return self.annotate(
+            items_count=models.Count('items'),
+            units_count=Coalesce(models.Sum('items__quantity'), 0),
+            created_by_name=models.F('created_by__name'),
+        )
+
+
 class Order(models.Model):
     order_number = models.CharField(default=generate_order_code, editable=False, unique=True, max_length=10)
     customer_name = models.CharField(max_length=255, blank=True)
@@ -183,6 +225,8 @@ class Order(models.Model):
     created_by = models.ForeignKey(MaguvaUsers, on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = OrderQuerySet.as_manager()
+
     @property
     def short_order_number(self):
         return str(self.order_number).replace("-", "")[:10].upper()
@@ -191,6 +235,24 @@ class Order(models.Model):
         return f"Order #{self.order_number}"
 
 
+class OrderItemQuerySet(models.QuerySet):
+    def sold_between(self, start, end):
+        """
+        Items sold in [start, end). Rows written before sold_at existed fall
+        back to their order's time until backfill_order_item_costs fills them.
+        """
+        return self.filter(
+            models.Q(sold_at__gte=start, sold_at__lt=end)
+            | models.Q(sold_at__isnull=True, order__created_at__gte=start, order__created_at__lt=end)
+        )
+
+    def needs_backfill(self):
+        """Items backfill_order_item_costs can still complete."""
+        return self.filter(
+            models.Q(sold_at__isnull=True) | models.Q(unit_cost__isnull=True, cost_unknown=False)
+        )
+
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, related_name="items", on_delete=models.CASCADE)
     
@@ -209,10 +271,73 @@ class OrderItem(models.Model):
     product_id = models.PositiveIntegerField()
     batch = models.ForeignKey(StockBatch, on_delete=models.SET_NULL, null=True, blank=True)
 
+    # Snapshotted at sale time; product prices and types may change later
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    # Set by the backfill when the product was deleted first: unit_cost stays NULL for good
+    cost_unknown = models.BooleanField(default=False)
+    product_type = models.CharField(max_length=50, blank=True, default='')
+    fabric_type = models.CharField(max_length=50, blank=True, default='')
+    # Copy of order.created_at so category reports never join Order
+    sold_at = models.DateTimeField(null=True, blank=True)
+
+    objects = OrderItemQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sold_at', 'product_type', 'fabric_type'], name='orderitem_sold_category'),
+        ]
+
     def __str__(self):
         return f"{self.product_name} ({self.sku})"
 
 
+class SalesRollup(models.Model):
+    """
+    Units and revenue per sale day, vendor, product and batch. Read-only:
+    a materialized view on PostgreSQL and a summary table elsewhere, both
+    built and refreshed by admin_app.rollups.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    sale_date = models.DateField()
+    vendor = models.ForeignKey(Vendor, on_delete=models.DO_NOTHING, null=True, db_constraint=False, related_name='+')
+    product = models.ForeignKey(Product, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    product_type = models.CharField(max_length=50, null=True)
+    batch = models.ForeignKey(StockBatch, on_delete=models.DO_NOTHING, null=True, db_constraint=False, related_name='+')
+    units = models.BigIntegerField()
+    revenue = models.DecimalField(max_digits=14, decimal_places=2)
+
+    class Meta:
+        managed = False
+        db_table = 'admin_app_salesrollup'
+        indexes = [
+            models.Index(fields=['sale_date'], name='salesrollup_date'),
+            models.Index(fields=['vendor', 'sale_date'], name='salesrollup_vendor_date'),
+        ]
+
+
+class DailyReportArchive(models.Model):
+    """
+    Rendered daily report of a closed store day. Rows with an older version
+    than SCHEMA_VERSION are rebuilt on their next read; backfills delete the
+    rows of the days they change.
+    """
+    # Bump when the report payload changes shape or meaning
+    SCHEMA_VERSION = 2
+
+    report_date = models.DateField(unique=True)
+    version = models.PositiveIntegerField(default=1)
+    payload = models.TextField()  # compact JSON, served as-is
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def etag(self):
+        return f'"{self.report_date:%Y%m%d}-v{self.version}-{self.updated_at.timestamp():.0f}"'
+
+    def __str__(self):
+        return f"Daily report {self.report_date}"
+
+
 class TailorOrder(models.Model):
     order_number = models.CharField(max_length=8, unique=True, editable=False)
 
@@ -238,6 +363,12 @@ class TailorOrder(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Workload calendar: open orders by delivery date
+            models.Index(fields=["status", "delivery_date"], name="tailororder_status_delivery"),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.order_number:
             self.order_number = generate_order_code(length=8)
@@ -259,3 +390,80 @@ class TailorOrderItemDetail(models.Model):
         return f"{self.item_name} x{self.quantity} for Order {self.tailor_order.order_number}"
 
 
+
+
+class ReminderOutbox(models.Model):
+    """
+    A customer reminder waiting to be sent (or already sent). Queued by
+    `queue_tailor_reminders`, delivered by `send_reminders`; see admin_app.reminders.
+    """
+    KIND_CHOICES = [
+        ("due_soon", "Due soon"),
+        ("overdue", "Overdue with balance"),
+    ]
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("sending", "Sending"),
+        ("sent", "Sent"),
+        ("failed", "Failed"),
+    ]
+
+    tailor_order = models.ForeignKey(TailorOrder, related_name="reminders", on_delete=models.CASCADE)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # Delivery date the reminder is about; a rescheduled order gets a new reminder
+    due_date = models.DateField()
+    recipient = models.CharField(max_length=15)
+    message = models.TextField()
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    # When a drain took the row for sending
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["tailor_order", "kind", "due_date"], name="reminder_once_per_due_date"),
+        ]
+        indexes = [
+            models.Index(fields=["status", "id"], name="reminder_status_id"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} reminder for {self.tailor_order_id} ({self.status})"
+
+
+class Job(models.Model):
+    """A unit of background work, run by `python manage.py run_jobs` (see admin_app.jobs)."""
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("succeeded", "Succeeded"),
+        ("failed", "Failed"),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="queued")
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+
+    created_by = models.ForeignKey(MaguvaUsers, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=100, blank=True, default="")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_at"], name="job_status_run_at"),
+        ]
+
+    def __str__(self):
+        return f"Job #{self.id} {self.name} ({self.status})"
@@ -0,0 +1,178 @@
+"""
+On-demand request profiling for admins.
+
+With ``PROFILING_ENABLED`` on, an admin can add ``?profile=1`` (or the
+``X-Profile: 1`` header) to any API call. ``ProfilingMiddleware`` then runs
+the request under ``SamplingProfiler``, a thread that snapshots the request
+thread's stack every ``PROFILE_SAMPLE_INTERVAL_MS`` milliseconds, and
+records the SQL it issues. Once the response is ready the distinct SELECTs
+are run again under ``EXPLAIN``.
+
+The result is stored under ``PROFILE_DIR`` as ``<id>.folded``, collapsed
+stacks that flamegraph.pl, speedscope or inferno render directly, and
+``<id>.json`` with the SQL, plans and timings. The id is returned in the
+``X-Profile-Id`` header and both files are served at
+``/api/profiles/<id>/``.
+"""
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import BaseRenderer
+
+from .authentication import CachedJWTAuthentication
+from .middleware import QueryStats, fingerprint
+
+
+class SamplingProfiler:
+    """Counts the stacks seen on one thread; ``folded()`` renders them as ``a;b;c count`` lines."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                name = getattr(code, "co_qualname", code.co_name)
+                names.append(f"{frame.f_globals.get('__name__', '?')}.{name}:{frame.f_lineno}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+            self.samples += 1
+
+    def folded(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class SqlRecorder(QueryStats):
+    """QueryStats that also keeps one example statement and its parameters per fingerprint."""
+
+    def __init__(self):
+        super().__init__()
+        self.examples = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        self.examples.setdefault(fingerprint(sql), (sql, params, many))
+        return super().__call__(execute, sql, params, many, context)
+
+    def explain(self, limit):
+        """EXPLAIN the slowest distinct SELECTs, ``limit`` at most."""
+        plans = {}
+        ranked = sorted(self.fingerprints.items(), key=lambda item: -item[1][1])
+        with connection.cursor() as cursor:
+            for key, _ in ranked:
+                sql, params, many = self.examples[key]
+                if len(plans) >= limit or many or not sql.lstrip().upper().startswith("SELECT"):
+                    continue
+                try:
+                    cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+                    plans[key] = "\n".join(str(row[-1]) for row in cursor.fetchall())
+                except Exception as e:
+                    plans[key] = f"EXPLAIN failed: {e}"
+        return plans
+
+
+def wants_profile(request):
+    return request.GET.get("profile") == "1" or request.headers.get("X-Profile") == "1"
+
+
+def is_admin(request):
+    """Staff via the admin session or a JWT; DRF only authenticates later, inside the view."""
+    if request.user.is_authenticated:
+        return request.user.is_staff
+    try:
+        authenticated = CachedJWTAuthentication().authenticate(request)
+    except APIException:
+        return False
+    return bool(authenticated and authenticated[0].is_staff)
+
+
+def profile_path(profile_id, suffix):
+    return os.path.join(settings.PROFILE_DIR, f"{profile_id}{suffix}")
+
+
+def save(request, response, seconds, profiler, recorder):
+    """Write the .folded and .json files and return the profile id."""
+    profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    plans = recorder.explain(settings.PROFILE_EXPLAIN_LIMIT)
+
+    with open(profile_path(profile_id, ".folded"), "w", encoding="utf-8") as f:
+        f.write(profiler.folded())
+    with open(profile_path(profile_id, ".json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "id": profile_id,
+            "method": request.method,
+            "path": request.get_full_path(),
+            "status": response.status_code,
+            "duration_ms": round(seconds * 1000, 1),
+            "samples": profiler.samples,
+            "sample_interval_ms": profiler.interval * 1000,
+            "query_count": recorder.count,
+            "db_ms": round(recorder.duration * 1000, 1),
+            "queries": [
+                {"sql": sql, "count": count, "ms": round(total * 1000, 1), "plan": plans.get(sql)}
+                for sql, (count, total) in sorted(recorder.fingerprints.items(), key=lambda item: -item[1][1])
+            ],
+        }, f, indent=2)
+    return profile_id
+
+
+class FoldedStacksRenderer(BaseRenderer):
+    """
+    Lets ``?format=folded`` through DRF's content negotiation, which would
+    otherwise answer 404 for an unknown format. The profile view returns the
+    stacks itself; only error responses are rendered here.
+    """
+    media_type = "text/plain"
+    format = "folded"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data).encode()
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not (wants_profile(request) and is_admin(request)):
+            return self.get_response(request)
+
+        recorder = SqlRecorder()
+        start = time.perf_counter()
+        with SamplingProfiler(threading.get_ident(), settings.PROFILE_SAMPLE_INTERVAL_MS / 1000) as profiler:
+            with connection.execute_wrapper(recorder):
+                response = self.get_response(request)
+        seconds = time.perf_counter() - start
+
+        response["X-Profile-Id"] = save(request, response, seconds, profiler, recorder)
+        return response
@@ -0,0 +1,159 @@
+"""
+Tailor order reminders through an outbox table.
+
+``queue_due_reminders`` selects every open order that is due soon, or late
+with a balance outstanding, in one query on the (status, delivery_date)
+index and bulk-inserts a ``ReminderOutbox`` row per order. The unique
+(order, kind, due date) constraint makes re-runs harmless.
+
+``drain`` hands pending rows to the configured sender in batches. Senders
+take a list of reminders and return ``{reminder_id: error}`` for the ones
+that failed, so a gateway with a bulk API is called once per batch. A batch
+is claimed (marked ``sending``) in a short transaction and sent outside it,
+so no row locks are held while the gateway answers; rows left ``sending``
+by a drain that died are put back after ``REMINDER_SENDING_TIMEOUT``. The
+bundled ``ConsoleSender`` and ``FileSender`` stand in for an SMS or
+WhatsApp gateway locally.
+"""
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import store_time
+from .models import ReminderOutbox, TailorOrder
+
+logger = logging.getLogger(__name__)
+
+MESSAGES = {
+    "due_soon": (
+        "Hi {customer_name}, your {product_name} (order {order_number}) will be ready on "
+        "{delivery_date:%d %b}. Balance due: Rs {balance_amount}."
+    ),
+    "overdue": (
+        "Hi {customer_name}, your {product_name} (order {order_number}) was due on "
+        "{delivery_date:%d %b}; we'll update you shortly. Balance due: Rs {balance_amount}."
+    ),
+}
+
+
+class ConsoleSender:
+    """Logs reminders instead of sending them."""
+
+    def send_batch(self, reminders):
+        for reminder in reminders:
+            logger.info(f"Reminder to {reminder.recipient}: {reminder.message}")
+        return {}
+
+
+class FileSender:
+    """Appends reminders as JSON lines to REMINDER_FILE."""
+
+    def send_batch(self, reminders):
+        with open(settings.REMINDER_FILE, "a", encoding="utf-8") as f:
+            for reminder in reminders:
+                f.write(json.dumps({
+                    "id": reminder.id,
+                    "to": reminder.recipient,
+                    "kind": reminder.kind,
+                    "message": reminder.message,
+                }, ensure_ascii=False) + "\n")
+        return {}
+
+
+def get_sender():
+    return import_string(settings.REMINDER_SENDER)()
+
+
+def queue_due_reminders(today=None):
+    """Queue reminders for open orders due within REMINDER_DAYS_BEFORE days or overdue with a balance."""
+    today = today or store_time.today()
+    horizon = today + timedelta(days=settings.REMINDER_DAYS_BEFORE)
+    due = (
+        TailorOrder.objects
+        .filter(status="ordered", delivery_date__lte=horizon)
+        .filter(Q(delivery_date__gte=today) | Q(balance_amount__gt=0))
+        .values(
+            "id", "order_number", "customer_name", "customer_mobile",
+            "product_name", "delivery_date", "balance_amount",
+        )
+    )
+
+    rows = []
+    for order in due.iterator(chunk_size=2000):
+        kind = "due_soon" if order["delivery_date"] >= today else "overdue"
+        rows.append(ReminderOutbox(
+            tailor_order_id=order["id"],
+            kind=kind,
+            due_date=order["delivery_date"],
+            recipient=order["customer_mobile"],
+            message=MESSAGES[kind].format(**order),
+        ))
+    ReminderOutbox.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+    return len(rows)
+
+
+def requeue_stale():
+    """Put back reminders claimed by a drain that stopped before recording the result."""
+    cutoff = timezone.now() - timedelta(seconds=settings.REMINDER_SENDING_TIMEOUT)
+    return ReminderOutbox.objects.filter(status="sending", claimed_at__lt=cutoff).update(status="pending")
+
+
+def claim(size, after_id=0):
+    """Mark the next `size` pending reminders after `after_id` as sending and return them."""
+    with transaction.atomic():
+        pending = ReminderOutbox.objects.filter(status="pending", id__gt=after_id).order_by("id")
+        if connection.features.has_select_for_update_skip_locked:
+            # Concurrent drains take different batches
+            pending = pending.select_for_update(skip_locked=True)
+        batch = list(pending[:size])
+        if batch:
+            now = timezone.now()
+            ReminderOutbox.objects.filter(id__in=[r.id for r in batch]).update(status="sending", claimed_at=now)
+    return batch
+
+
+def drain(batch_size=None, limit=None, sender=None):
+    """Send pending reminders in batches. Returns (sent, failed)."""
+    batch_size = batch_size or settings.REMINDER_BATCH_SIZE
+    sender = sender or get_sender()
+    requeued = requeue_stale()
+    if requeued:
+        logger.warning(f"Requeued {requeued} reminders left sending by an earlier drain")
+    sent = failed = 0
+    # Walk forward by id so reminders that failed in this run wait for the next one
+    last_id = 0
+    while limit is None or sent + failed < limit:
+        size = batch_size if limit is None else min(batch_size, limit - sent - failed)
+        batch = claim(size, last_id)
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        try:
+            errors = sender.send_batch(batch)
+        except Exception as e:
+            logger.error(f"Reminder sender failed for a batch of {len(batch)}: {e}")
+            errors = {reminder.id: str(e) for reminder in batch}
+
+        now = timezone.now()
+        for reminder in batch:
+            reminder.attempts += 1
+            if reminder.id in errors:
+                reminder.last_error = errors[reminder.id]
+                reminder.status = "failed" if reminder.attempts >= settings.REMINDER_MAX_ATTEMPTS else "pending"
+                failed += 1
+            else:
+                reminder.status = "sent"
+                reminder.sent_at = now
+                sent += 1
+        ReminderOutbox.objects.bulk_update(batch, ["status", "attempts", "last_error", "sent_at"])
+
+        if len(batch) < size:
+            break
+    return sent, failed
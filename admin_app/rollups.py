@@ -0,0 +1,154 @@
+"""
+Precomputed sales rollups for analytics.
+
+``SalesRollup`` holds units and revenue per sale day, vendor, product and
+batch, so vendor analytics, top products and the daily report read a narrow
+relation instead of joining OrderItem -> Order -> Product on every request.
+
+On PostgreSQL the relation is a materialized view refreshed ``CONCURRENTLY``
+(readers are never blocked and checkout keeps writing to the base tables).
+On other backends, i.e. SQLite in development, it is a plain summary table
+rebuilt in a transaction. Either way it is created after ``migrate`` and
+refreshed by ``python manage.py refresh_analytics`` or, after checkout
+writes, by a ``refresh_sales_rollup`` job on the job worker. Web processes
+never refresh themselves: however many workers take orders, at most one
+refresh job is queued at a time, due no sooner than
+``ANALYTICS_REFRESH_INTERVAL`` after the last one finished.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import jobs, store_time
+from .models import Job, OrderItem, Product, SalesRollup
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ['sale_date', 'vendor_id', 'product_id', 'product_type', 'batch_id', 'units', 'revenue']
+
+
+def rollup_source():
+    """The aggregation the rollup materializes, one row per day/product/batch."""
+    product = Product.objects.filter(id=OuterRef('product_id'))
+    return (
+        OrderItem.objects
+        .annotate(
+            # Keyed by store day, not UTC day. Items sold before sold_at existed
+            # use their order's time until backfill_order_item_costs has run
+            sale_date=store_time.trunc(Coalesce('sold_at', 'order__created_at')),
+            vendor_id=Subquery(product.values('vendor_id')[:1]),
+        )
+        .values('sale_date', 'vendor_id', 'product_id', 'product_type', 'batch_id')
+        .annotate(units=Sum('quantity'), revenue=Sum('line_total'))
+        .order_by()
+    )
+
+
+def _source_sql():
+    sql, params = rollup_source().query.sql_with_params()
+    # Stable ids keep CONCURRENTLY refreshes small: new sales land at the end
+    sql = (
+        f"SELECT ROW_NUMBER() OVER (ORDER BY r.sale_date, r.product_id, r.batch_id) AS id, "
+        f"{', '.join('r.' + c for c in COLUMNS)} FROM ({sql}) r"
+    )
+    return sql, params
+
+
+def is_materialized_view():
+    return connection.vendor == 'postgresql'
+
+
+def relation_exists():
+    return SalesRollup._meta.db_table in connection.introspection.table_names(include_views=True)
+
+
+def ensure_relation(**kwargs):
+    """Create the rollup relation if it is missing. Hooked to post_migrate."""
+    if relation_exists():
+        return
+    table = SalesRollup._meta.db_table
+    if is_materialized_view():
+        sql, params = _source_sql()
+        with connection.cursor() as cursor:
+            cursor.execute(f'CREATE MATERIALIZED VIEW "{table}" AS {sql}', params)
+            cursor.execute(f'CREATE UNIQUE INDEX "{table}_id" ON "{table}" (id)')
+            for index in SalesRollup._meta.indexes:
+                columns = ', '.join(
+                    SalesRollup._meta.get_field(f).column for f in index.fields
+                )
+                cursor.execute(f'CREATE INDEX "{index.name}" ON "{table}" ({columns})')
+    else:
+        with connection.schema_editor() as schema_editor:
+            schema_editor.create_model(SalesRollup)
+        refresh()
+
+
+def drop_relation():
+    """Drop the rollup relation, e.g. before recreating it with a new definition."""
+    if not relation_exists():
+        return
+    if is_materialized_view():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP MATERIALIZED VIEW "{SalesRollup._meta.db_table}"')
+    else:
+        with connection.schema_editor() as schema_editor:
+            schema_editor.delete_model(SalesRollup)
+
+
+def refresh():
+    """Recompute the rollup from the base tables."""
+    started = time.monotonic()
+    table = SalesRollup._meta.db_table
+    if is_materialized_view():
+        with connection.cursor() as cursor:
+            cursor.execute(f'REFRESH MATERIALIZED VIEW CONCURRENTLY "{table}"')
+    else:
+        sql, params = _source_sql()
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM "{table}"')
+            cursor.execute(
+                f'INSERT INTO "{table}" (id, {", ".join(COLUMNS)}) {sql}', params
+            )
+    logger.info(f"Refreshed sales rollup in {time.monotonic() - started:.2f}s")
+
+
+REFRESH_JOB = 'refresh_sales_rollup'
+# Key of the PostgreSQL advisory lock held while deciding whether to queue a refresh
+_ENQUEUE_LOCK_ID = 0x524f4c4c  # "ROLL"
+
+
+def _enqueue_refresh():
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            # Serializes this check across web workers; released at commit
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)', [_ENQUEUE_LOCK_ID])
+        refresh_jobs = Job.objects.filter(name=REFRESH_JOB)
+        if refresh_jobs.filter(status='queued').exists():
+            return
+        run_at = timezone.now()
+        last = (
+            refresh_jobs.filter(status='succeeded')
+            .order_by('-finished_at')
+            .values_list('finished_at', flat=True)
+            .first()
+        )
+        if last:
+            run_at = max(run_at, last + timedelta(seconds=settings.ANALYTICS_REFRESH_INTERVAL))
+        jobs.enqueue(REFRESH_JOB, run_at=run_at)
+
+
+def request_refresh():
+    """
+    Queue a rollup refresh for the job worker once the current transaction
+    commits, unless one is already queued.
+    """
+    if settings.ANALYTICS_REFRESH_INTERVAL > 0:
+        # robust: the order is committed either way, a failure here only delays analytics
+        transaction.on_commit(_enqueue_refresh, robust=True)
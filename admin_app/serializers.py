@@ -102,6 +102,9 @@ class OrderItemSerializer(serializers.ModelSerializer):
 class OrderSerializer(serializers.ModelSerializer):
     created_by = serializers.StringRelatedField()
     items = OrderItemSerializer(many=True, read_only=True)
+    # Present when the queryset comes from Order.objects.summary()
+    items_count = serializers.IntegerField(read_only=True)
+    units_count = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Order
@@ -119,6 +122,8 @@ class OrderSerializer(serializers.ModelSerializer):
             'payment_amount',
             'created_at',
             'created_by',
+            'items_count',
+            'units_count',
             'items'
         ]
 
@@ -0,0 +1,55 @@
+"""
+Store-local calendar.
+
+Timestamps are stored in UTC, but reports are about the shop's business
+days. Day, week and month boundaries follow ``settings.STORE_TIME_ZONE``
+and grouping is pushed into SQL through ``Trunc*(tzinfo=...)``, so a sale
+at 23:30 IST lands on the right day without pulling raw rows into Python.
+"""
+from datetime import datetime, time
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db.models import DateField
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+GROUPINGS = {'day': TruncDate, 'week': TruncWeek, 'month': TruncMonth}
+
+
+@lru_cache
+def _zone(name):
+    return ZoneInfo(name)
+
+
+def store_timezone():
+    return _zone(settings.STORE_TIME_ZONE)
+
+
+def today():
+    return timezone.localdate(timezone=store_timezone())
+
+
+def local_date(value):
+    """The store day an aware datetime falls on."""
+    return timezone.localdate(value, store_timezone())
+
+
+def day_start(day):
+    """Aware datetime for the midnight that opens store day `day`."""
+    return datetime.combine(day, time.min, tzinfo=store_timezone())
+
+
+def month_start(day=None):
+    return day_start((day or today()).replace(day=1))
+
+
+def trunc(field, kind='day'):
+    """
+    `field` truncated in SQL to the store day, week (starting Monday) or
+    month it falls in, as a date.
+    """
+    if kind == 'day':
+        return TruncDate(field, tzinfo=store_timezone())
+    return GROUPINGS[kind](field, output_field=DateField(), tzinfo=store_timezone())
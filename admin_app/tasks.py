@@ -0,0 +1,32 @@
+"""
+Background job functions, run by `python manage.py run_jobs` (see admin_app.jobs).
+"""
+from datetime import date
+
+from . import rollups
+from .jobs import job
+from .models import Vendor
+from .views import DashboardAnalyticsView, VendorAnalyticsSerializer, _build_vendor_analytics
+
+
+@job()
+def dashboard_analytics(days=30):
+    return DashboardAnalyticsView().build(days)
+
+
+@job()
+def vendor_analytics_batch(ids=None, period=None, comparison=None):
+    vendors = Vendor.objects.order_by("id")
+    if ids is not None:
+        vendors = vendors.filter(id__in=ids)
+    period = tuple(date.fromisoformat(day) for day in period) if period else None
+    comparison = tuple(date.fromisoformat(day) for day in comparison) if comparison else None
+    return [
+        VendorAnalyticsSerializer(payload).data
+        for payload in _build_vendor_analytics(vendors, period, comparison)
+    ]
+
+
+@job(max_attempts=1)
+def refresh_sales_rollup():
+    rollups.refresh()
@@ -1,3 +1,1096 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
+from rest_framework_simplejwt import authentication as jwt_authentication, settings as jwt_settings, tokens as jwt_tokens
+from rest_framework_simplejwt.tokens import AccessToken
+
+from Manguva.logs import RedactingFilter, SamplingFilter
+
+from . import authentication, events, jobs, profiling, reminders, rollups, store_time, tracing
+from .models import *
+from .views import DashboardAnalyticsView, _parse_analytics_period
+
+
+class OrderSummaryQueryCountTests(TestCase):
+    """Order listings must not issue a query per order."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = MaguvaUsers.objects.create_superuser(
+            email='admin@maguva.com', name='Admin', password='admin123'
+        )
+        vendor = Vendor.objects.create(
+            vendor_name='Saree Palace', contact_person_name='Rajesh', phone='9876543210',
+            email='rajesh@sareepalace.com', street='Textile Market', city='Mumbai',
+            state='Maharashtra', zip_code='400001', country='India',
+        )
+        cls.product = Product.objects.create(
+            vendor=vendor, product_type='Kurti', fabric_type='Cotton', color_code='#FF6B6B',
+            base_price=Decimal('800'), markup_price=Decimal('200'), mrp=Decimal('1000'),
+        )
+        cls.batch = StockBatch.objects.create(
+            product=cls.product, vendor=vendor, batch_number=1, added_qty=100
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_orders(self, count, items_per_order=3):
+        for _ in range(count):
+            order = Order.objects.create(
+                customer_name='Anita', subtotal=Decimal('3000'), total_amount=Decimal('3540'),
+                payment_method='upi', payment_amount=Decimal('3540'), created_by=self.user,
+            )
+            for _ in range(items_per_order):
+                OrderItem.objects.create(
+                    order=order, product_name='Kurti', sku=self.product.sku,
+                    price=Decimal('1000'), quantity=2, line_total=Decimal('2000'),
+                    inventory_id=1, product_id=self.product.id, batch=self.batch,
+                    product_type='Kurti', fabric_type='Cotton', sold_at=order.created_at,
+                )
+
+    def assertConstantQueries(self, func):
+        self.create_orders(2)
+        with CaptureQueriesContext(connection) as few:
+            func()
+        self.create_orders(6)
+        with CaptureQueriesContext(connection) as many:
+            func()
+        self.assertEqual(len(few), len(many))
+        return len(many)
+
+    def test_summary_annotations(self):
+        self.create_orders(1, items_per_order=3)
+        order = Order.objects.summary().get()
+        self.assertEqual(order.items_count, 3)
+        self.assertEqual(order.units_count, 6)
+        self.assertEqual(order.created_by_name, 'Admin')
+
+    def test_dashboard_recent_orders(self):
+        view = DashboardAnalyticsView()
+        queries = self.assertConstantQueries(view._get_recent_orders)
+        self.assertEqual(queries, 1)
+        self.assertEqual(view._get_recent_orders()[0]['items_count'], 3)
+
+    def test_dashboard_vendor_performance(self):
+        self.create_orders(2)
+        for i, revenue in enumerate([Decimal('500'), None]):
+            vendor = Vendor.objects.create(
+                vendor_name=f'Vendor {i}', contact_person_name='Priya', phone=f'90000000{i}',
+                email=f'vendor{i}@maguva.com', street='Market Road', city='Pune',
+                state='Maharashtra', zip_code='411001', country='India',
+            )
+            product = Product.objects.create(
+                vendor=vendor, product_type='Saree', fabric_type='Silk', color_code='#000000',
+                base_price=Decimal('300'), markup_price=Decimal('200'), mrp=Decimal('500'),
+            )
+            if revenue:
+                order = Order.objects.create(
+                    customer_name='Anita', subtotal=revenue, total_amount=revenue,
+                    payment_method='cash', payment_amount=revenue, created_by=self.user,
+                )
+                OrderItem.objects.create(
+                    order=order, product_name='Saree', sku=product.sku, price=revenue, quantity=1,
+                    line_total=revenue, inventory_id=2, product_id=product.id, product_type='Saree',
+                )
+
+        now = timezone.now()
+        with self.assertNumQueries(2):
+            performance = DashboardAnalyticsView()._get_vendor_performance(now - timedelta(days=1), now)
+        self.assertEqual(
+            [(row['vendor_name'], row['total_revenue'], row['order_count'], row['product_count']) for row in performance],
+            [('Saree Palace', 12000.0, 2, 1), ('Vendor 0', 500.0, 1, 1)],
+        )
+
+    def test_order_list(self):
+        queries = self.assertConstantQueries(lambda: self.client.get('/api/transactions/list'))
+        self.assertEqual(queries, 2)
+
+    def test_vendor_analytics_batch(self):
+        rollups.refresh()
+        with CaptureQueriesContext(connection) as one:
+            response = self.client.get('/api/vendors/analytics/')
+        self.assertEqual(len(response.data), 1)
+
+        for i in range(4):
+            vendor = Vendor.objects.create(
+                vendor_name=f'Vendor {i}', contact_person_name='Priya', phone=f'90000000{i}',
+                email=f'vendor{i}@maguva.com', street='Market Road', city='Pune',
+                state='Maharashtra', zip_code='411001', country='India',
+            )
+            product = Product.objects.create(
+                vendor=vendor, product_type='Saree', fabric_type='Silk', color_code='#000000',
+                base_price=Decimal('800'), markup_price=Decimal('200'), mrp=Decimal('1000'),
+            )
+            StockBatch.objects.create(product=product, vendor=vendor, batch_number=1, added_qty=10)
+        self.create_orders(3)
+        rollups.refresh()
+        with self.assertNumQueries(len(one)):
+            response = self.client.get('/api/vendors/analytics/')
+        self.assertEqual(len(response.data), 5)
+
+    def test_daily_report(self):
+        self.assertConstantQueries(lambda: self.client.get('/api/manguva/report/'))
+        response = self.client.get('/api/manguva/report/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['orders_today'][0]['items_count'], 3)
+        self.assertEqual(response.data['category_revenue'][0]['category'], 'Kurti')
+
+
+class AnalyticsPeriodTests(TestCase):
+    """Analytics periods and their comparisons; bad input is a 400, never a 500."""
+
+    def test_previous_period_has_same_length(self):
+        period, comparison = _parse_analytics_period(
+            {'from': '2025-03-01', 'to': '2025-03-31', 'compare_to': 'previous_period'}
+        )
+        self.assertEqual(comparison, (date(2025, 1, 29), date(2025, 2, 28)))
+        self.assertEqual(comparison[1] - comparison[0], period[1] - period[0])
+        self.assertEqual(comparison[1] + timedelta(days=1), period[0])
+
+    def test_explicit_comparison_start(self):
+        _, comparison = _parse_analytics_period({'from': '2025-03-01', 'to': '2025-03-10', 'compare_to': '2024-12-01'})
+        self.assertEqual(comparison, (date(2024, 12, 1), date(2024, 12, 10)))
+
+    def test_previous_year_leap_day(self):
+        _, comparison = _parse_analytics_period({'from': '2024-02-01', 'to': '2024-02-29', 'compare_to': 'previous_year'})
+        self.assertEqual(comparison, (date(2023, 2, 1), date(2023, 2, 28)))
+        _, comparison = _parse_analytics_period({'from': '2025-02-28', 'to': '2025-03-01', 'compare_to': 'previous_year'})
+        self.assertEqual(comparison, (date(2024, 2, 28), date(2024, 3, 1)))
+
+    def test_bad_input_is_400(self):
+        user = MaguvaUsers.objects.create_superuser(email='admin@maguva.com', name='Admin', password='admin123')
+        client = APIClient()
+        client.force_authenticate(user)
+        for query in [
+            'from=2025-03-10&to=2025-03-01',
+            'from=2025-13-01',
+            'from=10-03-2025',
+            'to=2025-02-30',
+            'compare_to=last_week',
+        ]:
+            with self.subTest(query=query):
+                response = client.get(f'/api/vendors/analytics/?{query}')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('Invalid parameter', response.data['error'])
+
+
+@override_settings(LOGIN_THROTTLE_IP_BURST=3, LOGIN_THROTTLE_EMAIL_BURST=2)
+class LoginThrottleTests(TestCase):
+    """Login floods are answered 429 before any password is hashed."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def login(self, email, **headers):
+        return self.client.post('/api/login', {'email': email, 'password': 'wrong'}, format='json', **headers)
+
+    def test_email_bucket(self):
+        self.assertEqual(self.login('a@maguva.com').status_code, 401)
+        self.assertEqual(self.login('A@maguva.com ').status_code, 401)
+        response = self.login('a@maguva.com')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+    def test_ip_bucket(self):
+        for i in range(3):
+            self.assertEqual(self.login(f'user{i}@maguva.com').status_code, 401)
+        self.assertEqual(self.login('other@maguva.com').status_code, 429)
+
+    def test_spoofed_forwarded_for_is_still_throttled(self):
+        # The proxy appends the real client address; everything before it is the client's own
+        for i in range(3):
+            response = self.login(f'user{i}@maguva.com', HTTP_X_FORWARDED_FOR=f'10.0.0.{i}, 203.0.113.7')
+            self.assertEqual(response.status_code, 401)
+        response = self.login('other@maguva.com', HTTP_X_FORWARDED_FOR='10.0.0.99, 203.0.113.7')
+        self.assertEqual(response.status_code, 429)
+        response = self.login('other@maguva.com', HTTP_X_FORWARDED_FOR='203.0.113.8')
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(JWT_USER_CACHE_TTL=60)
+class CachedJWTAuthenticationTests(TestCase):
+    """User changes take effect on the next request despite the per-process user cache."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = MaguvaUsers.objects.create_superuser(
+            email='admin@maguva.com', name='Admin', password='admin123'
+        )
+
+    def setUp(self):
+        cache.clear()
+        authentication.user_cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def get(self, path='/api/auth/login-throttle'):
+        return self.client.get(path)
+
+    def test_cache_hit_skips_user_query(self):
+        self.assertEqual(self.get().status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get().status_code, 200)
+        self.assertFalse([q for q in queries if 'admin_app_maguvausers' in q['sql']])
+
+    def test_deactivated_user(self):
+        self.assertEqual(self.get().status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get().status_code, 401)
+
+    def test_password_change(self):
+        # simplejwt modules bind api_settings at import, so override_settings(SIMPLE_JWT=...) misses them
+        revoking = jwt_settings.APISettings({'CHECK_REVOKE_TOKEN': True}, jwt_settings.DEFAULTS, jwt_settings.IMPORT_STRINGS)
+        for module in (authentication, jwt_authentication, jwt_tokens):
+            patcher = mock.patch.object(module, 'api_settings', revoking)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+        self.assertEqual(self.get().status_code, 200)
+        self.user.set_password('changed456')
+        self.user.save()
+        response = self.get()
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['code'], 'password_changed')
+
+    def test_role_change(self):
+        self.assertEqual(self.get('/api/auth/verify').data['user']['role'], 'admin')
+        MaguvaUsers.objects.filter(pk=self.user.pk).update(is_superuser=False, is_staff=False)
+        # update() sends no signal; the next save() invalidates the cached user
+        self.user.refresh_from_db()
+        self.user.save()
+        self.assertEqual(self.get('/api/auth/verify').data['user']['role'], 'user')
+        self.assertEqual(self.get().status_code, 403)
+
+    def test_other_process_without_shared_cache(self):
+        # Without REDIS_URL another worker has its own memory cache and its own user cache
+        other_cache = LocMemCache('other-process', {})
+        other_users = authentication.UserCache()
+        token = AccessToken.for_user(self.user)
+        with mock.patch.object(authentication, 'cache', other_cache), \
+                mock.patch.object(authentication, 'user_cache', other_users):
+            authentication.CachedJWTAuthentication().get_user(token)
+
+        self.user.is_active = False
+        self.user.save()
+        now = authentication.time.monotonic()
+        with mock.patch.object(authentication, 'cache', other_cache), \
+                mock.patch.object(authentication, 'user_cache', other_users):
+            # The other worker never sees the new generation and serves its copy until the TTL runs out
+            self.assertTrue(authentication.CachedJWTAuthentication().get_user(token).is_active)
+            with mock.patch.object(authentication.time, 'monotonic', return_value=now + 61):
+                with self.assertRaises(authentication.AuthenticationFailed):
+                    authentication.CachedJWTAuthentication().get_user(token)
+
+
+class DashboardStreamTests(TestCase):
+    """The live dashboard: in-process fan-out and single-use stream tickets."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = MaguvaUsers.objects.create_superuser(
+            email='admin@maguva.com', name='Admin', password='admin123'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def ticket(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post('/api/dashboard/stream/ticket/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['ticket']
+
+    async def test_in_memory_channel_layer(self):
+        layer = events.InMemoryChannelLayer()
+        first, second = layer.subscribe(), layer.subscribe()
+        message = {'type': 'order.created', 'data': {'order_id': 1}}
+        layer.deliver(message)
+        self.assertEqual(await first.get(timeout=1), message)
+        self.assertEqual(await second.get(timeout=1), message)
+
+        second.close()
+        layer.deliver({'type': 'stock.changed', 'data': {}})
+        self.assertEqual((await first.get(timeout=1))['type'], 'stock.changed')
+        with self.assertRaises(asyncio.TimeoutError):
+            await second.get(timeout=0.05)
+
+        # A subscriber that falls behind is told to refetch instead of growing without bound
+        for i in range(first.queue.maxsize + 1):
+            layer.deliver({'type': 'stock.changed', 'data': {'i': i}})
+        await asyncio.sleep(0)
+        self.assertEqual(await first.get(timeout=1), {'type': 'resync', 'data': {}})
+        first.close()
+
+    async def test_stream_opens_with_a_ticket_once(self):
+        ticket = authentication.issue_stream_ticket(self.user)
+        response = await self.async_client.get(f'/api/dashboard/stream/?ticket={ticket}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(await anext(aiter(response.streaming_content)), b'retry: 5000\n\n')
+        await response.streaming_content.aclose()
+
+        response = await self.async_client.get(f'/api/dashboard/stream/?ticket={ticket}')
+        self.assertEqual(response.status_code, 401)
+
+    def test_ticket_endpoint(self):
+        ticket = self.ticket()
+        self.assertEqual(authentication.redeem_stream_ticket(ticket), self.user.pk)
+        self.assertIsNone(authentication.redeem_stream_ticket(ticket))
+        self.assertIsNone(authentication.redeem_stream_ticket(ticket[:-2] + 'xx'))
+        self.assertEqual(APIClient().post('/api/dashboard/stream/ticket/').status_code, 401)
+        self.assertEqual(self.client.get('/api/dashboard/stream/?token=abc').status_code, 401)
+
+
+@override_settings(STORE_TIME_ZONE='Asia/Kolkata')
+class StoreDayTests(TestCase):
+    """Reports bucket by the store's (IST) day, not the UTC day."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = MaguvaUsers.objects.create_superuser(
+            email='admin@maguva.com', name='Admin', password='admin123'
+        )
+        vendor = Vendor.objects.create(
+            vendor_name='Saree Palace', contact_person_name='Rajesh', phone='9876543210',
+            email='rajesh@sareepalace.com', street='Textile Market', city='Mumbai',
+            state='Maharashtra', zip_code='400001', country='India',
+        )
+        product = Product.objects.create(
+            vendor=vendor, product_type='Kurti', fabric_type='Cotton', color_code='#FF6B6B',
+            base_price=Decimal('800'), markup_price=Decimal('200'), mrp=Decimal('1000'),
+        )
+        # 23:30 UTC on 10 March is 05:00 IST on 11 March
+        cls.sold_at = datetime(2025, 3, 10, 23, 30, tzinfo=dt_timezone.utc)
+        order = Order.objects.create(
+            customer_name='Anita', subtotal=Decimal('1000'), total_amount=Decimal('1180'),
+            payment_method='upi', payment_amount=Decimal('1180'), created_by=cls.user,
+        )
+        Order.objects.filter(pk=order.pk).update(created_at=cls.sold_at)
+        OrderItem.objects.create(
+            order=order, product_name='Kurti', sku=product.sku, price=Decimal('1000'), quantity=1,
+            line_total=Decimal('1000'), inventory_id=1, product_id=product.id, product_type='Kurti',
+            fabric_type='Cotton', sold_at=cls.sold_at, unit_cost=Decimal('800'),
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_local_date(self):
+        self.assertEqual(store_time.local_date(self.sold_at), date(2025, 3, 11))
+        self.assertEqual(store_time.day_start(date(2025, 3, 11)).astimezone(dt_timezone.utc),
+                         datetime(2025, 3, 10, 18, 30, tzinfo=dt_timezone.utc))
+
+    def test_rollup_day(self):
+        rollups.refresh()
+        self.assertEqual(list(SalesRollup.objects.values_list('sale_date', 'units')), [(date(2025, 3, 11), 1)])
+
+    def test_range_export(self):
+        rollups.refresh()
+        response = self.client.get('/api/manguva/report/range/?from=2025-03-10&to=2025-03-11&export=jsonl')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        totals = [row for row in rows if row['key'] == 'total']
+        self.assertEqual([(row['date'], row['orders'], row['units']) for row in totals], [('2025-03-11', 1, 1)])
+
+    def test_range_export_week(self):
+        # The week of 11 March 2025 starts on Monday the 10th, before 'from'
+        rollups.refresh()
+        response = self.client.get('/api/manguva/report/range/?from=2025-03-11&to=2025-03-16&export=jsonl&group=week')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual({row['date'] for row in rows}, {'2025-03-11'})
+        total = next(row for row in rows if row['key'] == 'total')
+        # Totals come from the order, not the rollup: 1180 with tax, not the 1000 line total
+        self.assertEqual((total['orders'], total['units'], total['revenue']), (1, 1, 1180.0))
+
+    def test_daily_report(self):
+        response = self.client.get('/api/manguva/report/?date=2025-03-11')
+        self.assertEqual(response.status_code, 200)
+        # Past days are served from the archive as stored JSON
+        self.assertEqual(len(response.json()['orders_today']), 1)
+        response = self.client.get('/api/manguva/report/?date=2025-03-10')
+        self.assertEqual(len(response.json()['orders_today']), 0)
+
+    def test_daily_report_archive(self):
+        # An item of a deleted product never gets a cost; once marked, its day is archived
+        item = OrderItem.objects.get()
+        OrderItem.objects.create(
+            order=item.order, product_name='Dupatta', sku='GONE', price=Decimal('300'), quantity=1,
+            line_total=Decimal('300'), inventory_id=2, product_id=999, sold_at=self.sold_at,
+        )
+        self.client.get('/api/manguva/report/?date=2025-03-11')
+        self.assertFalse(DailyReportArchive.objects.exists())
+
+        OrderItem.objects.filter(product_id=999).update(cost_unknown=True)
+        response = self.client.get('/api/manguva/report/?date=2025-03-11')
+        archive = DailyReportArchive.objects.get()
+        self.assertEqual(response['ETag'], archive.etag)
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+        response = self.client.get('/api/manguva/report/?date=2025-03-11', HTTP_IF_NONE_MATCH=archive.etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get('/api/manguva/report/?date=2025-03-11', HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+
+class TailorQueryCountTests(TestCase):
+    """Tailor endpoints that work on many rows run a fixed number of queries."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = MaguvaUsers.objects.create_superuser(
+            email='admin@maguva.com', name='Admin', password='admin123'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_order(self, items, delivery_date=None):
+        order = TailorOrder.objects.create(
+            customer_name='Anita', customer_mobile='9876543210', product_name='Blouse',
+            delivery_date=delivery_date or store_time.today(),
+            total_amount=Decimal('2000'), advance_paid=Decimal('500'),
+        )
+        TailorOrderItemDetail.objects.bulk_create(
+            TailorOrderItemDetail(tailor_order=order, item_name=f'Item {i}', quantity=1) for i in range(items)
+        )
+        return order
+
+    def update_items(self, order):
+        """Change every item but the last, drop the last and add two."""
+        items = list(order.item_details.order_by('id'))
+        payload = [{'id': item.id, 'quantity': 2, 'remarks': 'tight fit'} for item in items[:-1]]
+        payload += [{'item_name': 'Lining'}, {'item_name': 'Tassels', 'quantity': 4}]
+        return self.client.patch(
+            f'/api/tailor/orders/{order.id}/update/', {'item_details': payload}, format='json'
+        )
+
+    def test_update_items(self):
+        small, large = self.create_order(3), self.create_order(30)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.update_items(small).status_code, 200)
+        with self.assertNumQueries(len(queries)):
+            response = self.update_items(large)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(large.item_details.count(), 31)
+        self.assertEqual(large.item_details.filter(quantity=2, remarks='tight fit').count(), 29)
+
+    @override_settings(TAILOR_DAILY_CAPACITY=5)
+    def test_workload(self):
+        today = store_time.today()
+        for offset, items in ((-2, 1), (0, 4), (0, 2), (1, 3), (3, 1)):
+            self.create_order(items, delivery_date=today + timedelta(days=offset))
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/tailor/workload/?quantity=2')
+        self.assertEqual(response.status_code, 200)
+        days = {day['date']: day for day in response.data['days']}
+        self.assertEqual((days[today]['orders'], days[today]['units'], days[today]['remaining']), (2, 6, 0))
+        self.assertEqual(days[today + timedelta(days=1)]['remaining'], 2)
+        self.assertEqual(response.data['first_available_date'], today + timedelta(days=1))
+        self.assertEqual(response.data['overdue'], {'orders': 1, 'units': 1})
+
+        for offset in range(20):
+            self.create_order(3, delivery_date=today + timedelta(days=offset % 14))
+        with self.assertNumQueries(3):
+            self.client.get('/api/tailor/workload/?quantity=2')
+
+
+@jobs.job(name='test_flaky')
+def flaky_job(fail_times=0):
+    attempts = Job.objects.get(name='test_flaky').attempts
+    if attempts <= fail_times:
+        raise RuntimeError(f'attempt {attempts} failed')
+    return {'attempts': attempts}
+
+
+@override_settings(JOBS_RETRY_BACKOFF=10, JOBS_RETRY_BACKOFF_MAX=25)
+class JobRetryTests(TestCase):
+    """Failed jobs come back after an exponential backoff until max_attempts."""
+
+    def make_due(self, job):
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+
+    def test_backoff(self):
+        self.assertEqual([jobs.backoff(attempts) for attempts in (1, 2, 3, 4)], [10, 20, 25, 25])
+
+    def test_retry_then_succeed(self):
+        job = jobs.enqueue('test_flaky', {'fail_times': 1})
+        job = jobs.run(jobs.claim())
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertIn('attempt 1 failed', job.error)
+        self.assertAlmostEqual((job.run_at - timezone.now()).total_seconds(), 10, delta=2)
+        # Not due yet
+        self.assertIsNone(jobs.claim())
+
+        self.make_due(job)
+        job = jobs.run(jobs.claim())
+        self.assertEqual((job.status, job.attempts, job.result, job.error), ('succeeded', 2, {'attempts': 2}, ''))
+
+    def test_gives_up_after_max_attempts(self):
+        job = jobs.enqueue('test_flaky', {'fail_times': 5})
+        delays = []
+        for _ in range(job.max_attempts):
+            self.make_due(job)
+            job = jobs.run(jobs.claim())
+            delays.append(round((job.run_at - timezone.now()).total_seconds()))
+        self.assertEqual((job.status, job.attempts), ('failed', 3))
+        # 10s then 20s; the last failure is not rescheduled
+        self.assertEqual(delays[:2], [10, 20])
+        self.assertIsNone(jobs.claim())
+
+    @override_settings(JOBS_TIMEOUT=60)
+    def test_requeue_stale(self):
+        job = jobs.enqueue('test_flaky')
+        job = jobs.claim()
+        Job.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(jobs.run(jobs.claim()).status, 'succeeded')
+
+
+class SnapshotStockTests(TestCase):
+    """snapshot_stock records one row per live batch and day; analytics read turnover from them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        vendor = Vendor.objects.create(
+            vendor_name='Saree Palace', contact_person_name='Rajesh', phone='9876543210',
+            email='rajesh@sareepalace.com', street='Textile Market', city='Mumbai',
+            state='Maharashtra', zip_code='400001', country='India',
+        )
+        product = Product.objects.create(
+            vendor=vendor, product_type='Kurti', fabric_type='Cotton', color_code='#FF6B6B',
+            base_price=Decimal('100'), markup_price=Decimal('50'), mrp=Decimal('150'),
+        )
+        cls.batch = StockBatch.objects.create(product=product, vendor=vendor, batch_number=1, added_qty=10)
+
+    def snapshot(self, day):
+        call_command('snapshot_stock', date=day.isoformat(), stdout=io.StringIO())
+
+    def test_snapshots_and_turnover(self):
+        day1, day2 = date(2025, 3, 10), date(2025, 3, 11)
+        self.snapshot(day1)
+        StockBatch.objects.filter(pk=self.batch.pk).update(sold_qty=2)
+        self.snapshot(day2)
+        # Re-running a day replaces its rows with the current position
+        StockBatch.objects.filter(pk=self.batch.pk).update(sold_qty=4)
+        self.snapshot(day2)
+        self.assertEqual(
+            list(StockSnapshot.objects.order_by('snapshot_date').values_list(
+                'snapshot_date', 'quantity', 'stock_value', 'units_sold', 'sold_value')),
+            [(day1, 10, Decimal('1000'), 0, Decimal('0')), (day2, 6, Decimal('600'), 4, Decimal('400'))],
+        )
+        with self.assertRaises(CommandError):
+            self.snapshot(day1)
+
+        metrics = DashboardAnalyticsView()._get_stock_history_metrics(
+            store_time.day_start(day1), store_time.day_start(day2)
+        )
+        # 400 sold at cost over an average stock value of (1000 + 600) / 2
+        self.assertEqual(metrics, {'inventory_turnover': 0.5, 'products_growth': 0.0, 'inventory_growth': -40.0})
+
+
+class FlakySender:
+    """Fails the reminders to the given numbers, delivers the rest."""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.batches = []
+
+    def send_batch(self, batch):
+        self.batches.append([reminder.id for reminder in batch])
+        return {reminder.id: 'gateway timeout' for reminder in batch if reminder.recipient in self.fail}
+
+
+@override_settings(REMINDER_DAYS_BEFORE=2, REMINDER_MAX_ATTEMPTS=2)
+class ReminderTests(TestCase):
+    """Reminders are queued once per order and due date and retried until REMINDER_MAX_ATTEMPTS."""
+
+    def setUp(self):
+        self.today = date(2025, 3, 11)
+        for mobile, days, advance in [('9000000001', 1, 0), ('9000000002', -3, 0), ('9000000003', -3, 500), ('9000000004', 5, 0)]:
+            TailorOrder.objects.create(
+                customer_name='Anita', customer_mobile=mobile, product_name='Blouse', description='',
+                delivery_date=self.today + timedelta(days=days), total_amount=Decimal('500'),
+                advance_paid=Decimal(advance),
+            )
+
+    def test_queue_is_idempotent(self):
+        reminders.queue_due_reminders(self.today)
+        reminders.queue_due_reminders(self.today)
+        # Due tomorrow, and overdue with a balance; paid-up and far-off orders get nothing
+        self.assertEqual(
+            sorted(ReminderOutbox.objects.values_list('recipient', 'kind')),
+            [('9000000001', 'due_soon'), ('9000000002', 'overdue')],
+        )
+        overdue = ReminderOutbox.objects.get(kind='overdue')
+        self.assertIn('was due on 08 Mar', overdue.message)
+        self.assertNotIn('ready for pickup', overdue.message)
+
+        # A rescheduled order is reminded again about its new date
+        TailorOrder.objects.filter(customer_mobile='9000000001').update(delivery_date=self.today + timedelta(days=2))
+        reminders.queue_due_reminders(self.today)
+        self.assertEqual(ReminderOutbox.objects.filter(recipient='9000000001').count(), 2)
+
+    def test_drain_retries_failures(self):
+        reminders.queue_due_reminders(self.today)
+        sender = FlakySender(fail={'9000000002'})
+        self.assertEqual(reminders.drain(batch_size=1, sender=sender), (1, 1))
+        self.assertEqual(len(sender.batches), 2)
+        failed = ReminderOutbox.objects.get(recipient='9000000002')
+        self.assertEqual((failed.status, failed.attempts, failed.last_error), ('pending', 1, 'gateway timeout'))
+
+        # Sent reminders are not sent again; the failure gives up after the second attempt
+        self.assertEqual(reminders.drain(sender=sender), (0, 1))
+        self.assertEqual(sender.batches[-1], [failed.id])
+        failed.refresh_from_db()
+        self.assertEqual((failed.status, failed.attempts), ('failed', 2))
+        self.assertEqual(reminders.drain(sender=sender), (0, 0))
+
+    @override_settings(REMINDER_SENDING_TIMEOUT=60)
+    def test_claim_and_requeue_stale(self):
+        reminders.queue_due_reminders(self.today)
+        batch = reminders.claim(10)
+        self.assertEqual(len(batch), 2)
+        # Claimed rows are not handed to another drain
+        self.assertEqual(reminders.claim(10), [])
+        self.assertEqual(reminders.requeue_stale(), 0)
+
+        ReminderOutbox.objects.update(claimed_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(reminders.drain(sender=FlakySender()), (2, 0))
+        self.assertEqual(set(ReminderOutbox.objects.values_list('status', flat=True)), {'sent'})
+
+
+class BackfillOrderItemCostsTests(TestCase):
+    """The release-phase backfill finishes items once and leaves the rest of the archive alone."""
+
+    @classmethod
+    def setUpTestData(cls):
+        vendor = Vendor.objects.create(
+            vendor_name='Saree Palace', contact_person_name='Rajesh', phone='9876543210',
+            email='rajesh@sareepalace.com', street='Textile Market', city='Mumbai',
+            state='Maharashtra', zip_code='400001', country='India',
+        )
+        cls.product = Product.objects.create(
+            vendor=vendor, product_type='Kurti', fabric_type='Cotton', color_code='#FF6B6B',
+            base_price=Decimal('800'), markup_price=Decimal('200'), mrp=Decimal('1000'),
+        )
+
+    def create_item(self, product_id, sold_at):
+        order = Order.objects.create(
+            customer_name='Anita', subtotal=Decimal('1000'), total_amount=Decimal('1180'),
+            payment_method='upi', payment_amount=Decimal('1180'),
+        )
+        Order.objects.filter(pk=order.pk).update(created_at=sold_at)
+        return OrderItem.objects.create(
+            order=order, product_name='Kurti', sku='SKU', price=Decimal('1000'), quantity=1,
+            line_total=Decimal('1000'), inventory_id=1, product_id=product_id,
+        )
+
+    def backfill(self):
+        call_command('backfill_order_item_costs', stdout=io.StringIO())
+
+    def test_deleted_products_do_not_stay_pending(self):
+        old = datetime(2024, 1, 10, 6, 0, tzinfo=dt_timezone.utc)
+        recent = datetime(2025, 1, 10, 6, 0, tzinfo=dt_timezone.utc)
+        kept = self.create_item(self.product.id, datetime(2024, 6, 1, 6, 0, tzinfo=dt_timezone.utc))
+        orphan_old = self.create_item(999, old)
+        self.create_item(998, recent)
+        archived = [date(2024, 1, 10), date(2024, 3, 1), date(2025, 1, 10)]
+        for day in archived:
+            DailyReportArchive.objects.create(report_date=day, payload='{}', version=DailyReportArchive.SCHEMA_VERSION)
+
+        self.backfill()
+        kept.refresh_from_db()
+        self.assertEqual((kept.unit_cost, kept.product_type, kept.cost_unknown), (Decimal('800'), 'Kurti', False))
+        orphan_old.refresh_from_db()
+        self.assertEqual((orphan_old.unit_cost, orphan_old.cost_unknown, orphan_old.sold_at), (None, True, old))
+        self.assertFalse(OrderItem.objects.needs_backfill().exists())
+        # Only the days whose items changed lose their archive
+        self.assertEqual(list(DailyReportArchive.objects.values_list('report_date', flat=True)), [date(2024, 3, 1)])
+
+        DailyReportArchive.objects.create(report_date=date(2025, 1, 10), payload='{}', version=DailyReportArchive.SCHEMA_VERSION)
+        with mock.patch('admin_app.rollups.refresh') as refresh:
+            self.backfill()
+        refresh.assert_not_called()
+        self.assertEqual(DailyReportArchive.objects.count(), 2)
+
+
+class LogFilterTests(TestCase):
+    """Credentials never reach the log handlers; sampling never drops warnings."""
+
+    def record(self, msg, *args, level=logging.INFO, name='admin_app.views', **extra):
+        return logging.getLogger(name).makeRecord(name, level, __file__, 1, msg, args, None, extra=extra)
+
+    def redacted(self, record):
+        self.assertTrue(RedactingFilter().filter(record))
+        return record
+
+    def test_message_and_args(self):
+        record = self.redacted(self.record(
+            'Login %s with password=%s, headers %s',
+            'anita@maguva.com', 'hunter2', {'Authorization': 'Bearer eyJhbGciOi.abc.def'},
+        ))
+        message = record.getMessage()
+        for secret in ('hunter2', 'eyJhbGciOi', 'anita@'):
+            self.assertNotIn(secret, message)
+        self.assertIn('a***@maguva.com', message)
+        self.assertEqual(record.args, None)
+
+        message = self.redacted(self.record('refresh: "abc.def.ghi", access=xyz&next=1')).getMessage()
+        self.assertEqual(message, 'refresh: [redacted], access=[redacted]&next=1')
+
+    def test_extra(self):
+        record = self.redacted(self.record(
+            'Request failed', token='abc123', status_code=401,
+            headers={'Authorization': 'JWT abc123', 'Accept': 'application/json'},
+            body='{"email": "anita@maguva.com", "password": "hunter2"}',
+        ))
+        self.assertEqual(record.token, '[redacted]')
+        self.assertEqual(record.status_code, 401)
+        self.assertEqual(record.headers, {'Authorization': '[redacted]', 'Accept': 'application/json'})
+        self.assertNotIn('hunter2', record.body)
+        self.assertNotIn('anita@', record.body)
+
+    def test_truncates_long_messages(self):
+        record = self.record('x' * 50)
+        RedactingFilter(max_length=10).filter(record)
+        self.assertEqual(record.getMessage(), 'x' * 10 + '... [40 chars truncated]')
+
+    def test_sampling_keeps_warnings(self):
+        sampler = SamplingFilter('django.server=0,admin_app=0.5,admin_app.jobs=1')
+        with mock.patch('Manguva.logs.random.random', return_value=0.7):
+            self.assertFalse(sampler.filter(self.record('GET /', name='django.server')))
+            self.assertFalse(sampler.filter(self.record('ok', name='admin_app.views')))
+            # The longest prefix wins; unlisted loggers are kept
+            self.assertTrue(sampler.filter(self.record('ok', name='admin_app.jobs')))
+            self.assertTrue(sampler.filter(self.record('ok', name='django.request')))
+            for level in (logging.WARNING, logging.ERROR, logging.CRITICAL):
+                self.assertTrue(sampler.filter(self.record('GET /', level=level, name='django.server')))
+
+
+class QueryInstrumentationTests(TestCase):
+    """Every response reports its query time; slow or query-heavy requests are logged."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = MaguvaUsers.objects.create_superuser(
+            email='admin@maguva.com', name='Admin', password='admin123'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_server_timing(self):
+        response = self.client.get('/api/transactions/list')
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^db;dur=[\d.]+;desc="\d+ queries", app;dur=[\d.]+, total;dur=[\d.]+$',
+        )
+        with override_settings(SERVER_TIMING_HEADER=False):
+            self.assertNotIn('Server-Timing', self.client.get('/api/transactions/list'))
+
+    def test_slow_request_log(self):
+        with self.assertNoLogs('admin_app.middleware', 'WARNING'):
+            self.client.get('/api/transactions/list')
+        with override_settings(REQUEST_MAX_QUERIES=0), self.assertLogs('admin_app.middleware', 'WARNING') as logs:
+            self.client.get('/api/transactions/list')
+        self.assertIn('Slow request GET /api/transactions/list -> 200', logs.output[0])
+        self.assertIn('Top queries: 1x', logs.output[0])
+
+
+class MetricsTests(TestCase):
+    """/metrics needs a token outside development; checkout counts only committed orders."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = MaguvaUsers.objects.create_superuser(
+            email='admin@maguva.com', name='Admin', password='admin123'
+        )
+        vendor = Vendor.objects.create(
+            vendor_name='Saree Palace', contact_person_name='Rajesh', phone='9876543210',
+            email='rajesh@sareepalace.com', street='Textile Market', city='Mumbai',
+            state='Maharashtra', zip_code='400001', country='India',
+        )
+        cls.product = Product.objects.create(
+            vendor=vendor, product_type='Kurti', fabric_type='Cotton', color_code='#FF6B6B',
+            base_price=Decimal('800'), markup_price=Decimal('200'), mrp=Decimal('1000'), stock_count=1,
+        )
+        batch = StockBatch.objects.create(product=cls.product, vendor=vendor, batch_number=1, added_qty=1)
+        cls.unit = Inventory.objects.create(product=cls.product, batch=batch, size='M')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def orders_created(self):
+        return REGISTRY.get_sample_value('maguva_orders_created_total') or 0
+
+    @override_settings(DEBUG=False, METRICS_TOKEN='')
+    def test_hidden_without_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+    @override_settings(DEBUG=False, METRICS_TOKEN='s3cret')
+    def test_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'maguva_orders_created_total', response.content)
+
+    def checkout(self, inventory_id):
+        return self.client.post('/api/transactions/create', {'items': [{
+            'price': 1000, 'quantity': 1, 'inventoryId': inventory_id, 'productId': self.product.id,
+            'name': 'Kurti', 'sku': self.unit.sku,
+        }]}, format='json')
+
+    def test_order_counted_on_commit(self):
+        before = self.orders_created()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertEqual(self.checkout(self.unit.id).status_code, 201)
+            # Nothing is counted until the checkout transaction commits
+            self.assertEqual(self.orders_created(), before)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.orders_created(), before + 1)
+
+    def test_rolled_back_order_not_counted(self):
+        before = self.orders_created()
+        with self.captureOnCommitCallbacks(execute=True):
+            # The unit does not exist: the order insert is rolled back
+            self.assertEqual(self.checkout(self.unit.id + 100).status_code, 400)
+        self.assertEqual(self.orders_created(), before)
+        self.assertFalse(Order.objects.exists())
+
+
+@override_settings(TRACE_SAMPLE_RATE=1)
+class TracingTests(TestCase):
+    """Spans nest through context variables; sampling is decided once per trace."""
+
+    def setUp(self):
+        self.exported = []
+        patcher = mock.patch.object(tracing, '_export', side_effect=self.exported.append)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_nesting(self):
+        with tracing.span('outer', kind='test') as outer:
+            with tracing.span('inner') as inner:
+                MaguvaUsers.objects.count()
+            MaguvaUsers.objects.exists()
+            # A plain thread starts with an empty context, so its span is a trace of its own
+            worker = threading.Thread(target=self.open_span, args=('detached',))
+            worker.start()
+            worker.join()
+
+        detached, trace = self.exported
+        self.assertEqual([s.name for s in trace.spans], ['inner', 'outer'])
+        self.assertEqual((outer.parent_id, inner.parent_id), (None, outer.span_id))
+        self.assertEqual(outer.attributes, {'kind': 'test'})
+        # Each query is filed under the innermost open span
+        self.assertEqual((len(inner.queries), len(outer.queries)), (1, 1))
+        self.assertEqual([(s.name, s.parent_id) for s in detached.spans], [('detached', None)])
+
+    def open_span(self, name):
+        with tracing.span(name) as s:
+            return s
+
+    def test_nesting_across_tasks_and_threads(self):
+        async def child(name):
+            with tracing.span(name) as s:
+                await asyncio.sleep(0)
+                return s
+
+        async def handler():
+            with tracing.span('request') as root:
+                tasks = await asyncio.gather(child('a'), child('b'))
+                # sync_to_async runs the function in a copy of the current context
+                threaded = await sync_to_async(self.open_span)('sync')
+            return root, tasks, threaded
+
+        root, (a, b), threaded = asyncio.run(handler())
+        self.assertEqual(len(self.exported), 1)
+        self.assertEqual({a.parent_id, b.parent_id, threaded.parent_id}, {root.span_id})
+        self.assertEqual(a.trace, root.trace)
+
+    def test_sampling(self):
+        with override_settings(TRACE_SAMPLE_RATE=0.25), mock.patch('admin_app.tracing.random.random', return_value=0.5):
+            with tracing.span('outer') as outer:
+                with tracing.span('inner') as inner:
+                    pass
+            self.assertEqual((outer, inner), (None, None))
+        with mock.patch('admin_app.tracing.random.random', return_value=0.1), override_settings(TRACE_SAMPLE_RATE=0.25):
+            with tracing.span('outer'):
+                # Only the root rolls the dice; children follow it
+                with mock.patch('admin_app.tracing.random.random', return_value=0.9):
+                    with tracing.span('inner') as inner:
+                        pass
+        self.assertIsNotNone(inner)
+        self.assertEqual(len(self.exported), 1)
+
+        with override_settings(TRACE_SAMPLE_RATE=0):
+            self.assertEqual(tracing.traced('noop')(lambda: 42)(), 42)
+        self.assertEqual(len(self.exported), 1)
+
+    def test_error_recorded(self):
+        with self.assertRaises(ValueError):
+            with tracing.span('failing'):
+                raise ValueError('boom')
+        self.assertEqual(self.exported[0].spans[0].error, 'ValueError: boom')
+
+
+@override_settings(TRACE_SAMPLE_RATE=1, TRACE_EXPORTER='jsonl')
+class TraceExportTests(TestCase):
+    """Traces round-trip through the JSON Lines exporter thread."""
+
+    def test_jsonl_round_trip(self):
+        path = os.path.join(tempfile.mkdtemp(), 'traces.jsonl')
+        tracing.shutdown()
+        with override_settings(TRACE_FILE=path):
+            with tracing.span('checkout', items=2) as outer:
+                with tracing.span('checkout.order_insert'):
+                    MaguvaUsers.objects.filter(email='secret@maguva.com').exists()
+            tracing.shutdown()
+        self.assertFalse(any(t.name == 'trace-exporter' and t.is_alive() for t in threading.enumerate()))
+
+        with open(path, encoding='utf-8') as f:
+            spans = [json.loads(line) for line in f]
+        self.assertEqual([s['name'] for s in spans], ['checkout', 'checkout.order_insert'])
+        self.assertEqual({s['trace_id'] for s in spans}, {outer.trace.trace_id})
+        self.assertEqual(spans[1]['parent_id'], spans[0]['span_id'])
+        self.assertEqual(spans[0]['attributes'], {'items': 2})
+        # Statements are recorded with placeholders, never the values
+        self.assertEqual(len(spans[1]['sql']), 1)
+        self.assertNotIn('secret@maguva.com', spans[1]['sql'][0]['sql'])
+
+
+class ProfilingTests(TestCase):
+    """Only admins can profile requests or read profiles; the middleware is gone when disabled."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = MaguvaUsers.objects.create_superuser(
+            email='admin@maguva.com', name='Admin', password='admin123'
+        )
+        cls.cashier = MaguvaUsers.objects.create_user(
+            email='cashier@maguva.com', name='Cashier', password='cashier123'
+        )
+
+    def setUp(self):
+        cache.clear()
+        authentication.user_cache.clear()
+        profile_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(PROFILING_ENABLED=True, PROFILE_DIR=profile_dir)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        return client
+
+    def test_disabled(self):
+        with override_settings(PROFILING_ENABLED=False):
+            with self.assertRaises(MiddlewareNotUsed):
+                profiling.ProfilingMiddleware(lambda request: None)
+            response = self.client_for(self.admin).get('/api/auth/verify?profile=1')
+        self.assertNotIn('X-Profile-Id', response)
+
+    def test_admin_profile(self):
+        admin = self.client_for(self.admin)
+        response = admin.get('/api/auth/verify', HTTP_X_PROFILE='1')
+        profile_id = response['X-Profile-Id']
+
+        profile = admin.get(f'/api/profiles/{profile_id}/')
+        self.assertEqual(profile.status_code, 200)
+        self.assertEqual((profile.data['path'], profile.data['status']), ('/api/auth/verify', 200))
+        folded = admin.get(f'/api/profiles/{profile_id}/?format=folded')
+        self.assertEqual((folded.status_code, folded['Content-Type']), (200, 'text/plain; charset=utf-8'))
+        self.assertEqual(folded.content.decode(), profile.data['folded'])
+        self.assertEqual(admin.get('/api/profiles/20250101-000000-missing/').status_code, 404)
+
+    def test_non_admin(self):
+        profile_id = self.client_for(self.admin).get('/api/auth/verify?profile=1')['X-Profile-Id']
+        cashier = self.client_for(self.cashier)
+        # Asking for a profile is ignored rather than refused
+        response = cashier.get('/api/auth/verify?profile=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-Id', response)
+
+        for path in (f'/api/profiles/{profile_id}/', f'/api/profiles/{profile_id}/?format=folded',
+                     '/api/profiles/20250101-000000-missing/'):
+            with self.subTest(path=path):
+                self.assertEqual(cashier.get(path).status_code, 403)
+        self.assertEqual(APIClient().get(f'/api/profiles/{profile_id}/').status_code, 401)
+
+
+class BenchmarkDataTests(TestCase):
+    """generate_benchmark_data builds the same dataset from the same seed."""
+
+    def generate(self, seed):
+        call_command(
+            'generate_benchmark_data', seed=seed, vendors=2, products=8, inventory_units=40,
+            order_items=300, years=0.2, end_date='2025-03-31', chunk_size=50, stdout=io.StringIO(),
+        )
+        skus = dict(Product.objects.values_list('id', 'sku'))
+        dataset = {
+            'vendors': list(Vendor.objects.order_by('id').values_list('vendor_name', 'phone', 'city')),
+            'products': list(Product.objects.order_by('sku').values_list(
+                'sku', 'product_type', 'fabric_type', 'base_price', 'stock_count')),
+            'batches': list(StockBatch.objects.order_by('product__sku', 'batch_number').values_list(
+                'product__sku', 'batch_number', 'added_qty', 'sold_qty', 'created_at')),
+            'orders': list(Order.objects.order_by('order_number').values_list(
+                'order_number', 'customer_name', 'payment_method', 'total_amount', 'created_at')),
+            'items': [
+                (order_number, skus[product_id], sku, quantity, line_total)
+                for order_number, product_id, sku, quantity, line_total in OrderItem.objects.order_by(
+                    'order__order_number', 'sku', 'quantity').values_list(
+                    'order__order_number', 'product_id', 'sku', 'quantity', 'line_total')
+            ],
+            'inventory': list(Inventory.objects.order_by('sku').values_list('sku', 'size', 'batch__batch_number')),
+        }
+        for model in (OrderItem, Order, Inventory, StockBatch, Product, Vendor):
+            model.objects.all().delete()
+        return dataset
+
+    def test_deterministic(self):
+        first = self.generate(seed=7)
+        self.assertEqual(len(first['inventory']), 40)
+        self.assertGreater(len(first['items']), 0)
+        self.assertEqual(self.generate(seed=7), first)
+        self.assertNotEqual(self.generate(seed=8)['orders'], first['orders'])
+
+    def test_refuses_non_empty_database(self):
+        Vendor.objects.create(
+            vendor_name='Saree Palace', contact_person_name='Rajesh', phone='9876543210',
+            email='rajesh@sareepalace.com', street='Textile Market', city='Mumbai',
+            state='Maharashtra', zip_code='400001', country='India',
+        )
+        Order.objects.create(customer_name='Anita', subtotal=1, total_amount=1, payment_amount=1)
+        with self.assertRaises(CommandError):
+            self.generate(seed=7)
@@ -0,0 +1,134 @@
+"""
+Login throttling.
+
+Every login attempt runs a full PBKDF2 password check, so a script
+hammering ``/api/login`` can pin the few gunicorn workers and stall
+checkout. ``LoginRateThrottle`` runs before the view (DRF checks throttles
+ahead of the handler) and keeps two token buckets per attempt: one per
+client IP and one per email address. An attempt that finds either bucket
+empty is answered 429 with ``Retry-After`` without hashing anything.
+The client IP is DRF's ``get_ident``, which trusts only the last
+``NUM_PROXIES`` entries of ``X-Forwarded-For``.
+
+Buckets live in the default Django cache, shared between workers when
+``REDIS_URL`` is set. If the cache is unreachable they fall back to
+per-process memory rather than failing logins. Counters are exposed at
+``/api/auth/login-throttle``.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ("allowed", "throttled_ip", "throttled_email", "cache_errors")
+
+_local = {}
+_local_lock = threading.Lock()
+_stats = dict.fromkeys(COUNTERS, 0)
+_stats_lock = threading.Lock()
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+    try:
+        cache.incr(f"login-throttle:count:{name}")
+    except ValueError:
+        cache.add(f"login-throttle:count:{name}", 1, timeout=None)
+    except Exception:
+        pass
+
+
+def stats():
+    """Counters of this process, and across processes when the cache is shared."""
+    with _stats_lock:
+        process = dict(_stats)
+    try:
+        shared = {name: cache.get(f"login-throttle:count:{name}", 0) for name in COUNTERS}
+    except Exception:
+        shared = None
+    return {"process": process, "shared": shared}
+
+
+def _load(key):
+    try:
+        return cache.get(key)
+    except Exception as e:
+        _count("cache_errors")
+        logger.warning(f"Login throttle cache unavailable, using process memory: {e}")
+        with _local_lock:
+            return _local.get(key)
+
+
+def _store(key, value, timeout):
+    try:
+        cache.set(key, value, timeout)
+    except Exception:
+        with _local_lock:
+            if len(_local) > 10000:
+                _local.clear()
+            _local[key] = value
+
+
+class TokenBucket:
+    """`capacity` attempts at once, refilled at `per_minute` attempts per minute."""
+
+    def __init__(self, name, capacity, per_minute):
+        self.name = name
+        self.capacity = capacity
+        self.rate = per_minute / 60.0
+
+    def take(self, ident):
+        """Spend one token. Returns (allowed, seconds until the next token)."""
+        key = f"login-throttle:{self.name}:{ident}"
+        now = time.time()
+        tokens, updated = _load(key) or (self.capacity, now)
+        tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            _store(key, (tokens, now), self.timeout)
+            return False, (1 - tokens) / self.rate
+        _store(key, (tokens - 1, now), self.timeout)
+        return True, 0
+
+    @property
+    def timeout(self):
+        # Long enough for an empty bucket to refill completely
+        return int(self.capacity / self.rate) + 1
+
+
+class LoginRateThrottle(BaseThrottle):
+    def __init__(self):
+        self.ip_bucket = TokenBucket(
+            "ip", settings.LOGIN_THROTTLE_IP_BURST, settings.LOGIN_THROTTLE_IP_PER_MINUTE
+        )
+        self.email_bucket = TokenBucket(
+            "email", settings.LOGIN_THROTTLE_EMAIL_BURST, settings.LOGIN_THROTTLE_EMAIL_PER_MINUTE
+        )
+        self._wait = None
+
+    def allow_request(self, request, view):
+        if request.method != "POST":
+            return True
+
+        allowed, self._wait = self.ip_bucket.take(self.get_ident(request))
+        if not allowed:
+            _count("throttled_ip")
+            return False
+
+        email = str(request.data.get("email") or "").strip().lower()
+        if email:
+            allowed, self._wait = self.email_bucket.take(email)
+            if not allowed:
+                _count("throttled_email")
+                return False
+
+        _count("allowed")
+        return True
+
+    def wait(self):
+        return self._wait
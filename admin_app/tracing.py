@@ -0,0 +1,247 @@
+"""
+Lightweight trace spans for the checkout and analytics paths.
+
+``with tracing.span("checkout.order_insert"):`` times a block and records
+the SQL it runs. The outermost span of a trace decides whether the trace is
+sampled (``TRACE_SAMPLE_RATE``); in an unsampled trace, and when tracing is
+off, every span is a no-op costing one context variable lookup. Helpers
+can be wrapped whole with ``@tracing.traced("name")``.
+
+Finished traces are exported from a background thread, one span per line
+to ``TRACE_FILE`` (``TRACE_EXPORTER=jsonl``) or as OTLP/HTTP JSON to
+``TRACE_OTLP_ENDPOINT`` (``TRACE_EXPORTER=otlp``), which any OpenTelemetry
+collector, Jaeger or Tempo accepts. At exit the thread gets a few seconds
+to export what is still queued (``shutdown``). SQL is recorded as
+statements with placeholders, never with parameter values.
+"""
+import atexit
+import contextvars
+import functools
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Statements kept per span; a runaway loop should not build a huge trace
+MAX_QUERIES_PER_SPAN = 200
+
+_UNSAMPLED = object()
+_current = contextvars.ContextVar("trace_span", default=None)
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "attributes", "start", "end", "queries", "error")
+
+    def __init__(self, trace, name, parent_id, attributes):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start = time.time_ns()
+        self.end = None
+        self.queries = []
+        self.error = None
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def as_dict(self):
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start / 1e9,
+            "duration_ms": round((self.end - self.start) / 1e6, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+            "sql": [{"sql": sql, "ms": ms} for sql, ms in self.queries],
+        }
+
+
+class Trace:
+    def __init__(self):
+        self.trace_id = os.urandom(16).hex()
+        self.spans = []
+
+
+def _record_sql(execute, sql, params, many, context):
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        current = _current.get()
+        if isinstance(current, Span) and len(current.queries) < MAX_QUERIES_PER_SPAN:
+            current.queries.append((sql, round((time.perf_counter() - start) * 1000, 3)))
+
+
+@contextmanager
+def span(name, **attributes):
+    """Time the block as a child of the current span, or as a new (maybe sampled) trace."""
+    parent = _current.get()
+    if parent is _UNSAMPLED:
+        yield None
+        return
+    if parent is None and random.random() >= settings.TRACE_SAMPLE_RATE:
+        token = _current.set(_UNSAMPLED)
+        try:
+            yield None
+        finally:
+            _current.reset(token)
+        return
+
+    trace = parent.trace if parent else Trace()
+    current = Span(trace, name, parent.span_id if parent else None, attributes)
+    token = _current.set(current)
+    with ExitStack() as stack:
+        if parent is None:
+            # One wrapper per trace; it files each query under the innermost span
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(_record_sql))
+        try:
+            yield current
+        except BaseException as e:
+            current.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            current.end = time.time_ns()
+            trace.spans.append(current)
+            _current.reset(token)
+            if parent is None:
+                _export(trace)
+
+
+def traced(name):
+    """Decorator form of ``span``."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if settings.TRACE_SAMPLE_RATE <= 0 and _current.get() is None:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class JsonLinesExporter:
+    def export(self, spans):
+        with open(settings.TRACE_FILE, "a", encoding="utf-8") as f:
+            for s in spans:
+                f.write(json.dumps(s.as_dict(), default=str) + "\n")
+
+
+class OtlpHttpExporter:
+    """OTLP/HTTP with the JSON encoding, SQL statements as span events."""
+
+    def export(self, spans):
+        body = {"resourceSpans": [{
+            "resource": {"attributes": [_attribute("service.name", settings.TRACE_SERVICE_NAME)]},
+            "scopeSpans": [{"scope": {"name": "admin_app.tracing"}, "spans": [self._span(s) for s in spans]}],
+        }]}
+        request = urllib.request.Request(
+            settings.TRACE_OTLP_ENDPOINT,
+            data=json.dumps(body, default=str).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        urllib.request.urlopen(request, timeout=5).close()
+
+    def _span(self, s):
+        data = {
+            "traceId": s.trace.trace_id,
+            "spanId": s.span_id,
+            "name": s.name,
+            "kind": 1,
+            "startTimeUnixNano": str(s.start),
+            "endTimeUnixNano": str(s.end),
+            "attributes": [_attribute(k, v) for k, v in s.attributes.items()],
+            "events": [{
+                "name": "sql",
+                "timeUnixNano": str(s.start),
+                "attributes": [_attribute("db.statement", sql), _attribute("db.duration_ms", ms)],
+            } for sql, ms in s.queries],
+            "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+        }
+        if s.parent_id:
+            data["parentSpanId"] = s.parent_id
+        return data
+
+
+def _attribute(key, value):
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+EXPORTERS = {"jsonl": JsonLinesExporter, "otlp": OtlpHttpExporter}
+
+_queue = None
+_thread = None
+_pid = None
+_lock = threading.Lock()
+
+
+def _export(trace):
+    """Hand a finished trace to this process's export thread; drop it if the queue is full."""
+    global _queue, _thread, _pid
+    if _pid != os.getpid():
+        with _lock:
+            if _pid != os.getpid():
+                _queue = queue.Queue(1000)
+                _thread = threading.Thread(
+                    target=_export_loop, args=(_queue, EXPORTERS[settings.TRACE_EXPORTER]()),
+                    name="trace-exporter", daemon=True,
+                )
+                _thread.start()
+                _pid = os.getpid()
+    try:
+        _queue.put_nowait(sorted(trace.spans, key=lambda s: s.start))
+    except queue.Full:
+        pass
+
+
+def _export_loop(spans_queue, exporter):
+    while True:
+        spans = spans_queue.get()
+        if spans is None:
+            return
+        try:
+            exporter.export(spans)
+        except Exception as e:
+            logger.warning(f"Failed to export trace {spans[0].trace.trace_id}: {e}")
+
+
+def shutdown(timeout=5):
+    """
+    Export the traces still queued in this process and stop its export
+    thread, waiting at most `timeout` seconds. The next trace starts a new
+    thread.
+    """
+    global _pid
+    with _lock:
+        if _pid != os.getpid():
+            return
+        _pid = None
+        try:
+            _queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        _thread.join(timeout)
+
+
+atexit.register(shutdown)
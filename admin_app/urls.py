@@ -6,12 +6,14 @@ urlpatterns = [
     # Login
     path('login', LoginView.as_view(), name='login'),
     path('auth/verify', verify_auth, name='verify_auth'),
+    path('auth/login-throttle', login_throttle_stats, name='login-throttle-stats'),
 
     # Vendor
     path('vendors/', VendorListView.as_view(), name='vendor-list'),
     path('vendors/add', VendorCreateView.as_view(), name='vendor-create'),
     path('vendors/<int:pk>/', VendorUpdateView.as_view(), name='vendor-update'),
     path('vendors/<int:pk>/analytics/', vendor_analytics, name='vendor-analytics'),
+    path('vendors/analytics/', vendor_analytics_batch, name='vendor-analytics-batch'),
 
     # Product
     path('products', ProductListView.as_view(), name='product-list'),
@@ -36,9 +38,12 @@ urlpatterns = [
 
     # Dashboard endpoints
     path('dashboard/analytics/', DashboardAnalyticsView.as_view(), name='dashboard-analytics'),
+    path('dashboard/stream/', dashboard_stream, name='dashboard-stream'),
+    path('dashboard/stream/ticket/', dashboard_stream_ticket, name='dashboard-stream-ticket'),
 
     # Tailor
     path("tailor/orders/", list_tailor_orders, name="list_tailor_orders"),
+    path("tailor/workload/", tailor_workload, name="tailor_workload"),
     path("tailor/orders/add/", create_tailor_order, name="create_tailor_order"),
     path("tailor/orders/<int:order_id>/update/", update_tailor_order, name="update_tailor_order"),
     path('tailor/orders/<int:order_id>/payment/', record_payment, name='record-payment'),
@@ -47,5 +52,13 @@ urlpatterns = [
 
     # Report
     path("manguva/report/", daily_report, name="daily_report"),
+    path("manguva/report/range/", daily_report_range, name="daily_report_range"),
+
+    # Background jobs
+    path("jobs/<int:pk>/", job_status, name="job-status"),
+    path("jobs/<int:pk>/result/", job_result, name="job-result"),
+
+    # Request profiles (PROFILING_ENABLED)
+    path("profiles/<slug:profile_id>/", profile_detail, name="profile-detail"),
 
 ]
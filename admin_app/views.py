@@ -2,7 +2,7 @@ from datetime import datetime, timedelta
 from django.conf import settings
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework import status, generics
 from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework.views import APIView
@@ -10,29 +10,44 @@ from django.contrib.auth import authenticate
 import logging
 from .models import *
 from .serializers import *
-from django.db.models import Sum, Count, Avg, F, Subquery, OuterRef, Value, IntegerField
+from django.db.models import Sum, Count, Avg, F, IntegerField, Max, Min, OuterRef, Q, Subquery
 from django.shortcuts import get_object_or_404
-from django.db.models.functions import TruncDate, TruncMonth
-from django.db import transaction
+from django.db import close_old_connections, transaction
 from datetime import datetime, timedelta
 from django.utils import timezone
 from decimal import Decimal
 from django.db.models.functions import Coalesce
+import asyncio
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from .authentication import CachedJWTAuthentication
+from .throttling import LoginRateThrottle
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework.exceptions import AuthenticationFailed
+from . import authentication, events, jobs, metrics, profiling, rollups, store_time, throttling, tracing
+import csv
+import itertools
+import json
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+from django.db.models import Window
+from django.db.models.functions import RowNumber
 
 logger = logging.getLogger(__name__)
 
 class LoginView(APIView):
     permission_classes = [AllowAny]
+    # Rejects floods per IP and per email before authenticate() hashes anything
+    throttle_classes = [LoginRateThrottle]
     def post(self, request):
         try:
             email = request.data.get('email')
             password = request.data.get('password')
-            
-            logger.info(f"Login attempt for email: {email}")
 
             user = authenticate(request, email=email, password=password)
             if not user:
-                logger.warning(f"Authentication failed for email: {email}")
+                logger.warning("Authentication failed for a login attempt")
                 return Response({"detail": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
 
             access_token = AccessToken.for_user(user)
@@ -45,7 +60,7 @@ class LoginView(APIView):
             else:
                 role = "user"
 
-            logger.info(f"Login successful for user: {user.email}")
+            logger.info(f"Login successful for user {user.id}")
             return Response({
                 "access": str(access_token),
                 "user": {
@@ -66,7 +81,7 @@ def verify_auth(request):
         user = request.user
         role = "admin" if user.is_superuser else "staff" if user.is_staff else "user"
         
-        logger.info(f"Auth verification for user: {user.email}, role: {role}")
+        logger.debug(f"Auth verification for user {user.id}, role: {role}")
         
         return Response({
             "user": {
@@ -78,9 +93,20 @@ def verify_auth(request):
     except Exception as e:
         logger.error(f"Auth verification error: {str(e)}")
         return Response({"detail": "Authentication error"}, status=status.HTTP_401_UNAUTHORIZED)
-            "name": user.name,
-            "role": role
-        }
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def login_throttle_stats(request):
+    """
+    /api/auth/login-throttle
+    Login attempts allowed and rejected by the login throttle, for monitoring.
+    """
+    return Response({
+        **throttling.stats(),
+        "limits": {
+            "ip": {"burst": settings.LOGIN_THROTTLE_IP_BURST, "per_minute": settings.LOGIN_THROTTLE_IP_PER_MINUTE},
+            "email": {"burst": settings.LOGIN_THROTTLE_EMAIL_BURST, "per_minute": settings.LOGIN_THROTTLE_EMAIL_PER_MINUTE},
+        },
     })
 
 class VendorListView(generics.ListAPIView):
@@ -94,7 +120,7 @@ class VendorCreateView(generics.CreateAPIView):
     permission_classes = [IsAdminUser]
 
     def create(self, request, *args, **kwargs):
-        logger.info(f"Vendor creation request by user {request.user.email}")
+        logger.info(f"Vendor creation request by user {request.user.id}")
         return super().create(request, *args, **kwargs)
 
 class VendorUpdateView(generics.UpdateAPIView):
@@ -104,7 +130,7 @@ class VendorUpdateView(generics.UpdateAPIView):
 
     def update(self, request, *args, **kwargs):
         vendor = self.get_object()
-        logger.info(f"Vendor update request by user {request.user.email} for vendor {vendor.id}")
+        logger.info(f"Vendor update request by user {request.user.id} for vendor {vendor.id}")
         return super().update(request, *args, **kwargs)
 
 # View Single Vendor
@@ -115,7 +141,7 @@ class VendorDetailView(generics.RetrieveAPIView):
 
     def retrieve(self, request, *args, **kwargs):
         vendor = self.get_object()
-        logger.info(f"Vendor details viewed: {vendor.vendor_name} by {request.user.email}")
+        logger.debug(f"Vendor {vendor.id} viewed by user {request.user.id}")
         return super().retrieve(request, *args, **kwargs)
 
 
@@ -166,7 +192,7 @@ class ProductCreateView(generics.CreateAPIView):
 
     def create(self, request, *args, **kwargs):
         try:
-            logger.info(f"Product creation request: {request.data}")
+            logger.info(f"Product creation request by user {request.user.id}")
             return super().create(request, *args, **kwargs)
         except Exception as e:
             logger.error(f"Error creating product: {e}")
@@ -179,7 +205,7 @@ class ProductUpdateView(generics.UpdateAPIView):
 
     def update(self, request, *args, **kwargs):
         product = self.get_object()
-        logger.info(f"Product update request by user {request.user.email} for product {product.id}")
+        logger.info(f"Product update request by user {request.user.id} for product {product.id}")
         return super().update(request, *args, **kwargs)
 
 
@@ -206,7 +232,7 @@ class ProductUpdateView(generics.UpdateAPIView):
 
     def update(self, request, *args, **kwargs):
         try:
-            logger.info(f"Product update request ID: {kwargs.get('pk')} data: {request.data}")
+            logger.info(f"Product update request ID: {kwargs.get('pk')} by user {request.user.id}")
             return super().update(request, *args, **kwargs)
         except Exception as e:
             logger.error(f"Error updating product: {e}")
@@ -255,6 +281,7 @@ class ProductInventoryListView(APIView):
 class InventoryCreateView(APIView):
     permission_classes = [IsAdminUser]
     """Add new inventory rows in bulk (each quantity = separate row)."""
+    @tracing.traced("inventory.create")
     def post(self, request):
         data = request.data
         if not isinstance(request.data, list):
@@ -269,7 +296,8 @@ class InventoryCreateView(APIView):
 
             first_item = data[0]
             product_id = first_item.get("product")
-            product = Product.objects.get(id=product_id)
+            with tracing.span("inventory.product_fetch", product_id=product_id):
+                product = Product.objects.get(id=product_id)
 
             # ✅ check if batch_id is passed
             batch_id = first_item.get("batch_id")
@@ -281,14 +309,15 @@ class InventoryCreateView(APIView):
                     return Response({"error": "Batch not found for this product"}, status=status.HTTP_404_NOT_FOUND)
             else:
                 # create new batch
-                last_batch = StockBatch.objects.filter(product=product).order_by("-batch_number").first()
-                next_batch_number = (last_batch.batch_number + 1) if last_batch else 1
-                batch = StockBatch.objects.create(
-                    product=product,
-                    batch_number=next_batch_number,
-                    added_qty=0,
-                    vendor=product.vendor
-                )
+                with tracing.span("inventory.batch_create"):
+                    last_batch = StockBatch.objects.filter(product=product).order_by("-batch_number").first()
+                    next_batch_number = (last_batch.batch_number + 1) if last_batch else 1
+                    batch = StockBatch.objects.create(
+                        product=product,
+                        batch_number=next_batch_number,
+                        added_qty=0,
+                        vendor=product.vendor
+                    )
 
             expanded_items = []
             total_qty = 0
@@ -313,15 +342,18 @@ class InventoryCreateView(APIView):
 
             serializer = InventorySerializer(data=expanded_items, many=True)
             if serializer.is_valid():
-                serializer.save()
+                with tracing.span("inventory.units_insert", units=len(expanded_items)):
+                    serializer.save()
 
                 # update batch + product stock
-                batch.added_qty = F("added_qty") + total_qty
-                batch.save(update_fields=["added_qty"])
+                with tracing.span("inventory.stock_update"):
+                    batch.added_qty = F("added_qty") + total_qty
+                    batch.save(update_fields=["added_qty"])
 
-                Product.objects.filter(id=product.id).update(
-                    stock_count=F("stock_count") + total_qty
-                )
+                    Product.objects.filter(id=product.id).update(
+                        stock_count=F("stock_count") + total_qty
+                    )
+                events.publish_stock_changes({product.id: total_qty})
 
                 return Response({
                     "message": "Inventory added successfully",
@@ -381,6 +413,7 @@ class InventoryDeleteView(APIView):
                 batch.save(update_fields=['added_qty'])
 
             inventory_item.delete()
+            events.publish_stock_changes({product.id: -1})
             return Response({"message": "Inventory deleted successfully"}, status=status.HTTP_204_NO_CONTENT)
 
         except Inventory.DoesNotExist:
@@ -454,6 +487,7 @@ class InventoryByCodeView(APIView):
 class CreateOrderView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @tracing.traced("checkout")
     def post(self, request):
         data = request.data
 
@@ -470,51 +504,72 @@ class CreateOrderView(APIView):
 
                 total_amount = price_after_discount + gst_amount
 
-                order = Order.objects.create(
-                    customer_name=data.get("customer", {}).get("name", ""),
-                    customer_mobile=data.get("customer", {}).get("mobile", ""),
-                    subtotal=subtotal,
-                    discount_total=discount_total,
-                    gst_percentage=18,
-                    gst_amount=gst_amount,
-                    total_amount=total_amount,
-                    payment_method=data.get("payment", {}).get("method", "cash"),
-                    payment_amount=data.get("payment", {}).get("amount", 0),
-                    created_by=request.user if request.user.is_authenticated else None
-                )
+                with tracing.span("checkout.order_insert", items=len(data["items"])):
+                    order = Order.objects.create(
+                        customer_name=data.get("customer", {}).get("name", ""),
+                        customer_mobile=data.get("customer", {}).get("mobile", ""),
+                        subtotal=subtotal,
+                        discount_total=discount_total,
+                        gst_percentage=18,
+                        gst_amount=gst_amount,
+                        total_amount=total_amount,
+                        payment_method=data.get("payment", {}).get("method", "cash"),
+                        payment_amount=data.get("payment", {}).get("amount", 0),
+                        created_by=request.user if request.user.is_authenticated else None
+                    )
+
+                # Cost and category are snapshotted onto each item at sale time
+                with tracing.span("checkout.product_fetch"):
+                    products = Product.objects.in_bulk({item["productId"] for item in data["items"]})
 
                 # Create order items
                 order_items = []
+                stock_deltas = {}
                 for item in data["items"]:
+                    product = products.get(item["productId"])
                     discount_amount = (item["price"] * item.get("discount", 0)) / 100
-                    inventory_item = Inventory.objects.get(id=item["inventoryId"])
-                    batch = inventory_item.batch  
-                    order_item = OrderItem.objects.create(
-                        order=order,
-                        product_name=item["name"],
-                        sku=item["sku"],
-                        size=item.get("size"),
-                        price=item["price"],
-                        discount_percentage=item.get("discount", 0),
-                        discount_amount=discount_amount,
-                        quantity=item.get("quantity", 1),
-                        line_total=(item["price"] - discount_amount) * item.get("quantity", 1),
-                        inventory_id=item["inventoryId"],
-                        product_id=item["productId"],
-                        batch=batch
-                    )
+                    with tracing.span("checkout.inventory_fetch", inventory_id=item["inventoryId"]):
+                        inventory_item = Inventory.objects.get(id=item["inventoryId"])
+                        batch = inventory_item.batch  
+                    with tracing.span("checkout.item_insert"):
+                        order_item = OrderItem.objects.create(
+                            order=order,
+                            product_name=item["name"],
+                            sku=item["sku"],
+                            size=item.get("size"),
+                            price=item["price"],
+                            discount_percentage=item.get("discount", 0),
+                            discount_amount=discount_amount,
+                            quantity=item.get("quantity", 1),
+                            line_total=(item["price"] - discount_amount) * item.get("quantity", 1),
+                            inventory_id=item["inventoryId"],
+                            product_id=item["productId"],
+                            batch=batch,
+                            unit_cost=product.base_price if product else None,
+                            product_type=product.product_type if product else "",
+                            fabric_type=product.fabric_type if product else "",
+                            sold_at=order.created_at,
+                        )
                     order_items.append(order_item)
-                    Product.objects.filter(id=item["productId"]).update(
-                        stock_count=models.F('stock_count') - item.get("quantity", 1)
-                    )
+                    with tracing.span("checkout.stock_update"):
+                        Product.objects.filter(id=item["productId"]).update(
+                            stock_count=models.F('stock_count') - item.get("quantity", 1)
+                        )
+                        stock_deltas[item["productId"]] = stock_deltas.get(item["productId"], 0) - item.get("quantity", 1)
 
 
-                    batch.sold_qty = F("sold_qty") + item.get("quantity", 1)
-                    batch.save(update_fields=["sold_qty"])
+                        batch.sold_qty = F("sold_qty") + item.get("quantity", 1)
+                        batch.save(update_fields=["sold_qty"])
 
-                    # delete the unit
-                    inventory_item.delete()
+                        # delete the unit
+                        inventory_item.delete()
 
+                # Push the deltas to live dashboards once the order commits
+                units = sum(item.quantity for item in order_items)
+                events.publish_order_created(order, units)
+                events.publish_stock_changes(stock_deltas)
+                rollups.request_refresh()
+                transaction.on_commit(lambda: metrics.order_created(units))
 
                 # Prepare response data
                 order_data = {
@@ -550,11 +605,17 @@ class CreateOrderView(APIView):
 
         except Exception as e:
             logger.error(f'Error while create a Order - {e}')
+            metrics.checkout_failed(e)
             return Response({"error": 'While creating order'}, status=status.HTTP_400_BAD_REQUEST)
 
         
 class OrderListView(generics.ListAPIView):
-    queryset = Order.objects.all().order_by('-created_at')
+    queryset = (
+        Order.objects.summary()
+        .select_related('created_by')
+        .prefetch_related('items')
+        .order_by('-created_at')
+    )
     serializer_class = OrderSerializer
     permission_classes = [IsAdminUser]
 
@@ -573,39 +634,9 @@ class DashboardAnalyticsView(APIView):
         try:
             # Get date range from query params (default: last 30 days)
             days = int(request.query_params.get('days', 30))
-            end_date = timezone.now()
-            start_date = end_date - timedelta(days=days)
-            
-            # Previous period for comparison
-            prev_start_date = start_date - timedelta(days=days)
-            
-            analytics_data = {}
-            
-            # 1. Key Metrics
-            analytics_data.update(self._get_key_metrics(start_date, end_date, prev_start_date))
-            
-            # 2. Monthly Revenue and Orders Trend
-            analytics_data.update(self._get_monthly_trends(start_date, end_date))
-            
-            # 3. Recent Orders
-            analytics_data['recent_orders'] = self._get_recent_orders()
-            
-            # 4. Product Performance
-            analytics_data['top_products'] = self._get_top_products(start_date, end_date)
-            
-            # 5. Low Stock Products
-            analytics_data['low_stock_products'] = self._get_low_stock_products()
-            
-            # 6. Payment Method Statistics
-            analytics_data['payment_methods'] = self._get_payment_stats(start_date, end_date)
-            
-            # 7. Vendor Performance
-            analytics_data['vendor_performance'] = self._get_vendor_performance(start_date, end_date)
-            
-            # 8. Additional Metrics
-            analytics_data.update(self._get_additional_metrics(start_date, end_date))
-            
-            return Response(analytics_data, status=status.HTTP_200_OK)
+            if wants_async(request):
+                return job_accepted(jobs.enqueue('dashboard_analytics', {'days': days}, request.user))
+            return Response(self.build(days), status=status.HTTP_200_OK)
             
         except ValueError as e:
             return Response(
@@ -619,6 +650,44 @@ class DashboardAnalyticsView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @tracing.traced("dashboard.analytics")
+    def build(self, days):
+        """The full analytics payload for the last `days` days."""
+        end_date = timezone.now()
+        start_date = end_date - timedelta(days=days)
+        
+        # Previous period for comparison
+        prev_start_date = start_date - timedelta(days=days)
+        
+        analytics_data = {}
+        
+        # 1. Key Metrics
+        analytics_data.update(self._get_key_metrics(start_date, end_date, prev_start_date))
+        
+        # 2. Monthly Revenue and Orders Trend
+        analytics_data.update(self._get_monthly_trends(start_date, end_date))
+        
+        # 3. Recent Orders
+        analytics_data['recent_orders'] = self._get_recent_orders()
+        
+        # 4. Product Performance
+        analytics_data['top_products'] = self._get_top_products(start_date, end_date)
+        
+        # 5. Low Stock Products
+        analytics_data['low_stock_products'] = self._get_low_stock_products()
+        
+        # 6. Payment Method Statistics
+        analytics_data['payment_methods'] = self._get_payment_stats(start_date, end_date)
+        
+        # 7. Vendor Performance
+        analytics_data['vendor_performance'] = self._get_vendor_performance(start_date, end_date)
+        
+        # 8. Additional Metrics
+        analytics_data.update(self._get_additional_metrics(start_date, end_date))
+        
+        return analytics_data
+
+    @tracing.traced("dashboard.key_metrics")
     def _get_key_metrics(self, start_date, end_date, prev_start_date):
         """Calculate key dashboard metrics with growth percentages"""
         try:
@@ -663,6 +732,7 @@ class DashboardAnalyticsView(APIView):
         except Exception as e:
             raise Exception(f"Error calculating key metrics: {str(e)}")
     
+    @tracing.traced("dashboard.monthly_trends")
     def _get_monthly_trends(self, start_date, end_date):
         """Get monthly revenue and order trends"""
         try:
@@ -670,7 +740,7 @@ class DashboardAnalyticsView(APIView):
             monthly_revenue = Order.objects.filter(
                 created_at__range=[start_date, end_date]
             ).annotate(
-                month=TruncMonth('created_at')
+                month=store_time.trunc('created_at', 'month')
             ).values('month').annotate(
                 revenue=Sum('total_amount')
             ).order_by('month')
@@ -679,7 +749,7 @@ class DashboardAnalyticsView(APIView):
             monthly_orders = Order.objects.filter(
                 created_at__range=[start_date, end_date]
             ).annotate(
-                month=TruncMonth('created_at')
+                month=store_time.trunc('created_at', 'month')
             ).values('month').annotate(
                 orders=Count('id')
             ).order_by('month')
@@ -708,10 +778,11 @@ class DashboardAnalyticsView(APIView):
         except Exception as e:
             raise Exception(f"Error getting monthly trends: {str(e)}")
     
+    @tracing.traced("dashboard.recent_orders")
     def _get_recent_orders(self, limit=10):
         """Get recent orders with customer details"""
         try:
-            recent_orders = Order.objects.select_related().prefetch_related('items').order_by('-created_at')[:limit]
+            recent_orders = Order.objects.summary().order_by('-created_at')[:limit]
             
             orders_data = []
             for order in recent_orders:
@@ -722,7 +793,9 @@ class DashboardAnalyticsView(APIView):
                     'customer_mobile': order.customer_mobile,
                     'total_amount': float(order.total_amount),
                     'payment_method': order.payment_method,
-                    'items_count': order.items.count(),
+                    'items_count': order.items_count,
+                    'units_count': order.units_count,
+                    'created_by': order.created_by_name,
                     'created_at': order.created_at.isoformat(),
                 })
             
@@ -730,16 +803,13 @@ class DashboardAnalyticsView(APIView):
         except Exception as e:
             raise Exception(f"Error getting recent orders: {str(e)}")
     
+    @tracing.traced("dashboard.top_products")
     def _get_top_products(self, start_date, end_date, limit=10):
         """Get top performing products by revenue (aggregated per product type)"""
         try:
             top_products = (
-                OrderItem.objects.filter(
-                    order__created_at__range=[start_date, end_date]
-                )
-                .values(
-                    product_type=F("batch__product__product_type")
-                )
+                OrderItem.objects.sold_between(start_date, end_date)
+                .values("product_type")
                 .annotate(
                     revenue=Sum("line_total"),
                     quantity_sold=Sum("quantity")
@@ -758,7 +828,8 @@ class DashboardAnalyticsView(APIView):
         except Exception as e:
             raise Exception(f"Error getting top products: {str(e)}")
     
-    def _get_low_stock_products(self, threshold=10):
+    @tracing.traced("dashboard.low_stock_products")
+    def _get_low_stock_products(self, threshold=settings.DASHBOARD_LOW_STOCK_THRESHOLD):
         """Get products with low stock levels"""
         try:
             low_stock = Product.objects.filter(
@@ -779,6 +850,7 @@ class DashboardAnalyticsView(APIView):
         except Exception as e:
             raise Exception(f"Error getting low stock products: {str(e)}")
     
+    @tracing.traced("dashboard.payment_stats")
     def _get_payment_stats(self, start_date, end_date):
         """Get payment method statistics"""
         try:
@@ -800,54 +872,50 @@ class DashboardAnalyticsView(APIView):
         except Exception as e:
             raise Exception(f"Error getting payment stats: {str(e)}")
     
+    @tracing.traced("dashboard.vendor_performance")
     def _get_vendor_performance(self, start_date, end_date, limit=10):
         """Get vendor performance metrics"""
         try:
-            vendor_performance = []
-            
-            # Get all vendors first
-            vendors = Vendor.objects.all()
-            
-            for vendor in vendors:
-                # Get all products for this vendor
-                vendor_product_ids = list(vendor.products.values_list('id', flat=True))
-                
-                if not vendor_product_ids:
-                    continue
-                
-                # Calculate metrics for each vendor using product IDs
-                vendor_orders = OrderItem.objects.filter(
-                    order__created_at__range=[start_date, end_date],
-                    product_id__in=vendor_product_ids
-                ).select_related('order')
-                
-                total_revenue = vendor_orders.aggregate(
-                    total=Sum('line_total')
-                )['total'] or Decimal('0')
-                
-                # Only include vendors with orders in the period
-                if total_revenue > 0:
-                    vendor_performance.append({
-                        'vendor_id': vendor.id,
-                        'vendor_name': vendor.vendor_name,
-                        'total_revenue': float(total_revenue),
-                        'product_count': vendor.products.count(),
-                        'order_count': vendor_orders.values('order_id').distinct().count()
-                    })
-            
-            # Sort by revenue and limit
-            vendor_performance.sort(key=lambda x: x['total_revenue'], reverse=True)
-            return vendor_performance[:limit]
-            
+            # Revenue and orders per vendor in one grouped query, top `limit` only
+            vendor_id = Subquery(Product.objects.filter(id=OuterRef('product_id')).values('vendor_id')[:1])
+            sales = list(
+                OrderItem.objects.filter(order__created_at__range=[start_date, end_date])
+                .annotate(vendor_id=vendor_id)
+                .exclude(vendor_id__isnull=True)
+                .values('vendor_id')
+                .annotate(total_revenue=Sum('line_total'), order_count=Count('order_id', distinct=True))
+                .filter(total_revenue__gt=0)
+                .order_by('-total_revenue', 'vendor_id')[:limit]
+            )
+
+            vendors = {
+                vendor['id']: vendor
+                for vendor in Vendor.objects.filter(id__in=[row['vendor_id'] for row in sales])
+                .values('id', 'vendor_name')
+                .annotate(product_count=Count('products'))
+            }
+
+            return [
+                {
+                    'vendor_id': row['vendor_id'],
+                    'vendor_name': vendors[row['vendor_id']]['vendor_name'],
+                    'total_revenue': float(row['total_revenue']),
+                    'product_count': vendors[row['vendor_id']]['product_count'],
+                    'order_count': row['order_count'],
+                }
+                for row in sales
+            ]
+
         except Exception as e:
             raise Exception(f"Error getting vendor performance: {str(e)}")
     
+    @tracing.traced("dashboard.additional_metrics")
     def _get_additional_metrics(self, start_date, end_date):
         """Get additional dashboard metrics"""
         try:
             # Items sold in period
-            items_sold = OrderItem.objects.filter(
-                order__created_at__range=[start_date, end_date]
+            items_sold = OrderItem.objects.sold_between(
+                start_date, end_date
             ).aggregate(total=Sum('quantity'))['total'] or 0
             
             # Products running low (stock < 5)
@@ -856,11 +924,11 @@ class DashboardAnalyticsView(APIView):
             # Out of stock products
             out_of_stock_count = Product.objects.filter(stock_count=0).count()
             
-            # New products this month
-            current_month_start = timezone.now().replace(day=1)
-            new_products_this_month = Product.objects.filter(
-                id__gte=1  # Assuming auto-incrementing IDs, adjust as needed
-            ).count()  # This is a simplified calculation
+            # New products this month: first stock received this month
+            current_month_start = store_time.month_start()
+            new_products_this_month = Product.objects.annotate(
+                first_received=Min('batches__created_at')
+            ).filter(first_received__gte=current_month_start).count()
             
             return {
                 'items_sold': {
@@ -871,20 +939,138 @@ class DashboardAnalyticsView(APIView):
                     'out_of_stock': out_of_stock_count
                 },
                 'new_products_this_month': new_products_this_month,
-                'inventory_turnover': 4.2,  # This would need more complex calculation
-                'products_growth': 12.5,  # This would need historical data
-                'inventory_growth': 8.3   # This would need historical data
+                **self._get_stock_history_metrics(start_date, end_date),
             }
         except Exception as e:
             raise Exception(f"Error getting additional metrics: {str(e)}")
     
-    def _calculate_growth(self, previous, current):
+    @tracing.traced("dashboard.stock_history_metrics")
+    def _get_stock_history_metrics(self, start_date, end_date):
+        """Inventory turnover and growth from the daily stock snapshots"""
+        # Latest snapshot taken on or before each end of the period
+        bounds = StockSnapshot.objects.aggregate(
+            start=Max('snapshot_date', filter=Q(snapshot_date__lte=store_time.local_date(start_date))),
+            end=Max('snapshot_date', filter=Q(snapshot_date__lte=store_time.local_date(end_date))),
+            first=Min('snapshot_date'),
+        )
+        # History shorter than the period: measure from the first snapshot
+        start_date = bounds['start'] or bounds['first']
+        end_date = bounds['end']
+        if not end_date:
+            return {
+                'inventory_turnover': 0.0,
+                'products_growth': 0.0,
+                'inventory_growth': 0.0,
+            }
+
+        positions = {
+            row['snapshot_date']: row
+            for row in StockSnapshot.objects.filter(
+                snapshot_date__in=[start_date, end_date]
+            ).values('snapshot_date').annotate(
+                value=Sum('stock_value'),
+                products=Count('product', distinct=True, filter=Q(quantity__gt=0)),
+            )
+        }
+        start = positions[start_date]
+        end = positions[end_date]
+
+        # Cost of goods sold between the two snapshots
+        cogs = StockSnapshot.objects.filter(
+            snapshot_date__gt=start_date, snapshot_date__lte=end_date
+        ).aggregate(total=Sum('sold_value'))['total'] or Decimal('0')
+
+        average_value = (start['value'] + end['value']) / 2
+        turnover = float(cogs / average_value) if average_value else 0.0
+
+        return {
+            'inventory_turnover': round(turnover, 2),
+            'products_growth': self._calculate_growth(start['products'], end['products']),
+            'inventory_growth': self._calculate_growth(float(start['value']), float(end['value'])),
+        }
+    
+    @staticmethod
+    def _calculate_growth(previous, current):
         """Calculate growth percentage"""
         if previous == 0:
             return 100.0 if current > 0 else 0.0
         return round(((current - previous) / previous) * 100, 2)
 
 
+async def _authenticate_stream(request):
+    """
+    Resolve the user of the event stream from the Authorization header or,
+    for browsers' EventSource, a ?ticket= from dashboard/stream/ticket/.
+    """
+    auth = CachedJWTAuthentication()
+    header = auth.get_header(request)
+    if header is None:
+        user_id = authentication.redeem_stream_ticket(request.GET.get("ticket", ""))
+        if user_id is None:
+            return None
+        return await MaguvaUsers.objects.filter(pk=user_id).afirst()
+    try:
+        raw_token = auth.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = auth.get_validated_token(raw_token)
+        return await sync_to_async(auth.get_user)(validated_token)
+    except (InvalidToken, TokenError, AuthenticationFailed) as e:
+        logger.warning(f"Dashboard stream authentication failed: {e}")
+        return None
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def dashboard_stream_ticket(request):
+    """
+    /api/dashboard/stream/ticket/
+    Single-use ticket for opening dashboard/stream/?ticket=... with EventSource.
+    """
+    return Response({
+        "ticket": authentication.issue_stream_ticket(request.user),
+        "expires_in": settings.DASHBOARD_STREAM_TICKET_TTL,
+    }, status=status.HTTP_200_OK)
+
+
+async def dashboard_stream(request):
+    """
+    /api/dashboard/stream/
+    Server-sent events carrying incremental dashboard deltas:
+    - order.created (new order totals)
+    - stock.changed (per-product stock movements)
+    - stock.low (low-stock threshold crossings)
+    - resync (client fell behind and should refetch dashboard/analytics/)
+    """
+    user = await _authenticate_stream(request)
+    if user is None or not user.is_active:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+    # Hand back the connection used to authenticate instead of holding it for the
+    # stream's lifetime; the stream is exempt from ASGI_MAX_CONCURRENT_REQUESTS
+    await sync_to_async(close_old_connections)()
+
+    keepalive = settings.DASHBOARD_EVENTS_KEEPALIVE
+
+    async def stream():
+        subscription = events.get_channel_layer().subscribe()
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    message = await subscription.get(timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield events.format_sse(message)
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
 class BatchBriefSerializer(serializers.Serializer):
     batch_id = serializers.IntegerField()
     batch_number = serializers.IntegerField()
@@ -917,181 +1103,278 @@ class ProductStockDetailSerializer(serializers.Serializer):
     batches = BatchDetailSerializer(many=True)
 
 
+class SalesPeriodSerializer(serializers.Serializer):
+    start = serializers.DateField()
+    end = serializers.DateField()
+    sold_stock = serializers.IntegerField()
+    revenue = serializers.FloatField()
+
+
+class SalesComparisonSerializer(SalesPeriodSerializer):
+    sold_growth = serializers.FloatField()
+    revenue_growth = serializers.FloatField()
+    top_products = TopProductSerializer(many=True)
+
+
 class VendorAnalyticsSerializer(serializers.Serializer):
     vendor_id = serializers.IntegerField()
     vendor_name = serializers.CharField()
     total_products = serializers.IntegerField()
     total_stock = serializers.IntegerField()
+    # "month" fields cover the requested period (the current month by default)
     month_sold_stock = serializers.IntegerField()
     top_batches_this_month = BatchBriefSerializer(many=True)
     top_products_this_month = TopProductSerializer(many=True)
     product_stock_details = ProductStockDetailSerializer(many=True)
+    period = SalesPeriodSerializer()
+    comparison = SalesComparisonSerializer(allow_null=True)
 
 
 # -----------------------------
-# Function-based analytics view
+# Function-based analytics views
 # -----------------------------
 
-@api_view(["GET"])
-@permission_classes([IsAdminUser])
-def vendor_analytics(request, pk):
+def _parse_analytics_period(params):
     """
-    /api/vendors/<pk>/analytics/
-    Returns:
-    - total_products
-    - total_stock (available)
-    - month_sold_stock
-    - top_batches_this_month (ranked)
-    - top_products_this_month (ranked)
-    - product_stock_details (per-product + per-batch)
+    Read `from`/`to` (YYYY-MM-DD, default: current month to date) and
+    `compare_to` (`previous_period`, `previous_year` or the YYYY-MM-DD start
+    of an equally long period). Raises ValueError on bad input.
     """
-    vendor = get_object_or_404(Vendor, pk=pk)
+    today = store_time.today()
+    date_from = params.get("from")
+    date_to = params.get("to")
+    start = datetime.strptime(date_from, "%Y-%m-%d").date() if date_from else today.replace(day=1)
+    end = datetime.strptime(date_to, "%Y-%m-%d").date() if date_to else today
+    if start > end:
+        raise ValueError("'from' must not be after 'to'")
+
+    compare_to = params.get("compare_to")
+    length = end - start
+    if not compare_to:
+        comparison = None
+    elif compare_to == "previous_period":
+        comparison = (start - length - timedelta(days=1), start - timedelta(days=1))
+    elif compare_to == "previous_year":
+        comparison = (_years_before(start, 1), _years_before(end, 1))
+    else:
+        compare_start = datetime.strptime(compare_to, "%Y-%m-%d").date()
+        comparison = (compare_start, compare_start + length)
+    return (start, end), comparison
+
+
+def _years_before(day, years):
+    try:
+        return day.replace(year=day.year - years)
+    except ValueError:  # 29 February
+        return day.replace(year=day.year - years, day=28)
 
-    # timeframe = current month
-    now = timezone.now()
-    start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
 
-    # All products for this vendor
-    vendor_products_qs = Product.objects.filter(vendor=vendor).only("id", "product_type")
-    product_ids = list(vendor_products_qs.values_list("id", flat=True))
+def _ranked(queryset, limit=10):
+    """Keep the top `limit` rows per vendor of a sales rollup ranking."""
+    return queryset.annotate(
+        rank=Window(RowNumber(), partition_by=[F("vendor_id")], order_by=F("sold").desc())
+    ).filter(rank__lte=limit)
 
-    # -----------------------------
-    # Totals
-    # -----------------------------
-    total_products = vendor_products_qs.count()
 
-    # Current stock = sum(added_qty - sold_qty) across batches
-    batch_totals = StockBatch.objects.filter(product__in=product_ids).aggregate(
-        total_added=Coalesce(Sum("added_qty"), Value(0)),
-        total_sold=Coalesce(Sum("sold_qty"), Value(0)),
-    )
-    total_stock_available = int(batch_totals["total_added"] - batch_totals["total_sold"])
-
-    # This month's sold = sum(OrderItem.quantity) filtered by orders in this month
-    month_sold_qs = OrderItem.objects.filter(
-        product_id__in=product_ids,
-        order__created_at__gte=start_of_month,
-    ).aggregate(total=Coalesce(Sum("quantity"), Value(0)))
-    month_sold_stock = int(month_sold_qs["total"])
-
-    # -----------------------------
-    # Top batches sold this month (ranking)
-    # Need batch for each OrderItem via Inventory(inventory_id)->batch
-    # -----------------------------
-    # Annotate OrderItem with batch_id via Subquery
-    batch_id_subquery = Subquery(
-        Inventory.objects.filter(id=OuterRef("inventory_id")).values("batch_id")[:1]
-    )
+def _period_sales(vendor_ids, start, end):
+    """Units, revenue and top products per vendor over [start, end] from the rollup."""
+    sales = SalesRollup.objects.filter(vendor_id__in=vendor_ids, sale_date__range=(start, end))
 
-    oi_with_batch = (
-        OrderItem.objects
-        .filter(product_id__in=product_ids, order__created_at__gte=start_of_month)
-        .exclude(batch__isnull=True)
-        .values("batch_id")
-        .annotate(sold=Coalesce(Sum("quantity"), Value(0)))
-        .order_by("-sold")
-    )[:10]
-
-
-    # Fetch batch numbers for these batch_ids
-    batch_map = {
-        b.id: b.batch_number
-        for b in StockBatch.objects.filter(id__in=[row["batch_id"] for row in oi_with_batch])
+    totals = {
+        row["vendor_id"]: row
+        for row in sales.values("vendor_id").annotate(units=Sum("units"), revenue=Sum("revenue")).order_by()
     }
-    top_batches = [
-        {
-            "batch_id": row["batch_id"],
-            "batch_number": batch_map.get(row["batch_id"], 0),
-            "sold": int(row["sold"]),
-        }
-        for row in oi_with_batch
-    ]
 
-    # -----------------------------
-    # Top products sold this month (ranking)
-    # -----------------------------
-    top_products_qs = (
-        OrderItem.objects
-        .filter(product_id__in=product_ids, order__created_at__gte=start_of_month)
-        .values("product_id")
-        .annotate(sold=Coalesce(Sum("quantity"), Value(0)))
-        .order_by("-sold")
-    )[:10]
-
-    # Map product_id -> product_type
-    product_type_map = {
-        p.id: p.product_type
-        for p in vendor_products_qs
-    }
-    top_products = [
-        {
+    top_products = {}
+    for row in _ranked(
+        sales
+        .values("vendor_id", "product_id", "product_type")
+        .annotate(sold=Sum("units"))
+    ).order_by("vendor_id", "rank"):
+        top_products.setdefault(row["vendor_id"], []).append({
             "product_id": row["product_id"],
-            "product_type": product_type_map.get(row["product_id"], "Unknown"),
+            "product_type": row["product_type"] or "Unknown",
             "sold": int(row["sold"]),
-        }
-        for row in top_products_qs
-    ]
-
-    # -----------------------------
-    # Per-product stock details (and batch breakdown)
-    # -----------------------------
-    product_stock_details = []
-    # Prefetch batches for all products at once
-    batches_qs = (
-        StockBatch.objects
-        .filter(product__in=product_ids)
-        .values("product_id", "id", "batch_number", "added_qty", "sold_qty")
-    )
+        })
+
+    return sales, totals, top_products
+
+
+def _build_vendor_analytics(vendors, period=None, comparison=None):
+    """
+    Yield the VendorAnalyticsSerializer payload for each vendor. Every
+    aggregate is one grouped query keyed by vendor, so the query count does
+    not depend on how many vendors are requested. Sales figures come from
+    the daily rollup, so a long period costs about as much as a short one.
+    """
+    vendors = list(vendors)
+    vendor_ids = [v.id for v in vendors]
 
-    # Group batches by product
+    # timeframe = current month unless a period is given
+    if period is None:
+        today = store_time.today()
+        period = (today.replace(day=1), today)
+
+    # All products, one query
+    products_by_vendor = {}
+    for p in Product.objects.filter(vendor_id__in=vendor_ids).values("id", "vendor_id", "product_type"):
+        products_by_vendor.setdefault(p["vendor_id"], []).append(p)
+
+    # All batches, one query, grouped by product
     batches_by_product = {}
-    for b in batches_qs:
+    for b in (
+        StockBatch.objects
+        .filter(product__vendor_id__in=vendor_ids)
+        .values("product_id", "id", "batch_number", "added_qty", "sold_qty")
+        .order_by("batch_number")
+    ):
         batches_by_product.setdefault(b["product_id"], []).append(b)
 
-    for p in vendor_products_qs:
-        p_batches = batches_by_product.get(p.id, [])
-        total_added = sum(b["added_qty"] for b in p_batches) if p_batches else 0
-        total_sold = sum(b["sold_qty"] for b in p_batches) if p_batches else 0
-        total_available = total_added - total_sold
-
-        batch_details = [
-            {
-                "id": b["id"],
-                "batch_number": b["batch_number"],
-                "added_qty": int(b["added_qty"]),
-                "sold_qty": int(b["sold_qty"]),
-                "available_qty": int(b["added_qty"] - b["sold_qty"]),
-            }
-            for b in sorted(p_batches, key=lambda x: x["batch_number"])
-        ]
+    # Sales come from the precomputed daily rollup (see admin_app/rollups.py)
+    month_sales, month_totals, top_products = _period_sales(vendor_ids, *period)
+    if comparison:
+        _, compare_totals, compare_top_products = _period_sales(vendor_ids, *comparison)
 
-        product_stock_details.append({
-            "product_id": p.id,
-            "product_type": p.product_type,
-            "total_added": int(total_added),
-            "total_sold": int(total_sold),
-            "total_available": int(total_available),
-            "batches": batch_details,
+    # Top batches sold in the period (ranking), top 10 per vendor
+    top_batches = {}
+    for row in _ranked(
+        month_sales
+        .exclude(batch__isnull=True)
+        .values("vendor_id", "batch_id", batch_number=F("batch__batch_number"))
+        .annotate(sold=Sum("units"))
+    ).order_by("vendor_id", "rank"):
+        top_batches.setdefault(row["vendor_id"], []).append({
+            "batch_id": row["batch_id"],
+            "batch_number": row["batch_number"] or 0,
+            "sold": int(row["sold"]),
         })
 
-    # -----------------------------
-    # Serialize and return
-    # -----------------------------
-    payload = {
-        "vendor_id": vendor.id,
-        "vendor_name": vendor.vendor_name,
-        "total_products": total_products,
-        "total_stock": total_stock_available,
-        "month_sold_stock": month_sold_stock,
-        "top_batches_this_month": top_batches,
-        "top_products_this_month": top_products,
-        "product_stock_details": product_stock_details,
-    }
+    empty = {"units": 0, "revenue": Decimal("0")}
+
+    for vendor in vendors:
+        # Per-product stock details (and batch breakdown)
+        product_stock_details = []
+        for p in products_by_vendor.get(vendor.id, []):
+            p_batches = batches_by_product.get(p["id"], [])
+            total_added = sum(b["added_qty"] for b in p_batches)
+            total_sold = sum(b["sold_qty"] for b in p_batches)
+
+            product_stock_details.append({
+                "product_id": p["id"],
+                "product_type": p["product_type"],
+                "total_added": int(total_added),
+                "total_sold": int(total_sold),
+                "total_available": int(total_added - total_sold),
+                "batches": [
+                    {
+                        "id": b["id"],
+                        "batch_number": b["batch_number"],
+                        "added_qty": int(b["added_qty"]),
+                        "sold_qty": int(b["sold_qty"]),
+                        "available_qty": int(b["added_qty"] - b["sold_qty"]),
+                    }
+                    for b in p_batches
+                ],
+            })
+
+        sold = month_totals.get(vendor.id, empty)
+        vendor_comparison = None
+        if comparison:
+            compare_sold = compare_totals.get(vendor.id, empty)
+            vendor_comparison = {
+                "start": comparison[0],
+                "end": comparison[1],
+                "sold_stock": int(compare_sold["units"]),
+                "revenue": float(compare_sold["revenue"]),
+                "sold_growth": DashboardAnalyticsView._calculate_growth(
+                    int(compare_sold["units"]), int(sold["units"])
+                ),
+                "revenue_growth": DashboardAnalyticsView._calculate_growth(
+                    float(compare_sold["revenue"]), float(sold["revenue"])
+                ),
+                "top_products": compare_top_products.get(vendor.id, []),
+            }
+
+        yield {
+            "vendor_id": vendor.id,
+            "vendor_name": vendor.vendor_name,
+            "total_products": len(product_stock_details),
+            # Current stock = sum(added_qty - sold_qty) across batches
+            "total_stock": sum(p["total_available"] for p in product_stock_details),
+            "month_sold_stock": int(sold["units"]),
+            "top_batches_this_month": top_batches.get(vendor.id, []),
+            "top_products_this_month": top_products.get(vendor.id, []),
+            "product_stock_details": product_stock_details,
+            "period": {
+                "start": period[0],
+                "end": period[1],
+                "sold_stock": int(sold["units"]),
+                "revenue": float(sold["revenue"]),
+            },
+            "comparison": vendor_comparison,
+        }
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def vendor_analytics(request, pk):
+    """
+    /api/vendors/<pk>/analytics/?from=YYYY-MM-DD&to=YYYY-MM-DD&compare_to=previous_year
+    Returns:
+    - total_products
+    - total_stock (available)
+    - month_sold_stock (sold in the period, default current month)
+    - top_batches_this_month (ranked)
+    - top_products_this_month (ranked)
+    - product_stock_details (per-product + per-batch)
+    - period / comparison (sold and revenue, growth vs. compare_to)
+    """
+    vendor = get_object_or_404(Vendor, pk=pk)
+    try:
+        period, comparison = _parse_analytics_period(request.query_params)
+    except ValueError as e:
+        return Response({"error": f"Invalid parameter: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
+    payload = next(_build_vendor_analytics([vendor], period, comparison))
 
     serializer = VendorAnalyticsSerializer(payload)
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def vendor_analytics_batch(request):
+    """
+    /api/vendors/analytics/?ids=1,2,3
+    Same payload and period parameters as /api/vendors/<pk>/analytics/ for
+    several vendors (all vendors when `ids` is omitted), as a JSON array.
+    With `async=1` the array is built by a background job instead.
+    """
+    vendors = Vendor.objects.order_by("id")
+    ids = request.query_params.get("ids")
+    if ids:
+        try:
+            ids = [int(i) for i in ids.split(",") if i.strip()]
+        except ValueError:
+            return Response({"error": "ids must be a comma-separated list of vendor ids"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        vendors = vendors.filter(id__in=ids)
+    try:
+        period, comparison = _parse_analytics_period(request.query_params)
+    except ValueError as e:
+        return Response({"error": f"Invalid parameter: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+    if wants_async(request):
+        return job_accepted(jobs.enqueue("vendor_analytics_batch", {
+            "ids": ids or None,
+            "period": [day.isoformat() for day in period],
+            "comparison": [day.isoformat() for day in comparison] if comparison else None,
+        }, request.user))
+
+    # Every aggregate runs before the first payload exists, so there is nothing to stream
+    serializer = VendorAnalyticsSerializer(_build_vendor_analytics(vendors, period, comparison), many=True)
+    return Response(serializer.data, status=status.HTTP_200_OK)
+
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def list_tailor_orders(request):
@@ -1166,9 +1449,58 @@ def create_tailor_order(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+# Fields a client may change through update_tailor_order; everything else
+# (status, order number, balance, timestamps) is managed by the server
+TAILOR_ORDER_WRITABLE_FIELDS = [
+    "customer_name", "customer_mobile", "product_name", "description",
+    "delivery_date", "total_amount", "advance_paid",
+]
+TAILOR_ITEM_WRITABLE_FIELDS = ["item_name", "quantity", "remarks"]
+
+
+def _diff_tailor_items(existing, items_data):
+    """
+    Compare the submitted `item_details` with the order's current items
+    (`existing`, keyed by id) and return (to_update, to_create, to_delete_ids).
+    Only items whose writable fields actually change are updated; ids that
+    do not belong to the order are ignored, and current items missing from
+    the submission are deleted.
+    """
+    to_update, to_create, kept = [], [], set()
+    for item in items_data:
+        item_id = item.get("id")
+        if item_id:
+            obj = existing.get(int(item_id))
+            if obj is None:
+                continue
+            kept.add(obj.id)
+            changed = False
+            for field in TAILOR_ITEM_WRITABLE_FIELDS:
+                if field in item and getattr(obj, field) != item[field]:
+                    setattr(obj, field, item[field])
+                    changed = True
+            if changed:
+                to_update.append(obj)
+        else:
+            if not item.get("item_name"):
+                raise ValueError("item_name is required for new items")
+            to_create.append(TailorOrderItemDetail(
+                item_name=item["item_name"],
+                quantity=item.get("quantity", 1),
+                remarks=item.get("remarks", ""),
+            ))
+    return to_update, to_create, [item_id for item_id in existing if item_id not in kept]
+
+
 @api_view(["PUT", "PATCH"])
 @permission_classes([IsAuthenticated])
 def update_tailor_order(request, order_id):
+    """
+    Update a tailor order and, when `item_details` is sent, sync its items.
+    The item list is diffed against the stored items and applied with one
+    bulk update, one bulk insert and one delete, so the query count does not
+    grow with the size of the order.
+    """
     try:
         order = get_object_or_404(TailorOrder, id=order_id)
 
@@ -1179,9 +1511,12 @@ def update_tailor_order(request, order_id):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # ✅ Update order fields
-        mobile = request.data.get("customer_mobile", "").lstrip("0")
-        update_data = {**request.data, "customer_mobile": mobile}
+        # ✅ Update order fields (whitelisted)
+        update_data = {
+            field: request.data[field] for field in TAILOR_ORDER_WRITABLE_FIELDS if field in request.data
+        }
+        if "customer_mobile" in update_data:
+            update_data["customer_mobile"] = str(update_data["customer_mobile"]).lstrip("0")
 
         # Validate amounts
         total_amount = Decimal(update_data.get("total_amount", order.total_amount))
@@ -1191,47 +1526,40 @@ def update_tailor_order(request, order_id):
                 {"error": "Advance cannot be greater than total amount."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-
-        # Update basic fields
-        for field, value in update_data.items():
-            if field not in ["item_details"]:  # skip items for now
-                setattr(order, field, value)
-        order.save()
-
-        # ✅ Update / Create items
-        items_data = update_data.get("item_details", [])
-        existing_ids = []
-
-        for item in items_data:
-            item_id = item.get("id")
-            if item_id:  # update existing
-                try:
-                    obj = order.item_details.get(id=item_id)
-                    obj.item_name = item.get("item_name", obj.item_name)
-                    obj.quantity = item.get("quantity", obj.quantity)
-                    obj.remarks = item.get("remarks", obj.remarks)
-                    obj.save()
-                    existing_ids.append(obj.id)
-                except TailorOrderItemDetail.DoesNotExist:
-                    continue
-            else:  # create new
-                new_obj = TailorOrderItemDetail.objects.create(
-                    tailor_order=order,
-                    item_name=item["item_name"],
-                    quantity=item.get("quantity", 1),
-                    remarks=item.get("remarks", "")
+        for field, value in (("total_amount", total_amount), ("advance_paid", advance_paid)):
+            if field in update_data:
+                update_data[field] = value
+
+        with transaction.atomic():
+            if update_data:
+                for field, value in update_data.items():
+                    setattr(order, field, value)
+                order.save(update_fields=[*update_data, "balance_amount", "updated_at"])
+
+            # ✅ Sync items: one read, then at most one update, insert and delete
+            if "item_details" in request.data:
+                existing = {item.id: item for item in order.item_details.all()}
+                to_update, to_create, to_delete = _diff_tailor_items(existing, request.data["item_details"])
+                if to_update:
+                    TailorOrderItemDetail.objects.bulk_update(to_update, TAILOR_ITEM_WRITABLE_FIELDS)
+                if to_create:
+                    for item in to_create:
+                        item.tailor_order = order
+                    TailorOrderItemDetail.objects.bulk_create(to_create)
+                if to_delete:
+                    TailorOrderItemDetail.objects.filter(id__in=to_delete).delete()
+                logger.info(
+                    f"Updated TailorOrder #{order.order_number}: {len(to_update)} items changed, "
+                    f"{len(to_create)} added, {len(to_delete)} removed"
                 )
-                existing_ids.append(new_obj.id)
 
-        # ✅ Delete removed items
-        order.item_details.exclude(id__in=existing_ids).delete()
-
-        logger.info(f"Updated TailorOrder #{order.order_number} with {order.item_details.count()} items")
         return Response(
             TailorOrderSerializer(order).data,
             status=status.HTTP_200_OK
         )
 
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         logger.error(f"Error updating tailor order {order_id}: {str(e)}", exc_info=True)
         return Response(
@@ -1365,97 +1693,545 @@ def delete_order(request, order_id):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
-import pytz
-IST = pytz.timezone("Asia/Kolkata")
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def tailor_workload(request):
+    """
+    /api/tailor/workload/?from=YYYY-MM-DD&to=YYYY-MM-DD&quantity=N
+    Open (not yet delivered) tailoring work due per delivery date, broken
+    down by item type, for a window of at most TAILOR_WORKLOAD_MAX_DAYS days
+    (default: today and the next two weeks). With TAILOR_DAILY_CAPACITY set,
+    each day shows the units still free and `first_available_date` is the
+    earliest day in the window that can take `quantity` more units.
+    Answers from three grouped queries on the (status, delivery_date) index.
+    """
+    try:
+        today = store_time.today()
+        date_from = request.query_params.get("from")
+        date_to = request.query_params.get("to")
+        start = datetime.strptime(date_from, "%Y-%m-%d").date() if date_from else today
+        end = datetime.strptime(date_to, "%Y-%m-%d").date() if date_to else start + timedelta(days=14)
+        quantity = int(request.query_params.get("quantity", 1))
+    except ValueError:
+        return Response(
+            {"error": "'from' and 'to' must be YYYY-MM-DD and 'quantity' a number"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if start > end:
+        return Response({"error": "'from' must not be after 'to'"}, status=status.HTTP_400_BAD_REQUEST)
+    if (end - start).days >= settings.TAILOR_WORKLOAD_MAX_DAYS:
+        return Response(
+            {"error": f"Window is limited to {settings.TAILOR_WORKLOAD_MAX_DAYS} days"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        open_orders = TailorOrder.objects.filter(status="ordered")
+
+        # Orders and balance due per day
+        days = {
+            start + timedelta(days=offset): {"orders": 0, "units": 0, "balance_due": Decimal("0"), "items": []}
+            for offset in range((end - start).days + 1)
+        }
+        for row in (
+            open_orders.filter(delivery_date__range=(start, end))
+            .values("delivery_date")
+            .annotate(orders=Count("id"), balance_due=Sum("balance_amount"))
+            .order_by()
+        ):
+            days[row["delivery_date"]].update(orders=row["orders"], balance_due=row["balance_due"])
+
+        # Units per day and item type
+        for row in (
+            TailorOrderItemDetail.objects
+            .filter(tailor_order__status="ordered", tailor_order__delivery_date__range=(start, end))
+            .values("item_name", delivery_date=F("tailor_order__delivery_date"))
+            .annotate(quantity=Sum("quantity"), orders=Count("tailor_order", distinct=True))
+            .order_by("delivery_date", "-quantity", "item_name")
+        ):
+            day = days[row["delivery_date"]]
+            day["units"] += row["quantity"]
+            day["items"].append({
+                "item_name": row["item_name"],
+                "quantity": row["quantity"],
+                "orders": row["orders"],
+            })
+
+        # Work already late, still on the desk
+        overdue = open_orders.filter(delivery_date__lt=today).aggregate(
+            orders=Count("id", distinct=True), units=Coalesce(Sum("item_details__quantity"), 0)
+        )
+
+        capacity = settings.TAILOR_DAILY_CAPACITY or None
+        first_available = None
+        calendar = []
+        for day, work in days.items():
+            entry = {"date": day, **work}
+            if capacity:
+                entry["capacity"] = capacity
+                entry["remaining"] = max(capacity - work["units"], 0)
+                if first_available is None and day >= today and entry["remaining"] >= quantity:
+                    first_available = day
+            calendar.append(entry)
+
+        return Response({
+            "from": start,
+            "to": end,
+            "capacity": capacity,
+            "first_available_date": first_available,
+            "overdue": overdue,
+            "days": calendar,
+        }, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        logger.error(f"Error building tailor workload: {str(e)}")
+        return Response(
+            {"error": "Failed to build workload"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+def _build_daily_report(report_date, closed=False):
+    """
+    Compute the daily report for the store day starting at `report_date`.
+    Stock levels are only known live, so a `closed` day reports them as None.
+    """
+    next_day = report_date + timedelta(days=1)
+
+    # Get Orders instead of Bills
+    orders_today = Order.objects.filter(created_at__gte=report_date, created_at__lt=next_day)
+
+    # ✅ KPIs
+    net_revenue = orders_today.aggregate(total=Sum("total_amount"))["total"] or 0
+    gst = orders_today.aggregate(total=Sum("gst_amount"))["total"] or 0
+    bills_count = orders_today.count()
+    # Category breakdowns read the denormalized item columns: one indexed scan, no joins
+    items_today = OrderItem.objects.sold_between(report_date, next_day)
+    item_totals = items_today.aggregate(
+        units=Sum("quantity"),
+        cogs=Sum(F("unit_cost") * F("quantity")),
+    )
+    units_sold = item_totals["units"] or 0
+    # Cost is snapshotted on each item at sale time (see CreateOrderView)
+    cogs = item_totals["cogs"] or 0
+    # Margin is measured on sales excluding GST
+    gross_profit = net_revenue - gst - cogs
+    gm_percent = (gross_profit / (net_revenue - gst) * 100) if net_revenue - gst else 0
+    aov = (net_revenue / bills_count) if bills_count else 0
+
+    # ✅ Category Margin
+    category_margin = []
+    for row in (
+        items_today.values("product_type")
+        .annotate(revenue=Sum("line_total"), cogs=Sum(F("unit_cost") * F("quantity")))
+        .order_by("-revenue")
+    ):
+        category_cogs = row["cogs"] or 0
+        category_profit = row["revenue"] - category_cogs
+        category_margin.append({
+            "category": row["product_type"] or "Unknown",
+            "revenue": row["revenue"],
+            "cogs": category_cogs,
+            "gross_profit": category_profit,
+            "gm_percent": round(category_profit / row["revenue"] * 100, 2) if row["revenue"] else 0,
+        })
+
+    # ✅ Category Revenue
+    category_revenue = (
+        items_today.values(category=F("product_type"))
+        .annotate(revenue=Sum("line_total"))
+        .order_by("-revenue")
+    )
+
+    # ✅ Fabric Revenue
+    fabric_revenue = (
+        items_today.values(fabric=F("fabric_type"))
+        .annotate(revenue=Sum("line_total"), units=Sum("quantity"))
+        .order_by("-revenue")
+    )
+
+    # ✅ Payment Method Split
+    payment_split = (
+        orders_today.values("payment_method")
+        .annotate(total=Sum("total_amount"))
+        .order_by("-total")
+    )
+
+    # ✅ Vendor In-Stock (GRNs today)
+    todays_grns = StockBatch.objects.filter(created_at__gte=report_date, created_at__lt=next_day)
+    vendor_grn_summary = (
+        todays_grns.values("vendor__vendor_name")
+        .annotate(total_qty=Sum("added_qty"))
+        .order_by("-total_qty")
+    )
+
+    # ✅ Stock Analysis
+    if closed:
+        stock_low = stock_out = None
+    else:
+        stock_low = Product.objects.filter(stock_count__lte=5).count()
+        stock_out = Product.objects.filter(stock_count=0).count()
+    stock_old = StockBatch.objects.filter(created_at__lt=report_date - timedelta(days=180)).count()
+
+    # ✅ Lot Trace
+    lot_trace = todays_grns.values(
+        product_pk=F("product__id"),
+        product_name=F("product__product_type"),
+        batch_no=F("batch_number"),
+        qty=F("added_qty"),
+    )
+
+    data = {
+        "report_date": report_date.strftime("%Y-%m-%d"),
+        "kpis": {
+            "net_revenue": net_revenue,
+            "cogs": cogs,
+            "gross_profit": gross_profit,
+            "gm_percent": round(gm_percent, 2),
+            "gst": gst,
+            "bills": bills_count,
+            "units": units_sold,
+            "aov": round(aov, 2),
+        },
+        "orders_today": list(
+            orders_today.summary().values(
+                "id", "order_number", "total_amount", "payment_method", "created_at",
+                "items_count", "units_count", "created_by_name",
+            )
+        ),
+        "category_revenue": list(category_revenue),
+        "category_margin": category_margin,
+        "fabric_revenue": list(fabric_revenue),
+        "payment_split": list(payment_split),
+        "vendor_instock": list(vendor_grn_summary),
+        "stock_analysis": {
+            "low_stock": stock_low,
+            "out_of_stock": stock_out,
+            "old_stock_batches": stock_old,
+        },
+        "lot_trace": list(lot_trace),
+    }
+
+    return data
+
 
 @api_view(["GET"])
 # @permission_classes([IsAdminUser])
 def daily_report(request):
+    """
+    /api/manguva/report/?date=YYYY-MM-DD
+    Today's report is computed live. A closed day's report is computed once,
+    archived as compact JSON and served straight from the archive with an
+    ETag, so clients revalidate cheaply and see a rebuilt archive (after a
+    backfill) within an hour. A day whose items still lack a cost or sale
+    time (before backfill_order_item_costs) is computed live and not
+    archived.
+    """
     try:
         date_str = request.query_params.get("date")
         if date_str:
-            report_date = datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=IST)
+            report_date = store_time.day_start(datetime.strptime(date_str, "%Y-%m-%d").date())
         else:
-            report_date = datetime.now(IST).replace(hour=0, minute=0, second=0, microsecond=0)
-
-        next_day = report_date + timedelta(days=1)
-
-        # Get Orders instead of Bills
-        orders_today = Order.objects.filter(created_at__gte=report_date, created_at__lt=next_day)
-
-        # ✅ KPIs
-        net_revenue = orders_today.aggregate(total=Sum("total_amount"))["total"] or 0
-        cogs = 0  # if you don’t track cost yet, keep 0 or calculate from batches
-        gross_profit = net_revenue - cogs
-        gm_percent = (gross_profit / net_revenue * 100) if net_revenue else 0
-        gst = orders_today.aggregate(total=Sum("gst_amount"))["total"] or 0
-        bills_count = orders_today.count()
-        units_sold = OrderItem.objects.filter(order__in=orders_today).aggregate(total=Sum("quantity"))["total"] or 0
-        aov = (net_revenue / bills_count) if bills_count else 0
-
-        # ✅ Category Revenue
-        category_revenue = (
-            OrderItem.objects.filter(order__in=orders_today)
-            .values(category=F("product_id"))  # if you want actual category, join Product
-            .annotate(revenue=Sum("line_total"))
-            .order_by("-revenue")
-        )
+            report_date = store_time.day_start(store_time.today())
 
-        # ✅ Payment Method Split
-        payment_split = (
-            orders_today.values("payment_method")
-            .annotate(total=Sum("total_amount"))
-            .order_by("-total")
-        )
+        if report_date.date() >= store_time.today():
+            return Response(_build_daily_report(report_date), status=status.HTTP_200_OK)
 
-        # ✅ Vendor In-Stock (GRNs today)
-        todays_grns = StockBatch.objects.filter(created_at__gte=report_date, created_at__lt=next_day)
-        vendor_grn_summary = (
-            todays_grns.values("vendor__vendor_name")
-            .annotate(total_qty=Sum("added_qty"))
-            .order_by("-total_qty")
+        archive = (
+            DailyReportArchive.objects
+            .filter(report_date=report_date.date(), version=DailyReportArchive.SCHEMA_VERSION)
+            .first()
         )
+        if archive is None:
+            report = _build_daily_report(report_date, closed=True)
+            pending = (
+                OrderItem.objects.sold_between(report_date, report_date + timedelta(days=1))
+                .needs_backfill()
+                .exists()
+            )
+            if pending:
+                return Response(report, status=status.HTTP_200_OK)
 
-        # ✅ Stock Analysis
-        stock_low = Product.objects.filter(stock_count__lte=5).count()
-        stock_out = Product.objects.filter(stock_count=0).count()
-        stock_old = StockBatch.objects.filter(created_at__lt=report_date - timedelta(days=180)).count()
-
-        # ✅ Lot Trace
-        lot_trace = todays_grns.values(
-            product_pk=F("product__id"),
-            product_name=F("product__product_type"),
-            batch_no=F("batch_number"),
-            qty=F("added_qty"),
-        )
+            payload = json.dumps(report, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":"))
+            archive, _ = DailyReportArchive.objects.update_or_create(
+                report_date=report_date.date(),
+                defaults={"payload": payload, "version": DailyReportArchive.SCHEMA_VERSION},
+            )
 
-        data = {
-            "report_date": report_date.strftime("%Y-%m-%d"),
-            "kpis": {
-                "net_revenue": net_revenue,
-                "cogs": cogs,
-                "gross_profit": gross_profit,
-                "gm_percent": round(gm_percent, 2),
-                "gst": gst,
-                "bills": bills_count,
-                "units": units_sold,
-                "aov": round(aov, 2),
-            },
-            "orders_today": list(
-                orders_today.values("id", "order_number", "total_amount", "payment_method", "created_at")
-            ),
-            "category_revenue": list(category_revenue),
-            "payment_split": list(payment_split),
-            "vendor_instock": list(vendor_grn_summary),
-            "stock_analysis": {
-                "low_stock": stock_low,
-                "out_of_stock": stock_out,
-                "old_stock_batches": stock_old,
-            },
-            "lot_trace": list(lot_trace),
+        if request.headers.get("If-None-Match") == archive.etag:
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = HttpResponse(archive.payload, content_type="application/json")
+        # Not immutable: a backfill rebuilds the archive of the days it changes
+        response["Cache-Control"] = "private, max-age=3600"
+        response["ETag"] = archive.etag
+        return response
+
+    except Exception as e:
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class _Echo:
+    """File-like object whose write() hands back the line, for streaming csv.writer output."""
+    def write(self, value):
+        return value
+
+
+# Lines joined into one chunk per thread hop when streaming under ASGI
+STREAM_CHUNK_LINES = 500
+
+
+def _stream(request, lines, content_type):
+    """
+    StreamingHttpResponse over a sync generator of text lines that streams
+    under both servers. Under ASGI Django would run a sync iterator through
+    sync_to_async(list), building the whole body before the first byte, so
+    there the lines are pulled in chunks from an async generator instead,
+    each chunk on the request's sync thread (where the server-side cursors
+    live).
+    """
+    if not isinstance(getattr(request, "_request", request), ASGIRequest):
+        return StreamingHttpResponse(lines, content_type=content_type)
+
+    lines = iter(lines)
+    next_chunk = sync_to_async(lambda: "".join(itertools.islice(lines, STREAM_CHUNK_LINES)))
+
+    async def chunks():
+        while chunk := await next_chunk():
+            yield chunk
+
+    return StreamingHttpResponse(chunks(), content_type=content_type)
+
+
+REPORT_RANGE_COLUMNS = ["date", "section", "key", "orders", "units", "revenue"]
+
+
+def _report_range_rows(start, end, group="day"):
+    """
+    Yield one row per day (or week, or month), per payment method and per
+    category between `start` and `end` (store dates, inclusive). Buckets are
+    computed in SQL in the store time zone; a week or month that begins
+    before `start` is labelled `start`, as only its days from `start` on are
+    counted. Both sources are read through server-side cursors ordered by
+    bucket and merged, so only one bucket's rows are held in memory at a
+    time.
+
+    The total row sums the bucket's payment method rows, so all its columns
+    come from the orders themselves; the category rows come from the sales
+    rollup, which keys items by sale time and may lag behind.
+    """
+    range_start = store_time.day_start(start)
+    range_end = store_time.day_start(end + timedelta(days=1))
+
+    order_units = (
+        OrderItem.objects
+        .filter(order_id=OuterRef("pk"))
+        .values("order_id")
+        .annotate(units=Sum("quantity"))
+        .values("units")
+    )
+    payments = (
+        Order.objects
+        .filter(created_at__gte=range_start, created_at__lt=range_end)
+        .annotate(day=store_time.trunc("created_at", group), item_units=Subquery(order_units))
+        .values("day", "payment_method")
+        .annotate(orders=Count("id"), units=Sum("item_units"), revenue=Sum("total_amount"))
+        .order_by("day", "payment_method")
+        .iterator(chunk_size=2000)
+    )
+    # Rollup days are already store days
+    sale_day = F("sale_date") if group == "day" else store_time.GROUPINGS[group]("sale_date")
+    categories = (
+        SalesRollup.objects
+        .filter(sale_date__range=(start, end))
+        .annotate(day=sale_day)
+        .values("day", "product_type")
+        .annotate(units=Sum("units"), revenue=Sum("revenue"))
+        .order_by("day", "product_type")
+        .iterator(chunk_size=2000)
+    )
+
+    next_payment = next(payments, None)
+    next_category = next(categories, None)
+    while next_payment or next_category:
+        days = []
+        if next_payment:
+            days.append(next_payment["day"])
+        if next_category:
+            days.append(next_category["day"])
+        day = min(days)
+
+        day_payments = []
+        while next_payment and next_payment["day"] == day:
+            day_payments.append(next_payment)
+            next_payment = next(payments, None)
+        day_categories = []
+        while next_category and next_category["day"] == day:
+            day_categories.append(next_category)
+            next_category = next(categories, None)
+
+        label = max(day, start).isoformat()
+        yield {
+            "date": label,
+            "section": group,
+            "key": "total",
+            "orders": sum(row["orders"] for row in day_payments),
+            "units": sum(row["units"] or 0 for row in day_payments),
+            "revenue": float(sum(row["revenue"] for row in day_payments)),
         }
+        for row in day_payments:
+            yield {
+                "date": label,
+                "section": "payment_method",
+                "key": row["payment_method"],
+                "orders": row["orders"],
+                "units": row["units"] or 0,
+                "revenue": float(row["revenue"]),
+            }
+        for row in day_categories:
+            yield {
+                "date": label,
+                "section": "category",
+                "key": row["product_type"] or "Unknown",
+                "orders": None,
+                "units": row["units"],
+                "revenue": float(row["revenue"]),
+            }
 
-        return Response(data, status=status.HTTP_200_OK)
 
-    except Exception as e:
-        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def daily_report_range(request):
+    """
+    /api/manguva/report/range/?from=YYYY-MM-DD&to=YYYY-MM-DD&export=csv|jsonl&group=day|week|month
+    Daily (or weekly, or monthly) breakdown (totals, payment methods,
+    categories) for a whole month or quarter, streamed as CSV (default) or JSON Lines. Memory use
+    does not grow with the length of the range.
+    """
+    try:
+        start = datetime.strptime(request.query_params["from"], "%Y-%m-%d").date()
+        end = datetime.strptime(request.query_params["to"], "%Y-%m-%d").date()
+    except (KeyError, ValueError):
+        return Response({"error": "'from' and 'to' are required as YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+    if start > end:
+        return Response({"error": "'from' must not be after 'to'"}, status=status.HTTP_400_BAD_REQUEST)
+    group = request.query_params.get("group", "day")
+    if group not in store_time.GROUPINGS:
+        return Response({"error": "group must be 'day', 'week' or 'month'"}, status=status.HTTP_400_BAD_REQUEST)
+
+    export = request.query_params.get("export", "csv")
+    filename = f"report_{start:%Y%m%d}_{end:%Y%m%d}"
+
+    if export == "csv":
+        writer = csv.writer(_Echo())
+
+        def stream():
+            yield writer.writerow(REPORT_RANGE_COLUMNS)
+            for row in _report_range_rows(start, end, group):
+                yield writer.writerow([row[column] for column in REPORT_RANGE_COLUMNS])
+
+        response = _stream(request, stream(), "text/csv")
+        response["Content-Disposition"] = f'attachment; filename="{filename}.csv"'
+    elif export == "jsonl":
+        response = _stream(
+            request,
+            (json.dumps(row) + "\n" for row in _report_range_rows(start, end, group)),
+            "application/x-ndjson",
+        )
+        response["Content-Disposition"] = f'attachment; filename="{filename}.jsonl"'
+    else:
+        return Response({"error": "export must be 'csv' or 'jsonl'"}, status=status.HTTP_400_BAD_REQUEST)
+
+    return response
+
+
+# -----------------------------
+# Background jobs
+# -----------------------------
+
+def wants_async(request):
+    """Whether the caller asked for `?async=1`: run as a job and answer with its id."""
+    return request.query_params.get("async", "").lower() in ("1", "true", "yes")
+
+
+def job_accepted(job):
+    return Response(
+        {
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": f"/api/jobs/{job.id}/",
+            "result_url": f"/api/jobs/{job.id}/result/",
+        },
+        status=status.HTTP_202_ACCEPTED,
+    )
+
+
+def _get_job(request, pk):
+    jobs_visible = Job.objects.all()
+    if not request.user.is_staff:
+        jobs_visible = jobs_visible.filter(created_by=request.user)
+    return get_object_or_404(jobs_visible, pk=pk)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def job_status(request, pk):
+    """
+    /api/jobs/<pk>/
+    Progress of a background job. Poll until status is `succeeded` or `failed`.
+    """
+    job = _get_job(request, pk)
+    data = {
+        "job_id": job.id,
+        "name": job.name,
+        "status": job.status,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "result_url": f"/api/jobs/{job.id}/result/",
+    }
+    if job.error:
+        # Last line of the traceback; the full trace stays in the admin
+        data["error"] = job.error.strip().splitlines()[-1]
+    if job.status == "queued" and job.attempts:
+        data["retry_at"] = job.run_at
+    return Response(data, status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def job_result(request, pk):
+    """
+    /api/jobs/<pk>/result/
+    The job's result once it succeeded; 202 while it is still pending.
+    """
+    job = _get_job(request, pk)
+    if job.status == "succeeded":
+        return Response(job.result, status=status.HTTP_200_OK)
+    if job.status == "failed":
+        return Response({"error": "Job failed", "status": job.status}, status=status.HTTP_409_CONFLICT)
+    return Response({"job_id": job.id, "status": job.status}, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+@renderer_classes([JSONRenderer, profiling.FoldedStacksRenderer])
+def profile_detail(request, profile_id):
+    """
+    /api/profiles/<id>/
+    A stored request profile: SQL with EXPLAIN plans and the collapsed stacks.
+    ?format=folded returns only the stacks, for flamegraph.pl or speedscope.
+    """
+    try:
+        if request.query_params.get("format") == "folded":
+            with open(profiling.profile_path(profile_id, ".folded"), encoding="utf-8") as f:
+                return HttpResponse(f.read(), content_type="text/plain; charset=utf-8")
+        with open(profiling.profile_path(profile_id, ".json"), encoding="utf-8") as f:
+            data = json.load(f)
+        with open(profiling.profile_path(profile_id, ".folded"), encoding="utf-8") as f:
+            data["folded"] = f.read()
+    except FileNotFoundError:
+        return Response({"error": "Profile not found"}, status=status.HTTP_404_NOT_FOUND)
+    return Response(data, status=status.HTTP_200_OK)
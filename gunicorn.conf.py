@@ -0,0 +1,159 @@
+"""
+Gunicorn settings for the web process (`gunicorn -c gunicorn.conf.py`).
+
+Migrations, the admin bootstrap and collectstatic run in the release phase
+(see Procfile and railway.json), so a restart only has to start workers.
+The app is imported once in the master (preload_app) and forked, instead of
+every worker importing it again.
+
+Sizing follows the CPUs this container may actually use (its CPU affinity
+and cgroup quota, not the host's core count), capped so that workers x
+connections per worker stays within DB_MAX_CONNECTIONS:
+
+* uvicorn workers (default, needed for the dashboard event stream) run
+  every concurrent request's sync view on its own thread, each with its
+  own connection. A worker lets at most ASGI_MAX_CONCURRENT_REQUESTS
+  requests in at once (Manguva/asgi.py; the rest wait), so it holds that
+  many connections, or DB_POOL_MAX_SIZE with DB_POOL, plus one for the
+  dashboard events LISTEN
+* gthread workers (GUNICORN_WORKER_CLASS=gthread, plain WSGI) hold one
+  connection per thread, or DB_POOL_MAX_SIZE with DB_POOL
+
+Workers are recycled after MAX_REQUESTS (+ jitter) requests to bound memory.
+
+Prometheus metrics run in multiprocess mode: workers write their samples
+under PROMETHEUS_MULTIPROC_DIR, which is emptied when the master starts,
+and /metrics merges them (see admin_app/metrics.py). The files are named
+after the worker's slot (0 .. workers - 1) rather than its pid, so a
+recycled worker's replacement reopens them and keeps counting instead of
+leaving another set of files behind.
+"""
+import glob
+import math
+import os
+import tempfile
+
+
+def available_cpus():
+    """CPUs usable by this process: its affinity mask, further limited by a cgroup CPU quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS
+        cpus = os.cpu_count() or 1
+    quota = None
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            limit, period = f.read().split()
+        if limit != "max":
+            quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            # cgroup v1: a quota of -1 means unlimited
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                limit = int(f.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = int(f.read())
+            if limit > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+    if quota:
+        cpus = min(cpus, math.ceil(quota))
+    return max(cpus, 1)
+
+
+cpus = available_cpus()
+db_max_connections = int(os.environ.get("DB_MAX_CONNECTIONS", 20))
+# Connections kept for release commands, the job worker and admin shells
+db_reserved_connections = int(os.environ.get("DB_RESERVED_CONNECTIONS", 4))
+db_budget = max(db_max_connections - db_reserved_connections, 1)
+
+# Forked workers must not share a rotating log file; they log to stdout only
+os.environ.setdefault("LOG_TO_FILE", "False")
+
+# Must be set before the app (and prometheus_client) is preloaded
+prometheus_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "maguva-prometheus")
+)
+os.makedirs(prometheus_dir, exist_ok=True)
+for stale in glob.glob(os.path.join(prometheus_dir, "*.db")):
+    os.remove(stale)
+
+# Slot of this process; set in post_fork, the master keeps "master"
+worker_slot = "master"
+
+
+def _worker_slot():
+    return worker_slot
+
+
+from prometheus_client import values  # noqa: E402
+
+values.ValueClass = values.MultiProcessValue(process_identifier=_worker_slot)
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# A worker's pool caps its connections whatever its concurrency (see settings.DATABASES)
+db_pool_max_size = (
+    int(os.environ.get("DB_POOL_MAX_SIZE", 4)) if os.environ.get("DB_POOL", "False") == "True" else None
+)
+
+if os.environ.get("GUNICORN_WORKER_CLASS", "uvicorn") == "gthread":
+    worker_class = "gthread"
+    wsgi_app = "Manguva.wsgi:application"
+    threads = int(os.environ.get("GUNICORN_THREADS", min(4, max(db_budget // cpus, 1))))
+    connections_per_worker = db_pool_max_size or threads
+else:
+    worker_class = "uvicorn.workers.UvicornWorker"
+    wsgi_app = "Manguva.asgi:application"
+    threads = 1
+    # Read by Manguva/asgi.py when the app is preloaded below
+    concurrency = int(os.environ.setdefault("ASGI_MAX_CONCURRENT_REQUESTS", str(db_pool_max_size or 4)))
+    # Request threads plus the dashboard events LISTEN connection
+    connections_per_worker = (db_pool_max_size or concurrency) + 1
+
+workers = int(os.environ.get("WEB_CONCURRENCY", max(min(2 * cpus + 1, db_budget // connections_per_worker), 1)))
+
+preload_app = True
+
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 100))
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+
+
+def when_ready(server):
+    server.log.info(
+        f"Serving with {workers} {worker_class} workers x {threads} threads, "
+        f"up to {connections_per_worker} DB connections each "
+        f"({cpus} CPUs, {db_max_connections} DB connections)"
+    )
+
+
+def pre_fork(server, worker):
+    # Runs in the master: drop any connection opened while preloading so
+    # forked workers never share a database socket
+    from django.db import connections
+
+    connections.close_all()
+
+    # Lowest slot no live worker holds; a recycled worker's slot is free again
+    taken = {getattr(w, "slot", None) for w in server.WORKERS.values()}
+    worker.slot = next(slot for slot in range(len(taken) + 1) if slot not in taken)
+
+
+def post_fork(server, worker):
+    global worker_slot
+    worker_slot = worker.slot
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.slot)